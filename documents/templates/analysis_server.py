@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+常驻 Dart 分析服务
+用于 plan 执行器的迭代验证模式：在多轮验证之间保持一个 `dart language-server` 进程（LSP over stdio），
+每轮只通知有变化的文件并等待增量分析完成，避免每次冷启动 flutter analyze 重新分析整个包
+"""
+
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from urllib.parse import quote, unquote, urlparse
+
+SEVERITY_NAMES = {1: 'error', 2: 'warning', 3: 'info', 4: 'hint'}
+
+# 监视的输入：变化时通知分析服务
+WATCH_INPUTS = ("lib", "test", "pubspec.yaml", "analysis_options.yaml")
+
+
+def path_to_uri(path: str) -> str:
+    return 'file://' + quote(os.path.abspath(path))
+
+
+def uri_to_path(uri: str) -> str:
+    return unquote(urlparse(uri).path)
+
+
+def snapshot_sources(inputs: Sequence[str] = WATCH_INPUTS) -> Dict[str, Tuple[int, int]]:
+    """Dart 源文件及配置文件的 (mtime_ns, size) 快照，用于检测本轮变化的文件"""
+    snapshot = {}
+    for root in inputs:
+        if os.path.isfile(root):
+            stat = os.stat(root)
+            snapshot[os.path.abspath(root)] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for name in filenames:
+                if name.endswith('.dart'):
+                    path = os.path.abspath(os.path.join(dirpath, name))
+                    stat = os.stat(path)
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def diff_snapshots(old: Dict[str, Tuple[int, int]], new: Dict[str, Tuple[int, int]]) -> Dict[str, List[str]]:
+    return {
+        'created': sorted(set(new) - set(old)),
+        'changed': sorted(p for p in set(new) & set(old) if new[p] != old[p]),
+        'deleted': sorted(set(old) - set(new)),
+    }
+
+
+class AnalysisServerError(Exception):
+    """分析服务启动失败或意外退出"""
+
+
+class AnalysisServer:
+    def __init__(self, root: str = ".", command: Optional[List[str]] = None):
+        self.root = os.path.abspath(root)
+        self.command = command or ['dart', 'language-server', '--protocol=lsp', '--client-id=plan-executor']
+        self.process: Optional[subprocess.Popen] = None
+        self.diagnostics: Dict[str, List[Dict[str, Any]]] = {}
+        self.snapshot: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._responses: Dict[int, "queue.Queue"] = {}
+        self._status: "queue.Queue" = queue.Queue()
+        self._next_id = 0
+        self._last_activity = time.monotonic()
+        self._reader: Optional[threading.Thread] = None
+
+    # ---- LSP 传输 ----
+
+    def _send(self, message: Dict[str, Any]):
+        body = json.dumps(dict(message, jsonrpc='2.0')).encode('utf-8')
+        self.process.stdin.write(f"Content-Length: {len(body)}\r\n\r\n".encode('ascii') + body)
+        self.process.stdin.flush()
+
+    def _request(self, method: str, params: Any, timeout: float = 60) -> Any:
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            self._responses[request_id] = queue.Queue(maxsize=1)
+        self._send({'id': request_id, 'method': method, 'params': params})
+        try:
+            response = self._responses[request_id].get(timeout=timeout)
+        except queue.Empty:
+            raise AnalysisServerError(f"{method} 请求超时（{timeout}s）")
+        finally:
+            self._responses.pop(request_id, None)
+        if 'error' in response:
+            raise AnalysisServerError(f"{method} 失败: {response['error']}")
+        return response.get('result')
+
+    def _notify(self, method: str, params: Any):
+        self._send({'method': method, 'params': params})
+
+    def _read_messages(self):
+        stream = self.process.stdout
+        while True:
+            headers = {}
+            while True:
+                line = stream.readline()
+                if not line:
+                    self._status.put(None)
+                    return
+                line = line.decode('ascii', errors='replace').strip()
+                if not line:
+                    break
+                key, _, value = line.partition(':')
+                headers[key.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+            if length <= 0:
+                continue
+            message = json.loads(stream.read(length).decode('utf-8'))
+            self._last_activity = time.monotonic()
+            self._dispatch(message)
+
+    def _dispatch(self, message: Dict[str, Any]):
+        method = message.get('method')
+        if method is None:
+            waiter = self._responses.get(message.get('id'))
+            if waiter is not None:
+                waiter.put(message)
+            return
+        params = message.get('params') or {}
+        if method == 'textDocument/publishDiagnostics':
+            path = uri_to_path(params['uri'])
+            with self._lock:
+                if params.get('diagnostics'):
+                    self.diagnostics[path] = params['diagnostics']
+                else:
+                    self.diagnostics.pop(path, None)
+        elif method == '$/analyzerStatus':
+            self._status.put(bool(params.get('isAnalyzing')))
+        elif method == '$/progress':
+            kind = (params.get('value') or {}).get('kind')
+            if kind in ('begin', 'end'):
+                self._status.put(kind == 'begin')
+        elif 'id' in message:
+            # 服务端发起的请求（registerCapability / workDoneProgress/create / configuration）
+            result = None
+            if method == 'workspace/configuration':
+                result = [{} for _ in params.get('items', [])]
+            self._send({'id': message['id'], 'result': result})
+
+    # ---- 生命周期 ----
+
+    def start(self, timeout: float = 180):
+        """启动分析服务并等待首轮全量分析完成"""
+        try:
+            self.process = subprocess.Popen(
+                self.command, cwd=self.root,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+        except FileNotFoundError as e:
+            raise AnalysisServerError(f"无法启动分析服务: {e}")
+        self._reader = threading.Thread(target=self._read_messages, daemon=True)
+        self._reader.start()
+
+        self.snapshot = snapshot_sources()
+        self._request('initialize', {
+            'processId': os.getpid(),
+            'rootUri': path_to_uri(self.root),
+            'workspaceFolders': [{'uri': path_to_uri(self.root), 'name': os.path.basename(self.root)}],
+            'capabilities': {
+                'window': {'workDoneProgress': True},
+                'workspace': {'didChangeWatchedFiles': {'dynamicRegistration': False}},
+                'textDocument': {'publishDiagnostics': {}},
+            },
+            'initializationOptions': {'onlyAnalyzeProjectsWithOpenFiles': False},
+        }, timeout=timeout)
+        self._notify('initialized', {})
+        self.wait_idle(timeout)
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            if self.process.poll() is None:
+                self._request('shutdown', None, timeout=10)
+                self._notify('exit', None)
+                self.process.wait(timeout=10)
+        except (AnalysisServerError, OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+    def wait_idle(self, timeout: float = 180, start_grace: float = 2.0, quiet: float = 1.5):
+        """
+        等待分析完成
+
+        依据分析状态通知（$/analyzerStatus 或 $/progress 的 begin/end）：开始分析后等到结束；
+        start_grace 秒内没有开始分析且 quiet 秒内没有新消息时视为没有需要分析的内容。
+        """
+        started_at = time.monotonic()
+        deadline = started_at + timeout
+        analyzing = False
+        while time.monotonic() < deadline:
+            try:
+                status = self._status.get(timeout=0.2)
+            except queue.Empty:
+                status = 'tick'
+            if status is None:
+                raise AnalysisServerError("分析服务意外退出")
+            if status is True:
+                analyzing = True
+            elif status is False:
+                return
+            elif not analyzing and time.monotonic() - started_at > start_grace \
+                    and time.monotonic() - self._last_activity > quiet:
+                return
+        raise AnalysisServerError(f"等待分析完成超时（{timeout}s）")
+
+    def _drain_status(self):
+        while True:
+            try:
+                if self._status.get_nowait() is None:
+                    raise AnalysisServerError("分析服务意外退出")
+            except queue.Empty:
+                return
+
+    # ---- 增量分析 ----
+
+    def refresh(self, timeout: float = 180) -> Dict[str, List[str]]:
+        """检测自上次以来变化的文件，通知分析服务并等待增量分析完成，返回变化的文件"""
+        current = snapshot_sources()
+        changes = diff_snapshots(self.snapshot, current)
+        self.snapshot = current
+        events = (
+            [{'uri': path_to_uri(p), 'type': 1} for p in changes['created']]
+            + [{'uri': path_to_uri(p), 'type': 2} for p in changes['changed']]
+            + [{'uri': path_to_uri(p), 'type': 3} for p in changes['deleted']]
+        )
+        if events:
+            self._drain_status()
+            self._notify('workspace/didChangeWatchedFiles', {'changes': events})
+            self.wait_idle(timeout)
+        return changes
+
+    def issues(self, paths: Optional[Sequence[str]] = None, min_severity: int = 3) -> List[Dict[str, Any]]:
+        """
+        当前诊断（默认 error/warning/info，与 flutter analyze 的失败条件一致）
+
+        Args:
+            paths: 只返回这些文件的诊断；None 表示全部
+            min_severity: 最低严重级别（1=error ... 4=hint），数值越小越严重
+        """
+        wanted = {os.path.abspath(p) for p in paths} if paths is not None else None
+        result = []
+        with self._lock:
+            items = list(self.diagnostics.items())
+        for path, diagnostics in items:
+            if wanted is not None and path not in wanted:
+                continue
+            if not path.startswith(self.root + os.sep):
+                continue
+            relative = os.path.relpath(path, self.root)
+            if relative.split(os.sep)[0].startswith('.'):
+                continue
+            for diagnostic in diagnostics:
+                severity = diagnostic.get('severity', 1)
+                if severity > min_severity:
+                    continue
+                code = diagnostic.get('code')
+                result.append({
+                    'file': relative.replace(os.sep, '/'),
+                    'line': diagnostic['range']['start']['line'] + 1,
+                    'severity': SEVERITY_NAMES.get(severity, str(severity)),
+                    'code': code.get('value') if isinstance(code, dict) else code,
+                    'message': diagnostic.get('message', ''),
+                })
+        return sorted(result, key=lambda d: (d['file'], d['line']))
+
+
+def format_issue(issue: Dict[str, Any]) -> str:
+    return f"{issue['severity']} • {issue['message']} • {issue['file']}:{issue['line']} • {issue['code']}"
+
+
+# 使用示例
+if __name__ == "__main__":
+    server = AnalysisServer()
+    print("🔍 启动分析服务并完成首轮分析...")
+    started = time.monotonic()
+    server.start()
+    print(f"  首轮分析耗时 {time.monotonic() - started:.1f}s，问题 {len(server.issues())} 个")
+    try:
+        while True:
+            input("修改代码后按回车重新分析（Ctrl+C 退出）...")
+            started = time.monotonic()
+            changes = server.refresh()
+            changed = changes['created'] + changes['changed']
+            issues = server.issues()
+            print(f"  增量分析耗时 {time.monotonic() - started:.1f}s，变化文件 {len(changed)} 个，问题 {len(issues)} 个")
+            for issue in server.issues(changed):
+                print(f"    {format_issue(issue)}")
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        server.stop()
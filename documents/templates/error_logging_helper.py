@@ -27,7 +27,9 @@ class StepDoneErrorLogger:
                   failure_manifestation: str,
                   excluded_possibilities: str,
                   retry_count: int = 0,
-                  max_retries: int = 5) -> str:
+                  max_retries: int = 5,
+                  output_log: Optional[str] = None,
+                  output_tail: Optional[str] = None) -> str:
         """
         记录错误信息到JSON日志文件
         
@@ -40,6 +42,8 @@ class StepDoneErrorLogger:
             excluded_possibilities: 排除的可能性
             retry_count: 当前重试次数
             max_retries: 最大重试次数
+            output_log: 命令完整输出的日志文件路径（可选）
+            output_tail: 命令输出的最后若干行（可选）
         
         Returns:
             日志文件路径
@@ -60,6 +64,10 @@ class StepDoneErrorLogger:
             "max_retries": max_retries,
             "status": "retrying" if retry_count < max_retries else "failed"
         }
+        if output_log:
+            log_entry["output_log"] = output_log
+        if output_tail:
+            log_entry["output_tail"] = output_tail
         
         with open(log_path, 'w', encoding='utf-8') as f:
             json.dump(log_entry, f, ensure_ascii=False, indent=2)
@@ -76,7 +84,11 @@ class StepDoneErrorLogger:
     
     def get_log_summary(self) -> Dict[str, Any]:
         """获取日志摘要"""
-        log_files = [f for f in os.listdir(self.log_directory) if f.endswith('.json')]
+        # 只统计错误日志（同目录下还有验证缓存、测试报告等 JSON）
+        log_files = [
+            f for f in os.listdir(self.log_directory)
+            if f.startswith('step_done_error_') and f.endswith('.json')
+        ]
         
         total_errors = len(log_files)
         failed_errors = 0
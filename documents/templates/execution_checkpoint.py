@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+执行检查点
+用于 plan / step-done 执行器记录每个阶段的完成状态，重新执行时从第一个未完成或已失效的阶段继续
+
+失效规则：
+- plan 文件内容变化（plan_hash 不同）：全部阶段失效
+- 检查类阶段（验证、pre-commit）：完成时记录 git 工作区树哈希，树哈希变化即失效
+- 某个阶段重新执行后，其后的所有阶段都重新执行
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+
+def file_hash(path: str) -> str:
+    """文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def git_tree_hash(exclude: Optional[List[str]] = None) -> Optional[str]:
+    """
+    当前工作区（含未暂存、未跟踪文件）的 git 树哈希
+
+    使用临时索引文件执行 git add -A + git write-tree，不影响真实暂存区；
+    复制真实索引作为起点，可复用其中的 stat 信息，避免重新哈希未变化的文件。
+    exclude 中的路径（如日志目录）不计入哈希，否则每次写日志都会让检查点失效。
+    不在 git 仓库中或 git 失败时返回 None。
+    """
+    try:
+        index_path = subprocess.run(
+            ['git', 'rev-parse', '--git-path', 'index'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+    fd, temp_index = tempfile.mkstemp(prefix='checkpoint-index-')
+    os.close(fd)
+    try:
+        if os.path.exists(index_path):
+            shutil.copyfile(index_path, temp_index)
+        else:
+            os.unlink(temp_index)
+        env = dict(os.environ, GIT_INDEX_FILE=temp_index)
+        subprocess.run(['git', 'add', '-A'], capture_output=True, check=True, env=env)
+        if exclude:
+            subprocess.run(
+                ['git', 'rm', '-r', '-q', '--cached', '--ignore-unmatch', '--'] + exclude,
+                capture_output=True, check=True, env=env
+            )
+        result = subprocess.run(
+            ['git', 'write-tree'], capture_output=True, text=True, check=True, env=env
+        )
+        return result.stdout.strip()
+    except subprocess.CalledProcessError:
+        return None
+    finally:
+        if os.path.exists(temp_index):
+            os.unlink(temp_index)
+
+
+class ExecutionCheckpoint:
+    def __init__(self, plan_file: str, log_directory: str = "documents/plan-logs"):
+        self.plan_file = plan_file
+        self.log_directory = log_directory
+        self.checkpoint_directory = os.path.join(log_directory, "checkpoints")
+        name = os.path.splitext(os.path.basename(plan_file))[0]
+        self.checkpoint_path = os.path.join(self.checkpoint_directory, f"{name}.json")
+        self.plan_hash = file_hash(plan_file)
+        self.state = self._load()
+        self.invalidated = False
+        self._tree_hash: Optional[str] = None
+
+    def _load(self) -> Dict[str, Any]:
+        """加载检查点；plan 内容变化时丢弃旧状态"""
+        empty = {"plan_file": self.plan_file, "plan_hash": self.plan_hash, "phases": {}}
+        if not os.path.exists(self.checkpoint_path):
+            return empty
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return empty
+        if state.get("plan_hash") != self.plan_hash:
+            print("♻️ plan文件已变化，丢弃旧的检查点")
+            return empty
+        return state
+
+    def _save(self):
+        os.makedirs(self.checkpoint_directory, exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def tree_hash(self) -> Optional[str]:
+        """当前树哈希（同一次检查内缓存，阶段完成后重新计算）"""
+        if self._tree_hash is None:
+            self._tree_hash = git_tree_hash(exclude=[self.log_directory])
+        return self._tree_hash
+
+    def should_skip(self, phase: str, tree_sensitive: bool = False) -> bool:
+        """
+        判断阶段是否可以跳过
+
+        Args:
+            phase: 阶段名称
+            tree_sensitive: 是否为检查类阶段（结果依赖工作区内容）
+
+        Returns:
+            已完成且未失效时返回 True；一旦返回 False，后续阶段全部不再跳过
+        """
+        if self.invalidated:
+            return False
+        record = self.state["phases"].get(phase)
+        if not record or record.get("status") != "done":
+            self.invalidated = True
+            return False
+        if tree_sensitive:
+            current = self.tree_hash()
+            if current is None or record.get("tree_hash") != current:
+                print(f"♻️ 工作区已变化，阶段 {phase} 需要重新执行")
+                self.invalidated = True
+                return False
+        return True
+
+    def mark_done(self, phase: str, tree_sensitive: bool = False):
+        """记录阶段完成（检查类阶段同时记录完成时的树哈希）"""
+        self._tree_hash = None
+        self.state["phases"][phase] = {
+            "status": "done",
+            "tree_hash": self.tree_hash() if tree_sensitive else None,
+            "completed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self._save()
+
+    def mark_failed(self, phase: str):
+        """记录阶段失败（下次从该阶段继续）"""
+        self.state["phases"][phase] = {
+            "status": "failed",
+            "completed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self._save()
+
+    def clear(self):
+        """删除检查点，下次从头执行"""
+        self.state = {"plan_file": self.plan_file, "plan_hash": self.plan_hash, "phases": {}}
+        self.invalidated = True
+        if os.path.exists(self.checkpoint_path):
+            os.unlink(self.checkpoint_path)
+
+    def run_phase(self, phase: str, func, tree_sensitive: bool = False) -> bool:
+        """执行一个阶段：可跳过则跳过，否则执行并记录结果"""
+        if self.should_skip(phase, tree_sensitive):
+            print(f"⏭️ 跳过已完成阶段: {phase}")
+            return True
+        success = func()
+        if success:
+            self.mark_done(phase, tree_sensitive)
+        else:
+            self.mark_failed(phase)
+        return success
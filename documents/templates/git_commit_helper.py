@@ -4,34 +4,35 @@ Step-Done Git提交处理工具
 用于处理 step-done 执行完成后的自动提交
 """
 
+import hashlib
 import subprocess
 import json
 import os
+import time
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from error_logging_helper import StepDoneErrorLogger
+from git_state import GitError, get_git_state
 
 class StepDoneGitHandler:
     def __init__(self, log_directory: str = "documents/plan-logs"):
+        self.log_directory = log_directory
         self.logger = StepDoneErrorLogger(log_directory)
         self.max_retries = 5
+        # 重试退避：2s、4s、8s…，最长 30s
+        self.backoff_base = 2.0
+        self.backoff_max = 30.0
+        self.sleep = time.sleep
     
     def get_last_commit_time(self) -> Optional[datetime]:
-        """获取上次提交时间"""
+        """获取上次提交时间（取自进程内缓存的 git 状态快照）"""
         try:
-            result = subprocess.run(
-                ['git', 'log', '-1', '--format=%ct'],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            timestamp = int(result.stdout.strip())
-            return datetime.fromtimestamp(timestamp)
-        except subprocess.CalledProcessError as e:
+            return get_git_state().last_commit_time
+        except GitError as e:
             self.logger.log_error(
                 step_name="get_last_commit_time",
                 error_content=str(e),
-                estimated_cause="git log命令执行失败",
+                estimated_cause="git status/log命令执行失败",
                 solution_attempted="检查git仓库状态",
                 failure_manifestation="无法获取上次提交时间",
                 excluded_possibilities="排除了权限问题",
@@ -84,24 +85,84 @@ class StepDoneGitHandler:
             f"git commit -m \"{title}\" -m \"{body}\"\n"
         )
     
+    def working_tree_fingerprint(self) -> Optional[str]:
+        """
+        工作区指纹：HEAD + git status 列出的路径及其 mtime/大小
+
+        只对有改动的文件取 stat，开销远小于重新运行 pre-commit；
+        修改已改动文件、新增/删除文件、提交或暂存都会改变指纹；日志目录不计入（每次失败都会写日志）。
+        """
+        try:
+            snapshot = get_git_state(refresh=True)
+        except GitError:
+            return None
+
+        excluded = self.log_directory.rstrip('/') + '/'
+        digest = hashlib.sha1((snapshot.head_sha or '').encode('utf-8'))
+        for group, paths in (('S', snapshot.staged), ('M', snapshot.modified),
+                             ('?', snapshot.untracked), ('U', snapshot.conflicted)):
+            for path in paths:
+                if path.startswith(excluded):
+                    continue
+                try:
+                    stat = os.stat(path)
+                    digest.update(f"{group}:{path}:{stat.st_mtime_ns}:{stat.st_size}\0".encode('utf-8'))
+                except OSError:
+                    digest.update(f"{group}:{path}:missing\0".encode('utf-8'))
+        return digest.hexdigest()
+
+    def backoff_delay(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待秒数（指数退避，有上限）"""
+        return min(self.backoff_base * (2 ** (attempt - 1)), self.backoff_max)
+
     def handle_commit_with_retry(self) -> bool:
-        """仅处理pre-commit检查；不执行自动提交"""
+        """
+        仅处理pre-commit检查；不执行自动提交
+
+        失败后按指数退避等待，只有工作区指纹发生变化（修复了代码或 hook 自动改写了文件）才真正重跑；
+        工作区未变化的重试直接跳过，并在结束时报告跳过的次数与节省的时间。
+        """
         retry_count = 0
+        skipped_retries = 0
+        run_durations: List[float] = []
+        last_fingerprint: Optional[str] = None
+        
+        def report_savings():
+            if skipped_retries and run_durations:
+                saved = skipped_retries * (sum(run_durations) / len(run_durations))
+                print(f"工作区未变化，跳过了 {skipped_retries} 次重试，节省约 {saved:.0f}s")
         
         while retry_count < self.max_retries:
             try:
+                # 上次失败后工作区没有任何变化：重跑只会得到同样的结果
+                if last_fingerprint is not None:
+                    delay = self.backoff_delay(retry_count)
+                    print(f"等待 {delay:.0f}s 后检查工作区是否变化...")
+                    self.sleep(delay)
+                    current = self.working_tree_fingerprint()
+                    if current is not None and current == last_fingerprint:
+                        retry_count += 1
+                        skipped_retries += 1
+                        print(f"工作区未变化，跳过第{retry_count}次重试")
+                        continue
+                
                 # 检查是否需要运行pre-commit
                 if self.should_run_precommit():
                     print("距离上次提交未超过30分钟，运行pre-commit检查...")
+                    # 指纹取自运行前：hook 自动改写的文件也算作变化，下次检查时会重跑
+                    before_run = self.working_tree_fingerprint()
+                    started = time.monotonic()
                     success, output = self.run_precommit()
+                    run_durations.append(time.monotonic() - started)
                     
                     if not success:
                         retry_count += 1
+                        last_fingerprint = before_run
                         self.logger.log_error(
                             step_name="precommit_check",
                             error_content=output,
                             estimated_cause="pre-commit检查失败",
-                            solution_attempted="修复代码问题后重试",
+                            solution_attempted="修复代码问题后重试（工作区变化后才会重跑）",
                             failure_manifestation="pre-commit检查未通过",
                             excluded_possibilities="排除了权限问题",
                             retry_count=retry_count,
@@ -110,6 +171,7 @@ class StepDoneGitHandler:
                         
                         if retry_count >= self.max_retries:
                             print(f"pre-commit检查失败，已达到最大重试次数({self.max_retries})")
+                            report_savings()
                             return False
                         
                         print(f"pre-commit检查失败，第{retry_count}次重试...")
@@ -123,6 +185,7 @@ class StepDoneGitHandler:
                         print(output)
                         return False
 
+                report_savings()
                 # 仅输出建议提交命令
                 print("建议提交命令（请手动执行）：")
                 print(self.build_suggested_commit())
@@ -148,16 +211,30 @@ class StepDoneGitHandler:
                 print(f"处理过程中出现异常，第{retry_count}次重试...")
                 continue
         
+        print(f"pre-commit检查失败，已达到最大重试次数({self.max_retries})")
+        report_savings()
         return False
     
     def get_commit_status(self) -> Dict[str, Any]:
         """获取提交状态"""
         last_commit_time = self.get_last_commit_time()
         should_precommit = self.should_run_precommit()
+        try:
+            snapshot = get_git_state()
+            tree = {
+                "head_sha": snapshot.head_sha,
+                "branch": snapshot.branch,
+                "staged": snapshot.staged,
+                "modified": snapshot.modified,
+                "untracked": snapshot.untracked,
+            }
+        except GitError:
+            tree = None
         
         return {
             "last_commit_time": last_commit_time.isoformat() if last_commit_time else None,
             "should_run_precommit": should_precommit,
+            "working_tree": tree,
             "max_retries": self.max_retries,
             "log_summary": self.logger.get_log_summary()
         }
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Git 状态快照
+用于执行器与辅助脚本统一获取仓库状态：每次只运行一次 `git status --porcelain=v2 -z --branch`
+和一次 `git log -1`，结果在进程内缓存，避免各处零散调用 git
+"""
+
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+_SNAPSHOT: Optional["GitSnapshot"] = None
+
+
+class GitError(Exception):
+    """git 命令执行失败（不在仓库中、git 不可用等）"""
+
+
+class GitSnapshot:
+    def __init__(self, head_sha: Optional[str], branch: Optional[str],
+                 last_commit_time: Optional[datetime], staged: List[str], modified: List[str],
+                 untracked: List[str], conflicted: List[str], raw_status: bytes):
+        self.head_sha = head_sha
+        self.branch = branch
+        self.last_commit_time = last_commit_time
+        self.staged = staged
+        self.modified = modified
+        self.untracked = untracked
+        self.conflicted = conflicted
+        self.raw_status = raw_status
+        self.taken_at = datetime.now()
+
+    @property
+    def changed_paths(self) -> List[str]:
+        """所有有改动的路径（暂存、未暂存、未跟踪、冲突），去重排序"""
+        return sorted(set(self.staged) | set(self.modified) | set(self.untracked) | set(self.conflicted))
+
+    @property
+    def is_clean(self) -> bool:
+        return not self.changed_paths
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "head_sha": self.head_sha,
+            "branch": self.branch,
+            "last_commit_time": self.last_commit_time.isoformat() if self.last_commit_time else None,
+            "staged": self.staged,
+            "modified": self.modified,
+            "untracked": self.untracked,
+            "conflicted": self.conflicted,
+        }
+
+
+def _run_git(args: List[str]) -> bytes:
+    try:
+        return subprocess.run(['git'] + args, capture_output=True, check=True).stdout
+    except FileNotFoundError as e:
+        raise GitError(f"git 不可用: {e}")
+    except subprocess.CalledProcessError as e:
+        raise GitError(f"git {' '.join(args)} 失败: {e.stderr.decode('utf-8', errors='replace').strip()}")
+
+
+def parse_porcelain_v2(raw: bytes) -> Dict[str, Any]:
+    """
+    解析 git status --porcelain=v2 -z --branch 输出
+
+    条目格式：
+        # branch.oid <sha|(initial)> / # branch.head <name|(detached)>
+        1 XY ... <path>                 普通改动
+        2 XY ... <path>\\0<origPath>     重命名/复制
+        u XY ... <path>                 冲突
+        ? <path>                        未跟踪
+    X 为暂存区状态，Y 为工作区状态，'.' 表示无改动
+    """
+    result: Dict[str, Any] = {
+        'head_sha': None, 'branch': None,
+        'staged': [], 'modified': [], 'untracked': [], 'conflicted': [],
+    }
+    tokens = raw.decode('utf-8', errors='surrogateescape').split('\0')
+    index = 0
+    while index < len(tokens):
+        entry = tokens[index]
+        index += 1
+        if not entry:
+            continue
+        kind = entry[0]
+        if kind == '#':
+            parts = entry.split(' ', 2)
+            if len(parts) == 3 and parts[1] == 'branch.oid' and parts[2] != '(initial)':
+                result['head_sha'] = parts[2]
+            elif len(parts) == 3 and parts[1] == 'branch.head' and parts[2] != '(detached)':
+                result['branch'] = parts[2]
+        elif kind == '1':
+            fields = entry.split(' ', 8)
+            _classify(result, fields[1], fields[8])
+        elif kind == '2':
+            fields = entry.split(' ', 9)
+            _classify(result, fields[1], fields[9])
+            index += 1  # 跳过原路径
+        elif kind == 'u':
+            fields = entry.split(' ', 10)
+            result['conflicted'].append(fields[10])
+        elif kind == '?':
+            result['untracked'].append(entry[2:])
+    return result
+
+
+def _classify(result: Dict[str, Any], xy: str, path: str):
+    if xy[0] != '.':
+        result['staged'].append(path)
+    if xy[1] != '.':
+        result['modified'].append(path)
+
+
+def get_git_state(refresh: bool = False) -> GitSnapshot:
+    """
+    获取仓库状态快照（进程内缓存）
+
+    Args:
+        refresh: 忽略缓存重新读取（仓库状态可能已变化时使用，例如 hook 改写文件之后）
+    """
+    global _SNAPSHOT
+    if _SNAPSHOT is not None and not refresh:
+        return _SNAPSHOT
+
+    raw_status = _run_git(['status', '--porcelain=v2', '-z', '--branch', '--untracked-files=all'])
+    parsed = parse_porcelain_v2(raw_status)
+
+    last_commit_time = None
+    if parsed['head_sha']:
+        timestamp = _run_git(['log', '-1', '--format=%ct', parsed['head_sha']]).decode('ascii').strip()
+        if timestamp:
+            last_commit_time = datetime.fromtimestamp(int(timestamp))
+
+    _SNAPSHOT = GitSnapshot(
+        head_sha=parsed['head_sha'],
+        branch=parsed['branch'],
+        last_commit_time=last_commit_time,
+        staged=sorted(parsed['staged']),
+        modified=sorted(parsed['modified']),
+        untracked=sorted(parsed['untracked']),
+        conflicted=sorted(parsed['conflicted']),
+        raw_status=raw_status,
+    )
+    return _SNAPSHOT
+
+
+def invalidate():
+    """清除缓存（执行了会改变仓库状态的操作之后调用）"""
+    global _SNAPSHOT
+    _SNAPSHOT = None
+
+
+# 使用示例
+if __name__ == "__main__":
+    import json
+
+    try:
+        snapshot = get_git_state()
+    except GitError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    print(json.dumps(snapshot.to_dict(), indent=2, ensure_ascii=False))
@@ -8,17 +8,33 @@ import os
 import sys
 import json
 import yaml
-import subprocess
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from error_logging_helper import StepDoneErrorLogger
+from yaml_patch_engine import YamlPatchError, patch_engine_from_plan
+from execution_checkpoint import ExecutionCheckpoint
+from verification_cache import VerificationCache, source_hash
+from sharded_test_runner import ShardedTestRunner, print_report
+from analysis_server import AnalysisServer, AnalysisServerError, format_issue, snapshot_sources
+from stream_runner import run_streaming
 
 class PlanExecutor:
-    def __init__(self, plan_file: str, log_directory: str = "documents/plan-logs"):
+    def __init__(self, plan_file: str, log_directory: str = "documents/plan-logs",
+                 resume: bool = True, use_verification_cache: bool = True,
+                 test_shards: Optional[int] = None, iterate: bool = False):
         self.plan_file = plan_file
         self.log_directory = log_directory
+        self.resume = resume
+        self.use_verification_cache = use_verification_cache
+        self.iterate = iterate
+        self.analysis_server: Optional[AnalysisServer] = None
+        self.verification_cache = VerificationCache(log_directory)
+        self.test_runner = ShardedTestRunner(log_directory, shards=test_shards, timeout=600,
+                                              source="plan_executor")
         self.logger = StepDoneErrorLogger(log_directory)
         self.ensure_log_directory()
+        self.checkpoint = ExecutionCheckpoint(plan_file, log_directory)
     
     def ensure_log_directory(self):
         """确保日志目录存在"""
@@ -35,7 +51,7 @@ class PlanExecutor:
             return {}
     
     def update_yaml_files(self, config: Dict[str, Any]) -> bool:
-        """更新YAML文件"""
+        """更新YAML文件（按文件分组批量应用，原子写入，失败整批回滚）"""
         print("📝 开始更新YAML文件...")
         
         yaml_updates = config.get('yaml_specification_updates', {})
@@ -52,10 +68,25 @@ class PlanExecutor:
                     field = change.get('field', '')
                     value = change.get('value', '')
                     print(f"    🔧 更新字段: {field} = {value}")
-                    # 这里应该根据change更新实际的YAML文件
-                    # 具体实现需要根据plan文档中的变更来生成
         
-        print("✅ YAML文件更新完成")
+        try:
+            result = patch_engine_from_plan(config).apply()
+        except YamlPatchError as e:
+            print(f"❌ YAML文件更新失败: {e}")
+            self.logger.log_error(
+                step_name="update_yaml_files",
+                error_content=str(e),
+                estimated_cause="字段路径与现有YAML结构不匹配或文件写入失败",
+                solution_attempted="整批回滚，所有YAML保持更新前的内容",
+                failure_manifestation="yaml_specification_updates 未能全部应用",
+                excluded_possibilities="排除了部分文件已更新的情况",
+                retry_count=0
+            )
+            return False
+        
+        for file_path in result['unchanged']:
+            print(f"  ⏭️ 内容未变化，跳过写入: {file_path}")
+        print(f"✅ YAML文件更新完成（{len(result['changed'])} 个文件，{result['changes']} 处变更）")
         return True
     
     def create_test_files(self, config: Dict[str, Any]) -> bool:
@@ -123,17 +154,39 @@ class PlanExecutor:
         """运行验证"""
         print("🔍 开始运行验证...")
         
+        # lib/、test/、pubspec.lock 未变化且上次验证通过时直接复用结果
+        verification_commands = ['flutter test', 'flutter analyze']
+        tree_hash = source_hash(extra=verification_commands)
+        if self.use_verification_cache:
+            cached = self.verification_cache.lookup(tree_hash)
+            if cached:
+                print(f"  ♻️ 复用验证结果: 输入哈希 {tree_hash[:12]} "
+                      f"已于 {cached['verified_at']} 通过（节省约 {cached['duration_seconds']}s）")
+                self.logger.log_error(
+                    step_name="run_verification_cached",
+                    error_content=f"复用验证结果，输入哈希 {tree_hash}",
+                    estimated_cause="lib/、test/、pubspec.lock 自上次通过后未变化",
+                    solution_attempted="跳过 flutter test / flutter analyze",
+                    failure_manifestation="无",
+                    excluded_possibilities="无",
+                    retry_count=0
+                )
+                print("✅ 验证完成")
+                return True
+        started = time.monotonic()
+        
         # 运行测试
-        print("  🧪 运行所有测试...")
-        try:
-            result = subprocess.run(['flutter', 'test'], capture_output=True, text=True, check=True, timeout=600)
+        print("  🧪 运行所有测试（分片并行）...")
+        report = self.test_runner.run()
+        print_report(report)
+        if report['success']:
             print("    ✅ 所有测试通过")
-        except subprocess.CalledProcessError as e:
-            print(f"    ❌ 测试失败: {e.stderr}")
+        else:
+            print(f"    ❌ 测试失败，合并报告: {report['report_path']}")
             self.logger.log_error(
                 step_name="run_tests",
-                error_content=str(e),
-                estimated_cause="测试执行失败",
+                error_content=json.dumps(report['failures'], ensure_ascii=False)[:4000],
+                estimated_cause="测试执行失败" if report['failed'] else "测试分片超时或异常退出",
                 solution_attempted="检查测试代码和依赖",
                 failure_manifestation="flutter test命令执行失败",
                 excluded_possibilities="排除了权限问题",
@@ -142,38 +195,109 @@ class PlanExecutor:
             return False
         
         # 运行分析
+        if self.analysis_server is not None:
+            return self.run_incremental_analysis() and self._store_verification(tree_hash, verification_commands, started)
+        
         print("  🔍 运行代码分析...")
-        try:
-            result = subprocess.run(['flutter', 'analyze'], capture_output=True, text=True, check=True, timeout=600)
+        result = run_streaming(['flutter', 'analyze'], self.log_directory, name="flutter_analyze", timeout=600)
+        if result.success:
             print("    ✅ 代码分析通过")
-        except subprocess.CalledProcessError as e:
-            print(f"    ❌ 代码分析失败: {e.stderr}")
+        else:
+            print(f"    ❌ 代码分析失败: {result.describe()}")
             self.logger.log_error(
                 step_name="run_analyze",
-                error_content=str(e),
-                estimated_cause="代码分析失败",
+                error_content=result.describe(),
+                estimated_cause="代码分析超时" if result.timed_out else "代码分析失败",
                 solution_attempted="修复代码问题",
                 failure_manifestation="flutter analyze命令执行失败",
                 excluded_possibilities="排除了权限问题",
-                retry_count=0
+                retry_count=0,
+                output_log=result.log_path,
+                output_tail=result.tail_text
             )
             return False
         
+        return self._store_verification(tree_hash, verification_commands, started)
+    
+    def _store_verification(self, tree_hash: str, commands: List[str], started: float) -> bool:
+        self.verification_cache.store(tree_hash, commands, time.monotonic() - started)
+        print(f"  💾 已缓存验证结果: 输入哈希 {tree_hash[:12]}")
         print("✅ 验证完成")
         return True
     
+    def run_incremental_analysis(self) -> bool:
+        """通过常驻分析服务做增量分析（只通知本轮变化的文件）"""
+        print("  🔍 运行增量代码分析（常驻分析服务）...")
+        started = time.monotonic()
+        try:
+            changes = self.analysis_server.refresh()
+        except AnalysisServerError as e:
+            print(f"    ⚠️ 分析服务异常，改用 flutter analyze: {e}")
+            self.analysis_server.stop()
+            self.analysis_server = None
+            return run_streaming(['flutter', 'analyze'], self.log_directory, name="flutter_analyze",
+                                 timeout=600).success
+        
+        changed = changes['created'] + changes['changed'] + changes['deleted']
+        issues = self.analysis_server.issues()
+        print(f"    ⏱️ 变化文件 {len(changed)} 个，分析耗时 {time.monotonic() - started:.1f}s")
+        if not issues:
+            print("    ✅ 代码分析通过")
+            return True
+        
+        print(f"    ❌ 代码分析发现 {len(issues)} 个问题")
+        for issue in issues[:50]:
+            print(f"      {format_issue(issue)}")
+        self.logger.log_error(
+            step_name="run_analyze",
+            error_content="\n".join(format_issue(issue) for issue in issues[:200]),
+            estimated_cause="代码分析失败",
+            solution_attempted="修复代码问题",
+            failure_manifestation="增量分析报告问题",
+            excluded_possibilities="排除了权限问题",
+            retry_count=0
+        )
+        return False
+    
+    def iterate_verification(self, config: Dict[str, Any]) -> bool:
+        """
+        迭代验证模式：保持一个分析服务进程，验证失败后等待 lib/、test/ 变化再重新验证，
+        直到通过或按 Ctrl+C 退出
+        """
+        print("🔁 迭代验证模式：启动常驻分析服务...")
+        self.analysis_server = AnalysisServer()
+        try:
+            self.analysis_server.start()
+        except AnalysisServerError as e:
+            print(f"  ⚠️ 无法启动分析服务，改用 flutter analyze: {e}")
+            self.analysis_server = None
+        
+        iteration = 0
+        try:
+            while True:
+                iteration += 1
+                print(f"🔁 第 {iteration} 轮验证")
+                if self.run_verification(config):
+                    return True
+                print("⏸️ 验证未通过，修改代码后将自动重新验证（Ctrl+C 退出）...")
+                baseline = snapshot_sources()
+                while snapshot_sources() == baseline:
+                    time.sleep(1)
+        except KeyboardInterrupt:
+            print("\n⏹️ 已退出迭代验证")
+            return False
+        finally:
+            if self.analysis_server is not None:
+                self.analysis_server.stop()
+                self.analysis_server = None
+    
     def run_precommit(self) -> bool:
         """运行pre-commit检查"""
         print("🔍 开始运行pre-commit检查...")
         
-        try:
-            result = subprocess.run(
-                ['pre-commit', 'run', '--all-files'],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=600
-            )
+        result = run_streaming(['pre-commit', 'run', '--all-files'], self.log_directory,
+                               name="precommit", timeout=600)
+        if result.success:
             print("✅ pre-commit检查通过")
             
             # 记录pre-commit成功日志
@@ -188,63 +312,59 @@ class PlanExecutor:
                 max_retries=3
             )
             return True
+        
+        print(f"❌ pre-commit检查失败: {result.describe()}")
+        
+        # 记录pre-commit失败日志（附带输出末尾）
+        self.logger.log_error(
+            step_name="precommit_check",
+            error_content=result.describe(),
+            estimated_cause="pre-commit检查超时" if result.timed_out else "pre-commit检查失败",
+            solution_attempted="修复代码质量问题",
+            failure_manifestation="pre-commit命令执行失败",
+            excluded_possibilities="排除了权限问题",
+            retry_count=0,
+            max_retries=3,
+            output_log=result.log_path,
+            output_tail=result.tail_text
+        )
+        
+        # 尝试修复pre-commit问题
+        print("🔧 尝试修复pre-commit问题...")
+        fix_result = run_streaming(['pre-commit', 'run', '--all-files', '--hook-stage', 'manual'],
+                                   self.log_directory, name="precommit_fix", timeout=600)
+        if fix_result.success:
+            print("✅ pre-commit问题修复成功")
             
-        except subprocess.CalledProcessError as e:
-            print(f"❌ pre-commit检查失败: {e.stderr}")
-            
-            # 记录pre-commit失败日志
+            # 记录修复成功日志
             self.logger.log_error(
-                step_name="precommit_check",
-                error_content=str(e),
-                estimated_cause="pre-commit检查失败",
-                solution_attempted="修复代码质量问题",
-                failure_manifestation="pre-commit命令执行失败",
-                excluded_possibilities="排除了权限问题",
+                step_name="precommit_fix",
+                error_content="pre-commit问题修复成功",
+                estimated_cause="代码质量问题已修复",
+                solution_attempted="运行pre-commit修复命令",
+                failure_manifestation="无",
+                excluded_possibilities="无",
                 retry_count=0,
                 max_retries=3
             )
-            
-            # 尝试修复pre-commit问题
-            print("🔧 尝试修复pre-commit问题...")
-            try:
-                # 运行pre-commit修复
-                result = subprocess.run(
-                    ['pre-commit', 'run', '--all-files', '--hook-stage', 'manual'],
-                    capture_output=True,
-                    text=True,
-                    check=True,
-                    timeout=600
-                )
-                print("✅ pre-commit问题修复成功")
-                
-                # 记录修复成功日志
-                self.logger.log_error(
-                    step_name="precommit_fix",
-                    error_content="pre-commit问题修复成功",
-                    estimated_cause="代码质量问题已修复",
-                    solution_attempted="运行pre-commit修复命令",
-                    failure_manifestation="无",
-                    excluded_possibilities="无",
-                    retry_count=0,
-                    max_retries=3
-                )
-                return True
-                
-            except subprocess.CalledProcessError as fix_error:
-                print(f"❌ pre-commit问题修复失败: {fix_error.stderr}")
-                
-                # 记录修复失败日志
-                self.logger.log_error(
-                    step_name="precommit_fix",
-                    error_content=str(fix_error),
-                    estimated_cause="pre-commit问题修复失败",
-                    solution_attempted="运行pre-commit修复命令",
-                    failure_manifestation="pre-commit修复命令执行失败",
-                    excluded_possibilities="排除了权限问题",
-                    retry_count=0,
-                    max_retries=3
-                )
-                return False
+            return True
+        
+        print(f"❌ pre-commit问题修复失败: {fix_result.describe()}")
+        
+        # 记录修复失败日志
+        self.logger.log_error(
+            step_name="precommit_fix",
+            error_content=fix_result.describe(),
+            estimated_cause="pre-commit问题修复失败",
+            solution_attempted="运行pre-commit修复命令",
+            failure_manifestation="pre-commit修复命令执行失败",
+            excluded_possibilities="排除了权限问题",
+            retry_count=0,
+            max_retries=3,
+            output_log=fix_result.log_path,
+            output_tail=fix_result.tail_text
+        )
+        return False
     
     def execute(self) -> bool:
         """执行完整的plan流程"""
@@ -258,28 +378,35 @@ class PlanExecutor:
             print("❌ 无法加载配置文件")
             return False
         
+        # 检查点：从第一个未完成或已失效的阶段继续
+        if not self.resume:
+            self.checkpoint.clear()
+        
         # 更新YAML文件
-        if not self.update_yaml_files(config):
+        if not self.checkpoint.run_phase("yaml_updates", lambda: self.update_yaml_files(config)):
             print("❌ YAML文件更新失败")
             return False
         
         # 创建/修改测试文件
-        if not self.create_test_files(config):
+        if not self.checkpoint.run_phase("test_creation", lambda: self.create_test_files(config)):
             print("❌ 测试文件创建/修改失败")
             return False
         
         # 实现代码
-        if not self.implement_code(config):
+        if not self.checkpoint.run_phase("implementation", lambda: self.implement_code(config)):
             print("❌ 代码实现失败")
             return False
         
-        # 运行验证
-        if not self.run_verification(config):
+        # 运行验证（结果依赖工作区内容，树哈希变化即重新验证）
+        verify = self.iterate_verification if self.iterate else self.run_verification
+        if not self.checkpoint.run_phase(
+            "verification", lambda: verify(config), tree_sensitive=True
+        ):
             print("❌ 验证失败")
             return False
         
         # 运行pre-commit检查
-        if not self.run_precommit():
+        if not self.checkpoint.run_phase("precommit", self.run_precommit, tree_sensitive=True):
             print("❌ pre-commit检查失败")
             return False
         
@@ -288,18 +415,35 @@ class PlanExecutor:
 
 # 使用示例
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("用法: python plan_executor.py <plan_file>")
-        print("示例: python plan_executor.py documents/plan/251025-1-plan.yaml")
-        sys.exit(1)
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="执行plan流程",
+        epilog="示例: python plan_executor.py documents/plan/251025-1-plan.yaml",
+    )
+    parser.add_argument('plan_file', help='plan配置文件路径')
+    parser.add_argument('--fresh', action='store_true', help='忽略检查点，从第一个阶段重新执行')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='不复用已缓存的验证结果，强制重新运行 flutter test / analyze')
+    parser.add_argument('--shards', type=int, default=None,
+                        help='flutter test 并行分片数（默认 CPU 核数的一半，至少 2）')
+    parser.add_argument('--iterate', action='store_true',
+                        help='迭代验证：常驻分析服务做增量分析，失败后等待代码变化自动重新验证')
+    args = parser.parse_args()
     
-    plan_file = sys.argv[1]
+    plan_file = args.plan_file
     
     if not os.path.exists(plan_file):
         print(f"❌ 文件不存在: {plan_file}")
         sys.exit(1)
     
-    executor = PlanExecutor(plan_file)
+    executor = PlanExecutor(
+        plan_file,
+        resume=not args.fresh,
+        use_verification_cache=not args.no_cache,
+        test_shards=args.shards,
+        iterate=args.iterate,
+    )
     success = executor.execute()
     
     if success:
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+分片并行 flutter test 运行器
+用于 plan / step-done 执行器把 test/ 拆成 N 个分片并行运行，再合并为一份结果
+
+分片策略：
+- 有历史耗时记录时：按每个测试文件的耗时做最长处理时间优先（LPT）分配，各分片显式传入文件列表
+- 无历史记录时：退化为 flutter 自带的 --total-shards/--shard-index
+各分片的 --concurrency 为 CPU 核数 / 分片数，分片合计的测试并发不超过核数；
+每个分片以 --machine 运行，解析事件流得到测试结果与每个文件的耗时，写入 timing_db 供下次分片与耗时报告使用
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence
+
+from timing_db import TestTimingDB
+
+# 分片运行期间输出进度的间隔（秒）
+PROGRESS_INTERVAL = 15
+
+
+def discover_test_files(paths: Sequence[str] = ("test",)) -> List[str]:
+    """收集 *_test.dart（相对路径，已排序）"""
+    files = []
+    for root in paths:
+        if os.path.isfile(root):
+            files.append(root)
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            files.extend(
+                os.path.join(dirpath, name) for name in filenames if name.endswith('_test.dart')
+            )
+    return sorted(os.path.normpath(f).replace(os.sep, '/') for f in files)
+
+
+def partition_by_duration(files: List[str], durations: Dict[str, float], shards: int) -> List[List[str]]:
+    """
+    最长处理时间优先：按耗时从大到小依次放入当前总耗时最小的分片
+
+    没有记录的文件按已知耗时的中位数估算，避免新文件全部挤进同一个分片。
+    """
+    known = sorted(durations[f] for f in files if f in durations)
+    default = known[len(known) // 2] if known else 1.0
+    weighted = sorted(files, key=lambda f: (-durations.get(f, default), f))
+
+    buckets: List[List[str]] = [[] for _ in range(shards)]
+    totals = [0.0] * shards
+    for test_file in weighted:
+        index = totals.index(min(totals))
+        buckets[index].append(test_file)
+        totals[index] += durations.get(test_file, default)
+    return [sorted(bucket) for bucket in buckets if bucket]
+
+
+def parse_machine_events(lines) -> Dict[str, Any]:
+    """
+    解析 flutter test --machine 的 JSON 事件流
+
+    Returns:
+        {"tests": [...], "files": {path: 秒}, "success": bool|None}
+        tests 中每项为 {name, file, result, skipped, duration_ms, error}
+    """
+    suites: Dict[int, str] = {}
+    starts: Dict[int, Dict[str, Any]] = {}
+    tests: List[Dict[str, Any]] = []
+    errors: Dict[int, List[str]] = {}
+    file_spans: Dict[str, List[int]] = {}
+    success: Optional[bool] = None
+
+    for raw in lines:
+        raw = raw.strip()
+        if not raw.startswith('{'):
+            continue
+        try:
+            event = json.loads(raw)
+        except ValueError:
+            continue
+        kind = event.get('type')
+        if kind == 'suite':
+            suite = event['suite']
+            suites[suite['id']] = _relative_test_path(suite.get('path') or '')
+        elif kind == 'testStart':
+            test = event['test']
+            starts[test['id']] = {
+                'name': test.get('name', ''),
+                'file': suites.get(test.get('suiteID'), ''),
+                'start': event.get('time', 0),
+            }
+        elif kind == 'error':
+            errors.setdefault(event.get('testID'), []).append(
+                f"{event.get('error', '')}\n{event.get('stackTrace', '')}".strip()
+            )
+        elif kind == 'testDone':
+            started = starts.get(event.get('testID'))
+            if started is None:
+                continue
+            span = file_spans.setdefault(started['file'], [started['start'], event.get('time', 0)])
+            span[0] = min(span[0], started['start'])
+            span[1] = max(span[1], event.get('time', 0))
+            # hidden 为 "loading xxx_test.dart" 之类的内部测试：只计入文件耗时，不计入结果
+            if event.get('hidden'):
+                continue
+            tests.append({
+                'name': started['name'],
+                'file': started['file'],
+                'result': event.get('result', 'error'),
+                'skipped': bool(event.get('skipped')),
+                'duration_ms': event.get('time', 0) - started['start'],
+                'error': '\n'.join(errors.get(event.get('testID'), [])),
+            })
+        elif kind == 'done':
+            success = event.get('success')
+
+    return {
+        'tests': tests,
+        'files': {path: (end - start) / 1000.0 for path, (start, end) in file_spans.items() if path},
+        'success': success,
+    }
+
+
+def _count_done(output_path: str) -> int:
+    """分片输出中已完成的测试数（进度显示用）"""
+    with open(output_path, 'r', encoding='utf-8', errors='replace') as f:
+        return sum(1 for line in f if '"testDone"' in line and '"hidden":true' not in line)
+
+
+def _relative_test_path(path: str) -> str:
+    if path.startswith('file://'):
+        path = path[len('file://'):]
+    if os.path.isabs(path):
+        try:
+            path = os.path.relpath(path)
+        except ValueError:
+            pass
+    return path.replace(os.sep, '/')
+
+
+class ShardedTestRunner:
+    def __init__(self, log_directory: str = "documents/plan-logs", shards: Optional[int] = None,
+                 timeout: int = 600, source: str = "sharded_test_runner"):
+        self.log_directory = log_directory
+        self.shard_directory = os.path.join(log_directory, "test-shards")
+        self.source = source
+        self.shards = max(1, shards or max(2, (os.cpu_count() or 2) // 2))
+        self.timeout = timeout
+
+    def load_durations(self) -> Dict[str, float]:
+        """每个测试文件最近几次运行的耗时中位数（秒）"""
+        db = TestTimingDB(self.log_directory)
+        try:
+            return db.file_durations()
+        finally:
+            db.close()
+
+    def plan_shards(self, paths: Sequence[str] = ("test",)) -> List[List[str]]:
+        """
+        生成每个分片的命令参数
+
+        Returns:
+            每个分片追加在 flutter test 之后的参数列表
+        """
+        files = discover_test_files(paths)
+        durations = self.load_durations()
+        shards = min(self.shards, len(files)) or 1
+        if shards > 1 and any(f in durations for f in files):
+            return partition_by_duration(files, durations, shards)
+        if shards == 1:
+            return [list(paths)]
+        return [
+            ['--total-shards', str(shards), '--shard-index', str(index)] + list(paths)
+            for index in range(shards)
+        ]
+
+    @staticmethod
+    def shard_concurrency(shard_count: int) -> int:
+        """每个分片的 flutter test --concurrency：分片之间平分 CPU 核数"""
+        return max(1, (os.cpu_count() or 2) // max(1, shard_count))
+
+    def run(self, paths: Sequence[str] = ("test",), extra_args: Sequence[str] = ()) -> Dict[str, Any]:
+        """
+        并行运行全部分片并合并结果
+
+        Returns:
+            合并后的报告：{success, exit_code, shards, passed, failed, skipped, failures, duration_seconds, report_path}
+        """
+        os.makedirs(self.shard_directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        shard_args = self.plan_shards(paths)
+        started = time.monotonic()
+        # flutter test 默认并发约为核数的一半，N 个分片各自如此会同时跑起数倍于核数的测试进程
+        concurrency = []
+        if not any(a == '-j' or a.startswith(('--concurrency', '-j')) for a in extra_args):
+            concurrency = [f'--concurrency={self.shard_concurrency(len(shard_args))}']
+
+        processes = []
+        for index, args in enumerate(shard_args):
+            output_path = os.path.join(self.shard_directory, f"shard_{stamp}_{index}.jsonl")
+            output = open(output_path, 'w', encoding='utf-8')
+            command = ['flutter', 'test', '--machine'] + concurrency + list(extra_args) + args
+            print(f"  🧩 分片 {index + 1}/{len(shard_args)}: {' '.join(command[:8])}{' ...' if len(command) > 8 else ''}")
+            process = subprocess.Popen(command, stdout=output, stderr=subprocess.STDOUT, text=True)
+            processes.append((index, process, output, output_path))
+
+        # 等待全部分片；期间定期输出各分片进度，卡住的测试不会长时间毫无输出
+        exit_codes: Dict[int, Optional[int]] = {}
+        last_progress = time.monotonic()
+        while len(exit_codes) < len(processes):
+            timed_out = time.monotonic() - started > self.timeout
+            for index, process, output, output_path in processes:
+                if index in exit_codes:
+                    continue
+                if process.poll() is not None:
+                    exit_codes[index] = process.returncode
+                elif timed_out:
+                    process.kill()
+                    process.wait()
+                    exit_codes[index] = None
+                else:
+                    continue
+                output.close()
+            if time.monotonic() - last_progress >= PROGRESS_INTERVAL and len(exit_codes) < len(processes):
+                last_progress = time.monotonic()
+                print(f"  ⏱️ {last_progress - started:.0f}s " + "，".join(
+                    f"分片{index}: {'完成' if index in exit_codes else f'{_count_done(output_path)} 个测试'}"
+                    for index, _, _, output_path in processes
+                ))
+            time.sleep(0.2)
+
+        shard_results = []
+        for index, process, output, output_path in processes:
+            with open(output_path, 'r', encoding='utf-8', errors='replace') as f:
+                parsed = parse_machine_events(f)
+            parsed.update({'index': index, 'exit_code': exit_codes[index], 'log': output_path})
+            shard_results.append(parsed)
+
+        report = self.merge(shard_results, time.monotonic() - started)
+        if any(shard['tests'] for shard in shard_results):
+            db = TestTimingDB(self.log_directory)
+            try:
+                report['timing_run_id'] = db.record_run(shard_results, self.source)
+                report['regressions'] = db.regressions()[:5]
+            finally:
+                db.close()
+
+        report_path = os.path.join(self.log_directory, f"test_report_{stamp}.json")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        report['report_path'] = report_path
+        return report
+
+    @staticmethod
+    def merge(shard_results: List[Dict[str, Any]], duration_seconds: float) -> Dict[str, Any]:
+        """合并各分片结果；任一分片超时/异常退出/有失败用例即整体失败"""
+        tests = [test for shard in shard_results for test in shard['tests']]
+        failures = [t for t in tests if t['result'] != 'success']
+        skipped = [t for t in tests if t['skipped'] and t['result'] == 'success']
+
+        exit_codes = [shard['exit_code'] for shard in shard_results]
+        broken_shards = [
+            shard['index'] for shard in shard_results
+            if shard['exit_code'] is None or (shard['exit_code'] != 0 and not shard['tests'])
+        ]
+        if failures or broken_shards:
+            exit_code = next((code for code in exit_codes if code not in (0, None)), 1)
+        else:
+            exit_code = next((code for code in exit_codes if code not in (0, None)), 0)
+
+        return {
+            'success': exit_code == 0,
+            'exit_code': exit_code,
+            'shards': [
+                {
+                    'index': shard['index'],
+                    'exit_code': shard['exit_code'],
+                    'tests': len(shard['tests']),
+                    'files': len(shard['files']),
+                    'log': shard['log'],
+                }
+                for shard in shard_results
+            ],
+            'broken_shards': broken_shards,
+            'passed': len(tests) - len(failures) - len(skipped),
+            'failed': len(failures),
+            'skipped': len(skipped),
+            'failures': [
+                {'name': t['name'], 'file': t['file'], 'result': t['result'], 'error': t['error']}
+                for t in failures
+            ],
+            'duration_seconds': round(duration_seconds, 1),
+        }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"  📊 {len(report['shards'])} 个分片，通过 {report['passed']}，失败 {report['failed']}，"
+          f"跳过 {report['skipped']}，耗时 {report['duration_seconds']}s")
+    for index in report['broken_shards']:
+        print(f"    ⚠️ 分片 {index} 超时或未产生任何测试结果，详见 {report['shards'][index]['log']}")
+    for item in report.get('regressions', []):
+        print(f"    🐢 耗时回归 {item['change']}: {item['file']}: {item['name']} "
+              f"({item['baseline_median_ms']}ms → {item['latest_ms']}ms)")
+    for failure in report['failures']:
+        print(f"    ❌ {failure['file']}: {failure['name']}")
+        if failure['error']:
+            print('       ' + failure['error'].splitlines()[0][:200])
+
+
+# 使用示例
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='分片并行运行 flutter test')
+    parser.add_argument('paths', nargs='*', default=['test'], help='测试目录或文件（默认 test）')
+    parser.add_argument('--shards', type=int, default=None, help='分片数（默认 CPU 核数的一半，至少 2）')
+    parser.add_argument('--timeout', type=int, default=600, help='整体超时秒数（默认 600）')
+    parser.add_argument('--plan', action='store_true', help='只打印分片方案，不运行')
+    args = parser.parse_args()
+
+    runner = ShardedTestRunner(shards=args.shards, timeout=args.timeout)
+    if args.plan:
+        for index, shard in enumerate(runner.plan_shards(args.paths)):
+            print(f"分片 {index}: {' '.join(shard)}")
+        sys.exit(0)
+
+    result = runner.run(args.paths)
+    print_report(result)
+    print(f"  📄 合并报告: {result['report_path']}")
+    sys.exit(result['exit_code'])
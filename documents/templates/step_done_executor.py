@@ -8,17 +8,26 @@ import os
 import sys
 import json
 import yaml
-import subprocess
 from datetime import datetime
 from typing import Dict, Any, Optional
 from git_commit_helper import StepDoneGitHandler
+from git_state import GitError, get_git_state
+from yaml_patch_engine import YamlPatchError, patch_engine_from_step_done
+from execution_checkpoint import ExecutionCheckpoint
+from sharded_test_runner import ShardedTestRunner, print_report
+from stream_runner import run_streaming
 
 class StepDoneExecutor:
-    def __init__(self, step_done_file: str, log_directory: str = "documents/plan-logs"):
+    def __init__(self, step_done_file: str, log_directory: str = "documents/plan-logs",
+                 resume: bool = True, test_shards: Optional[int] = None):
         self.step_done_file = step_done_file
         self.log_directory = log_directory
+        self.resume = resume
+        self.test_runner = ShardedTestRunner(log_directory, shards=test_shards, timeout=300,
+                                              source="step_done_executor")
         self.git_handler = StepDoneGitHandler(log_directory)
         self.ensure_log_directory()
+        self.checkpoint = ExecutionCheckpoint(step_done_file, log_directory)
     
     def ensure_log_directory(self):
         """确保日志目录存在"""
@@ -35,30 +44,44 @@ class StepDoneExecutor:
             return {}
     
     def update_yaml_files(self, config: Dict[str, Any]) -> bool:
-        """更新YAML文件"""
+        """更新YAML文件（按文件分组批量应用，原子写入，失败整批回滚）"""
         print("📝 开始更新YAML文件...")
         
         yaml_updates = config.get('yaml_updates', {})
         new_files = yaml_updates.get('new_yaml_files', {}).get('files', [])
         modified_files = yaml_updates.get('modified_yaml_files', {}).get('files', [])
+        architecture_files = yaml_updates.get('architecture_updates', {}).get('files', [])
         
-        # 处理新文件
         for file_info in new_files:
             file_path = file_info.get('file', '')
             if file_path:
                 print(f"  📄 创建新YAML文件: {file_path}")
-                # 这里应该根据file_info创建实际的YAML文件
-                # 具体实现需要根据step文档中的代码实现来生成
         
-        # 处理修改文件
-        for file_info in modified_files:
+        for file_info in modified_files + architecture_files:
             file_path = file_info.get('file', '')
             if file_path:
                 print(f"  📝 修改YAML文件: {file_path}")
-                # 这里应该根据file_info修改实际的YAML文件
-                # 具体实现需要根据step文档中的代码实现来生成
         
-        print("✅ YAML文件更新完成")
+        try:
+            result = patch_engine_from_step_done(config).apply()
+        except YamlPatchError as e:
+            print(f"❌ YAML文件更新失败: {e}")
+            self.git_handler.logger.log_error(
+                step_name="update_yaml_files",
+                error_content=str(e),
+                estimated_cause="字段路径与现有YAML结构不匹配或文件写入失败",
+                solution_attempted="整批回滚，所有YAML保持更新前的内容",
+                failure_manifestation="yaml_updates 未能全部应用",
+                excluded_possibilities="排除了部分文件已更新的情况",
+                retry_count=0
+            )
+            return False
+        
+        for file_path in result['unchanged']:
+            print(f"  ⏭️ 内容未变化，跳过写入: {file_path}")
+        for file_path in result['skipped']:
+            print(f"  ⚠️ 架构索引文件不存在，已跳过: {file_path}")
+        print(f"✅ YAML文件更新完成（{len(result['changed'])} 个文件，{result['changes']} 处变更）")
         return True
     
     def create_test_files(self, config: Dict[str, Any]) -> bool:
@@ -116,17 +139,19 @@ class StepDoneExecutor:
         for step in steps:
             print(f"  🧪 执行: {step.get('step', '')}")
             command = step.get('command', '')
-            if command:
-                try:
-                    result = subprocess.run(command.split(), capture_output=True, text=True, check=True, timeout=300)
-                    print(f"    ✅ 成功: {command}")
-                except subprocess.CalledProcessError as e:
+            tokens = command.split()
+            # 只带路径参数的 flutter test 交给分片运行器并行执行
+            if tokens[:2] == ['flutter', 'test'] and not any(t.startswith('-') for t in tokens[2:]):
+                report = self.test_runner.run(tokens[2:] or ['test'])
+                print_report(report)
+                if not report['success']:
                     print(f"    ❌ 失败: {command}")
-                    print(f"    错误: {e.stderr}")
-                    return False
-                except subprocess.TimeoutExpired:
-                    print(f"    ⏳ 超时: {command}")
+                    print(f"    合并报告: {report['report_path']}")
                     return False
+                print(f"    ✅ 成功: {command}")
+                continue
+            if command and not self.run_command(command, step_name="run_verification"):
+                return False
         
         # 运行覆盖率检查
         coverage_check = verification.get('coverage_check', {})
@@ -134,41 +159,40 @@ class StepDoneExecutor:
         for step in steps:
             print(f"  📊 执行: {step.get('step', '')}")
             command = step.get('command', '')
-            if command:
-                try:
-                    result = subprocess.run(command.split(), capture_output=True, text=True, check=True, timeout=300)
-                    print(f"    ✅ 成功: {command}")
-                except subprocess.CalledProcessError as e:
-                    print(f"    ❌ 失败: {command}")
-                    print(f"    错误: {e.stderr}")
-                    return False
-                except subprocess.TimeoutExpired:
-                    print(f"    ⏳ 超时: {command}")
-                    return False
+            if command and not self.run_command(command, step_name="run_verification"):
+                return False
         
         print("✅ 验证完成")
         return True
     
+    def run_command(self, command: str, step_name: str, timeout: int = 300) -> bool:
+        """流式运行验证命令；失败时把输出末尾附加到错误日志"""
+        result = run_streaming(command.split(), self.log_directory, timeout=timeout)
+        if result.success:
+            print(f"    ✅ 成功: {command}")
+            return True
+        print(f"    {'⏳ 超时' if result.timed_out else '❌ 失败'}: {command}")
+        print(f"    完整输出: {result.log_path}")
+        self.git_handler.logger.log_error(
+            step_name=step_name,
+            error_content=result.describe(),
+            estimated_cause="命令执行超时" if result.timed_out else "命令执行失败",
+            solution_attempted="检查输出末尾定位问题",
+            failure_manifestation=f"{command} 未通过",
+            excluded_possibilities="排除了权限问题",
+            retry_count=0,
+            output_log=result.log_path,
+            output_tail=result.tail_text
+        )
+        return False
+    
     def handle_git_commit(self, config: Dict[str, Any]) -> bool:
         """仅运行pre-commit并输出建议的提交命令（不自动提交）"""
         print("📤 开始运行pre-commit检查（不自动提交）...")
-        try:
-            result = subprocess.run(
-                ['pre-commit', 'run', '--all-files'],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=600,
-            )
-            print("✅ pre-commit检查通过")
-        except subprocess.CalledProcessError as e:
+        if not self.run_command('pre-commit run --all-files', step_name="precommit_check", timeout=600):
             print("❌ pre-commit检查未通过")
-            print(e.stdout)
-            print(e.stderr)
-            return False
-        except subprocess.TimeoutExpired:
-            print("⏳ pre-commit检查超时")
             return False
+        print("✅ pre-commit检查通过")
 
         iteration = (
             (config.get('meta') or {}).get('iteration')
@@ -180,6 +204,16 @@ class StepDoneExecutor:
             "注意: 按需在提交体中附加本次涉及的文档与测试清单。"
         )
 
+        try:
+            # pre-commit 可能改写了文件，重新读取快照
+            snapshot = get_git_state(refresh=True)
+            print(f"📋 待提交改动: 已暂存 {len(snapshot.staged)}，未暂存 {len(snapshot.modified)}，"
+                  f"未跟踪 {len(snapshot.untracked)}")
+            for path in snapshot.changed_paths:
+                print(f"    {path}")
+        except GitError as e:
+            print(f"⚠️ 无法读取git状态: {e}")
+
         print("🔎 建议的提交命令（请手动执行）:")
         print("""
 git add -A
@@ -200,23 +234,31 @@ git commit -m "{title}" -m "{body}"
             print("❌ 无法加载配置文件")
             return False
         
+        # 检查点：从第一个未完成或已失效的阶段继续
+        if not self.resume:
+            self.checkpoint.clear()
+        
         # 更新YAML文件
-        if not self.update_yaml_files(config):
+        if not self.checkpoint.run_phase("yaml_updates", lambda: self.update_yaml_files(config)):
             print("❌ YAML文件更新失败")
             return False
         
         # 创建测试文件
-        if not self.create_test_files(config):
+        if not self.checkpoint.run_phase("test_creation", lambda: self.create_test_files(config)):
             print("❌ 测试文件创建失败")
             return False
         
-        # 运行验证
-        if not self.run_verification(config):
+        # 运行验证（结果依赖工作区内容，树哈希变化即重新验证）
+        if not self.checkpoint.run_phase(
+            "verification", lambda: self.run_verification(config), tree_sensitive=True
+        ):
             print("❌ 验证失败")
             return False
         
         # 处理git提交（仅运行pre-commit并输出建议的提交命令）
-        if not self.handle_git_commit(config):
+        if not self.checkpoint.run_phase(
+            "git_commit", lambda: self.handle_git_commit(config), tree_sensitive=True
+        ):
             print("❌ Git提交失败")
             return False
         
@@ -225,18 +267,25 @@ git commit -m "{title}" -m "{body}"
 
 # 使用示例
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("用法: python step_done_executor.py <step_done_file>")
-        print("示例: python step_done_executor.py documents/plan/251025-1-step-done.yaml")
-        sys.exit(1)
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="执行step-done流程",
+        epilog="示例: python step_done_executor.py documents/plan/251025-1-step-done.yaml",
+    )
+    parser.add_argument('step_done_file', help='step-done配置文件路径')
+    parser.add_argument('--fresh', action='store_true', help='忽略检查点，从第一个阶段重新执行')
+    parser.add_argument('--shards', type=int, default=None,
+                        help='flutter test 并行分片数（默认 CPU 核数的一半，至少 2）')
+    args = parser.parse_args()
     
-    step_done_file = sys.argv[1]
+    step_done_file = args.step_done_file
     
     if not os.path.exists(step_done_file):
         print(f"❌ 文件不存在: {step_done_file}")
         sys.exit(1)
     
-    executor = StepDoneExecutor(step_done_file)
+    executor = StepDoneExecutor(step_done_file, resume=not args.fresh, test_shards=args.shards)
     success = executor.execute()
     
     if success:
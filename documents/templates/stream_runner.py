@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+流式子进程运行工具
+用于执行器运行 flutter / pre-commit 等长时间命令：逐行实时输出并写入本次运行的日志文件，
+内存中只保留最后若干行（失败时附加到错误日志），避免整段输出堆在内存里、进程结束前看不到任何进度
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import List, Optional
+
+
+DEFAULT_TAIL_LINES = 200
+
+
+class StreamResult:
+    def __init__(self, command: List[str], returncode: Optional[int], tail: List[str],
+                 log_path: str, duration: float, timed_out: bool):
+        self.command = command
+        self.returncode = returncode
+        self.tail = tail
+        self.log_path = log_path
+        self.duration = duration
+        self.timed_out = timed_out
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+    @property
+    def tail_text(self) -> str:
+        return ''.join(self.tail)
+
+    def describe(self) -> str:
+        """简短的失败描述（用于错误日志的 error_content）"""
+        command = ' '.join(self.command)
+        if self.timed_out:
+            return f"{command} 超时（{self.duration:.0f}s），完整输出: {self.log_path}"
+        return f"{command} 退出码 {self.returncode}，完整输出: {self.log_path}"
+
+
+def run_streaming(command: List[str], log_directory: str = "documents/plan-logs", name: Optional[str] = None,
+                  timeout: Optional[float] = None, tail_lines: int = DEFAULT_TAIL_LINES,
+                  echo: bool = True, prefix: str = "    │ ") -> StreamResult:
+    """
+    运行命令并逐行流式处理输出（stderr 合并到 stdout）
+
+    Args:
+        command: 命令及参数
+        log_directory: 日志根目录，完整输出写入 <log_directory>/runs/<name>_<时间戳>.log
+        name: 日志文件名前缀（默认取命令名）
+        timeout: 超时秒数，超时后终止进程
+        tail_lines: 内存中保留的最后行数
+        echo: 是否实时打印输出
+        prefix: 实时打印时的行前缀
+
+    Returns:
+        StreamResult（returncode 为 None 表示超时被终止）
+    """
+    run_directory = os.path.join(log_directory, "runs")
+    os.makedirs(run_directory, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    label = name or os.path.basename(command[0])
+    log_path = os.path.join(run_directory, f"{label}_{stamp}.log")
+    suffix = 1
+    while os.path.exists(log_path):
+        suffix += 1
+        log_path = os.path.join(run_directory, f"{label}_{stamp}_{suffix}.log")
+
+    tail: deque = deque(maxlen=tail_lines)
+    started = time.monotonic()
+    timed_out = threading.Event()
+
+    with open(log_path, 'w', encoding='utf-8') as log_file:
+        log_file.write(f"$ {' '.join(command)}\n")
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, encoding='utf-8', errors='replace', bufsize=1,
+        )
+
+        def kill_on_timeout():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(timeout, kill_on_timeout) if timeout else None
+        if timer:
+            timer.daemon = True
+            timer.start()
+        try:
+            for line in process.stdout:
+                log_file.write(line)
+                tail.append(line)
+                if echo:
+                    sys.stdout.write(prefix + line)
+                    sys.stdout.flush()
+            process.wait()
+        finally:
+            if timer:
+                timer.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+    return StreamResult(
+        command=command,
+        returncode=None if timed_out.is_set() else process.returncode,
+        tail=list(tail),
+        log_path=log_path,
+        duration=time.monotonic() - started,
+        timed_out=timed_out.is_set(),
+    )
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+git_commit_helper 重试逻辑的测试（不调用 git / pre-commit）
+
+运行：python -m unittest documents/templates/test_git_commit_helper.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from git_commit_helper import StepDoneGitHandler
+
+
+class FakeHandler(StepDoneGitHandler):
+    """用内存中的“工作区状态”替代 git：fingerprint 即状态字符串"""
+
+    def __init__(self, log_directory: str, results, hook_rewrites: bool):
+        super().__init__(log_directory)
+        self.sleep = lambda seconds: None
+        self.results = list(results)
+        self.hook_rewrites = hook_rewrites
+        self.tree = 'clean'
+        self.runs = 0
+
+    def should_run_precommit(self) -> bool:
+        return True
+
+    def working_tree_fingerprint(self):
+        return self.tree
+
+    def run_precommit(self):
+        self.runs += 1
+        success = self.results.pop(0)
+        if not success and self.hook_rewrites:
+            # 模拟 end-of-file-fixer 等 hook 自动修复文件后以失败退出
+            self.tree = f'fixed-by-hook-{self.runs}'
+        return success, '' if success else 'hook failed'
+
+
+class HandleCommitWithRetryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_hook_rewrite_triggers_rerun(self):
+        handler = FakeHandler(self.tmp.name, [False, True], hook_rewrites=True)
+        self.assertTrue(handler.handle_commit_with_retry())
+        self.assertEqual(handler.runs, 2)
+
+    def test_unchanged_tree_skips_rerun(self):
+        handler = FakeHandler(self.tmp.name, [False], hook_rewrites=False)
+        self.assertFalse(handler.handle_commit_with_retry())
+        self.assertEqual(handler.runs, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+yaml_patch_engine 的测试（step-done 新文件、架构索引文件、逐行改写）
+
+运行：python -m unittest documents/templates/test_yaml_patch_engine.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import yaml
+
+TEMPLATES_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TEMPLATES_DIR)
+sys.path.insert(0, os.path.join(TEMPLATES_DIR, '..', '..', 'scripts'))
+from yaml_patch_engine import YamlPatchEngine, YamlPatchError, patch_engine_from_step_done
+from architecture_schema import validate
+
+WIDGET_YAML = 'documents/architecture/widgets/task_chip.yaml'
+
+
+def step_done(new_files=(), architecture_files=()):
+    return {'yaml_updates': {
+        'new_yaml_files': {'files': list(new_files)},
+        'architecture_updates': {'files': list(architecture_files)},
+    }}
+
+
+NEW_WIDGET = {
+    'file': WIDGET_YAML,
+    'based_on': 'step 3',
+    'file_path': 'lib/presentation/widgets/task_chip.dart',
+    'class_name': 'TaskChip',
+    'type': 'widget',
+    'description': '任务标签',
+    'properties': [{'name': 'label', 'type': 'String', 'description': '文字'}],
+    'methods': [{'name': 'build', 'return_type': 'Widget', 'description': '构建'}],
+    'dependencies': ['flutter'],
+    'called_by': ['lib/presentation/tasks/tasks_page.dart'],
+}
+
+
+class StepDoneTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = self.tmp.name
+
+    def read(self, rel):
+        with open(os.path.join(self.root, rel), 'r', encoding='utf-8') as f:
+            return yaml.safe_load(f)
+
+    def test_missing_architecture_index_is_skipped(self):
+        config = step_done([NEW_WIDGET], [{
+            'file': 'documents/architecture/widgets.yaml',
+            'changes': [{'field': '新增组件', 'value': ['TaskChip']}],
+        }])
+        result = patch_engine_from_step_done(config, self.root).apply()
+        self.assertEqual(result['skipped'], ['documents/architecture/widgets.yaml'])
+        self.assertEqual(result['changed'], [WIDGET_YAML])
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'documents/architecture/widgets.yaml')))
+
+    def test_existing_architecture_index_is_updated(self):
+        index = os.path.join(self.root, 'documents/architecture/pages.yaml')
+        os.makedirs(os.path.dirname(index))
+        with open(index, 'w', encoding='utf-8') as f:
+            f.write('# 页面索引\npages: []\n')
+        config = step_done(architecture_files=[{
+            'file': 'documents/architecture/pages.yaml',
+            'changes': [{'field': 'pages', 'value': ['TasksPage']}],
+        }])
+        result = patch_engine_from_step_done(config, self.root).apply()
+        self.assertEqual(result['skipped'], [])
+        with open(index, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), '# 页面索引\npages:\n- TasksPage\n')
+
+    def test_new_widget_follows_template(self):
+        patch_engine_from_step_done(step_done([NEW_WIDGET]), self.root).apply()
+        doc = self.read(WIDGET_YAML)
+        self.assertEqual(doc['meta']['file_path'], 'lib/presentation/widgets/task_chip.dart')
+        self.assertEqual(doc['meta']['name'], 'TaskChip')
+        self.assertEqual(doc['meta']['type'], 'widget')
+        self.assertEqual(doc['widget_definition']['name'], 'TaskChip')
+        self.assertEqual(doc['widget_properties'], NEW_WIDGET['properties'])
+        self.assertEqual(doc['called_by'], NEW_WIDGET['called_by'])
+        self.assertNotIn('class_name', doc)
+        self.assertEqual(validate(doc, Path(self.root, WIDGET_YAML)), [])
+
+    def test_new_architecture_doc_requires_source_path(self):
+        entry = {k: v for k, v in NEW_WIDGET.items() if k != 'file_path'}
+        with self.assertRaises(YamlPatchError):
+            patch_engine_from_step_done(step_done([entry]), self.root)
+
+
+class LinePatchTest(unittest.TestCase):
+    def test_comments_and_order_are_kept(self):
+        text = '# 注释\nmeta:\n  name: a  # 名称\n  description: "旧"\nsteps: []\n'
+        patched = YamlPatchEngine.patch_text(text, 'meta.description', '新')
+        self.assertEqual(patched, '# 注释\nmeta:\n  name: a  # 名称\n  description: 新\nsteps: []\n')
+
+    def test_list_index_is_not_line_patched(self):
+        self.assertIsNone(YamlPatchEngine.patch_text('items:\n- name: a\n', 'items[0].name', 'b'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+测试耗时数据库
+用于记录每次 flutter test --machine 运行中每个测试与每个测试文件的耗时（本地 SQLite），
+并提供最慢测试报告与耗时回归趋势
+"""
+
+import os
+import sqlite3
+import statistics
+import sys
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from git_state import GitError, get_git_state
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    source TEXT NOT NULL,
+    git_sha TEXT
+);
+CREATE TABLE IF NOT EXISTS test_results (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    file TEXT NOT NULL,
+    name TEXT NOT NULL,
+    result TEXT NOT NULL,
+    skipped INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS file_results (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    file TEXT NOT NULL,
+    duration_ms INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_test_results_key ON test_results(file, name, run_id);
+CREATE INDEX IF NOT EXISTS idx_file_results_key ON file_results(file, run_id);
+"""
+
+
+def current_git_sha() -> Optional[str]:
+    try:
+        return get_git_state().head_sha
+    except GitError:
+        return None
+
+
+class TestTimingDB:
+    def __init__(self, log_directory: str = "documents/plan-logs"):
+        self.db_path = os.path.join(log_directory, "test_timings.sqlite3")
+        os.makedirs(log_directory, exist_ok=True)
+        self.connection = sqlite3.connect(self.db_path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def record_run(self, parsed_shards: List[Dict[str, Any]], source: str = "flutter test") -> int:
+        """
+        记录一次运行（可由多个分片组成）
+
+        Args:
+            parsed_shards: sharded_test_runner.parse_machine_events 的结果列表
+            source: 来源说明（如 plan_executor / step_done_executor）
+
+        Returns:
+            运行 id
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (started_at, source, git_sha) VALUES (?, ?, ?)",
+                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), source, current_git_sha()),
+            )
+            run_id = cursor.lastrowid
+            for parsed in parsed_shards:
+                self.connection.executemany(
+                    "INSERT INTO test_results (run_id, file, name, result, skipped, duration_ms) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (run_id, t['file'], t['name'], t['result'], int(t['skipped']), int(t['duration_ms']))
+                        for t in parsed['tests']
+                    ],
+                )
+                self.connection.executemany(
+                    "INSERT INTO file_results (run_id, file, duration_ms) VALUES (?, ?, ?)",
+                    [(run_id, path, int(seconds * 1000)) for path, seconds in parsed['files'].items()],
+                )
+        return run_id
+
+    def _recent_runs(self, window: int) -> List[int]:
+        rows = self.connection.execute(
+            "SELECT id FROM runs ORDER BY id DESC LIMIT ?", (window,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def file_durations(self, window: int = 5) -> Dict[str, float]:
+        """每个测试文件最近 window 次运行的耗时中位数（秒），用于分片均衡"""
+        runs = self._recent_runs(window)
+        if not runs:
+            return {}
+        samples: Dict[str, List[int]] = {}
+        placeholders = ','.join('?' * len(runs))
+        for path, duration in self.connection.execute(
+            f"SELECT file, duration_ms FROM file_results WHERE run_id IN ({placeholders})", runs
+        ):
+            samples.setdefault(path, []).append(duration)
+        return {path: statistics.median(values) / 1000.0 for path, values in samples.items()}
+
+    def slowest_tests(self, limit: int = 20, window: int = 5) -> List[Dict[str, Any]]:
+        """最近 window 次运行中耗时中位数最高的测试"""
+        runs = self._recent_runs(window)
+        if not runs:
+            return []
+        samples: Dict[tuple, List[int]] = {}
+        placeholders = ','.join('?' * len(runs))
+        for path, name, duration in self.connection.execute(
+            f"SELECT file, name, duration_ms FROM test_results "
+            f"WHERE run_id IN ({placeholders}) AND skipped = 0",
+            runs,
+        ):
+            samples.setdefault((path, name), []).append(duration)
+        ranked = sorted(
+            (
+                {
+                    'file': path,
+                    'name': name,
+                    'median_ms': int(statistics.median(values)),
+                    'max_ms': max(values),
+                    'samples': len(values),
+                }
+                for (path, name), values in samples.items()
+            ),
+            key=lambda item: item['median_ms'],
+            reverse=True,
+        )
+        return ranked[:limit]
+
+    def slowest_files(self, limit: int = 20, window: int = 5) -> List[Dict[str, Any]]:
+        durations = self.file_durations(window)
+        ranked = sorted(durations.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [{'file': path, 'median_seconds': round(seconds, 2)} for path, seconds in ranked]
+
+    def regressions(self, threshold: float = 0.5, window: int = 5, min_delta_ms: int = 100) -> List[Dict[str, Any]]:
+        """
+        耗时回归：最近一次运行的耗时超过之前 window 次中位数的 (1 + threshold) 倍
+
+        Args:
+            threshold: 相对增幅阈值（0.5 表示慢 50% 以上）
+            window: 作为基线的历史运行次数
+            min_delta_ms: 绝对增量下限，过滤毫秒级测试的噪声
+        """
+        runs = self._recent_runs(window + 1)
+        if len(runs) < 2:
+            return []
+        latest, baseline_runs = runs[0], runs[1:]
+        placeholders = ','.join('?' * len(baseline_runs))
+        baseline: Dict[tuple, List[int]] = {}
+        for path, name, duration in self.connection.execute(
+            f"SELECT file, name, duration_ms FROM test_results "
+            f"WHERE run_id IN ({placeholders}) AND skipped = 0",
+            baseline_runs,
+        ):
+            baseline.setdefault((path, name), []).append(duration)
+
+        flagged = []
+        for path, name, duration in self.connection.execute(
+            "SELECT file, name, duration_ms FROM test_results WHERE run_id = ? AND skipped = 0",
+            (latest,),
+        ):
+            history = baseline.get((path, name))
+            if not history:
+                continue
+            median = statistics.median(history)
+            if duration - median >= min_delta_ms and duration > median * (1 + threshold):
+                flagged.append({
+                    'file': path,
+                    'name': name,
+                    'latest_ms': duration,
+                    'baseline_median_ms': int(median),
+                    'change': f"+{(duration / median - 1) * 100:.0f}%" if median else "new",
+                    'trend_ms': self.history(path, name, window + 1),
+                })
+        return sorted(flagged, key=lambda item: item['latest_ms'] - item['baseline_median_ms'], reverse=True)
+
+    def history(self, path: str, name: str, limit: int = 10) -> List[int]:
+        """单个测试最近 limit 次的耗时（由旧到新）"""
+        rows = self.connection.execute(
+            "SELECT duration_ms FROM test_results WHERE file = ? AND name = ? "
+            "ORDER BY run_id DESC LIMIT ?",
+            (path, name, limit),
+        ).fetchall()
+        return [row[0] for row in reversed(rows)]
+
+
+# 使用示例
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='测试耗时报告')
+    parser.add_argument('--log-directory', default='documents/plan-logs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    slowest = subparsers.add_parser('slowest', help='最慢的测试/测试文件')
+    slowest.add_argument('--limit', type=int, default=20)
+    slowest.add_argument('--window', type=int, default=5, help='统计最近几次运行（默认 5）')
+    slowest.add_argument('--files', action='store_true', help='按测试文件统计')
+
+    trend = subparsers.add_parser('trend', help='耗时回归的测试')
+    trend.add_argument('--threshold', type=float, default=0.5, help='相对增幅阈值（默认 0.5 即 +50%%）')
+    trend.add_argument('--window', type=int, default=5, help='基线运行次数（默认 5）')
+    trend.add_argument('--min-delta-ms', type=int, default=100, help='绝对增量下限（默认 100ms）')
+
+    importer = subparsers.add_parser('import', help='导入 flutter test --machine 输出文件')
+    importer.add_argument('files', nargs='+')
+
+    args = parser.parse_args()
+    db = TestTimingDB(args.log_directory)
+
+    if args.command == 'import':
+        from sharded_test_runner import parse_machine_events
+        parsed = []
+        for path in args.files:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                parsed.append(parse_machine_events(f))
+        run_id = db.record_run(parsed, source='import')
+        print(f"✅ 已导入运行 #{run_id}: {sum(len(p['tests']) for p in parsed)} 个测试")
+    elif args.command == 'slowest' and args.files:
+        for item in db.slowest_files(args.limit, args.window):
+            print(f"{item['median_seconds']:8.2f}s  {item['file']}")
+    elif args.command == 'slowest':
+        for item in db.slowest_tests(args.limit, args.window):
+            print(f"{item['median_ms']:7}ms (max {item['max_ms']}ms, {item['samples']} 次)  "
+                  f"{item['file']}: {item['name']}")
+    else:
+        flagged = db.regressions(args.threshold, args.window, args.min_delta_ms)
+        if not flagged:
+            print("✅ 未发现耗时回归")
+        for item in flagged:
+            trend_text = ' → '.join(str(ms) for ms in item['trend_ms'])
+            print(f"⚠️ {item['change']:>6}  {item['baseline_median_ms']}ms → {item['latest_ms']}ms  "
+                  f"{item['file']}: {item['name']}")
+            print(f"         趋势(ms): {trend_text}")
+        sys.exit(1 if flagged else 0)
+    db.close()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+验证结果缓存
+用于 plan 执行器复用已通过的 flutter test / flutter analyze 结果：
+以 lib/、test/、pubspec.lock（及 pubspec.yaml、analysis_options.yaml）的内容哈希为键，输入未变化时直接复用上次的通过结果
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence
+
+# analysis_options.yaml / pubspec.yaml 同样影响 flutter analyze 与依赖解析
+DEFAULT_INPUTS = ("lib", "test", "pubspec.lock", "pubspec.yaml", "analysis_options.yaml")
+
+# 只保留最近的若干条记录，避免缓存文件无限增长
+MAX_ENTRIES = 20
+
+
+def source_hash(inputs: Sequence[str] = DEFAULT_INPUTS, extra: Sequence[str] = ()) -> str:
+    """
+    计算验证输入的内容哈希
+
+    按相对路径排序依次哈希"路径 + 内容"，文件增删改名都会改变结果；
+    extra 用于把命令行等非文件输入也纳入键中。
+    """
+    digest = hashlib.sha256()
+    for item in extra:
+        digest.update(f"extra:{item}\0".encode('utf-8'))
+
+    files: List[str] = []
+    for root in inputs:
+        if os.path.isfile(root):
+            files.append(root)
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+            files.extend(os.path.join(dirpath, name) for name in filenames)
+
+    for path in sorted(files):
+        digest.update(f"file:{path.replace(os.sep, '/')}\0".encode('utf-8'))
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class VerificationCache:
+    def __init__(self, log_directory: str = "documents/plan-logs"):
+        self.cache_path = os.path.join(log_directory, "verification_cache.json")
+
+    def _load(self) -> Dict[str, Any]:
+        if not os.path.exists(self.cache_path):
+            return {"entries": {}}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"entries": {}}
+
+    def lookup(self, tree_hash: str) -> Optional[Dict[str, Any]]:
+        """返回该哈希对应的通过记录；未命中返回 None"""
+        entry = self._load()["entries"].get(tree_hash)
+        if entry and entry.get("status") == "green":
+            return entry
+        return None
+
+    def store(self, tree_hash: str, commands: List[str], duration_seconds: float):
+        """记录一次通过的验证"""
+        data = self._load()
+        entries = data.setdefault("entries", {})
+        entries[tree_hash] = {
+            "status": "green",
+            "commands": commands,
+            "duration_seconds": round(duration_seconds, 1),
+            "verified_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        if len(entries) > MAX_ENTRIES:
+            oldest = sorted(entries, key=lambda h: entries[h].get("verified_at", ""))
+            for stale in oldest[:len(entries) - MAX_ENTRIES]:
+                del entries[stale]
+
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.cache_path)
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+YAML 批量补丁引擎
+用于 plan / step-done 执行器批量更新规范YAML文件：
+按文件分组、每个文件只加载一次、按点分路径更新字段、原子写入，任一文件失败则整批回滚。
+已有文件只改写变更字段所在的行，注释、字段顺序与引号风格保持不变；
+无法逐行定位的变更（列表下标、流式写法等）退回为整体重新输出。
+"""
+
+import copy
+import os
+import re
+import sys
+import tempfile
+import yaml
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+# 点分路径中的列表下标：a.b[0].c 或 a.b.0.c
+_INDEX_PATTERN = re.compile(r'\[(\d+)\]')
+
+# 架构文档模板（<type>_template.yaml）与本文件同目录
+TEMPLATE_DIR = os.path.dirname(os.path.abspath(__file__))
+# documents/architecture 下的类别目录 -> 文档类型
+ARCH_TYPE_DIRS = {
+    'widgets': 'widget', 'pages': 'page', 'models': 'model',
+    'providers': 'provider', 'repositories': 'repository', 'services': 'service',
+}
+# 架构文档中由 linter 逐项核对的引用列表
+REFERENCE_FIELDS = ('called_by', 'calls', 'i18n_keys', 'design_tokens')
+# step-done 新文件的 properties / methods 写入各类型模板中的对应节
+MEMBER_SECTIONS = {
+    'widget': {'properties': 'widget_properties', 'methods': 'widget_methods'},
+    'page': {'properties': 'page_properties', 'methods': 'page_methods'},
+    'model': {'properties': 'fields', 'methods': 'methods'},
+    'service': {'properties': 'fields', 'methods': 'public_methods'},
+    'repository': {'methods': 'abstract_methods'},
+}
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(' '))
+
+
+def _is_content(line: str) -> bool:
+    """非空行、非注释行、非文档分隔符"""
+    stripped = line.strip()
+    return bool(stripped) and not stripped.startswith('#') and stripped not in ('---', '...')
+
+
+def _value_end(lines: List[str], index: int) -> int:
+    """键所在行 index 的值占到第几行（不含）：更深缩进的行，以及同缩进的 "- " 列表项"""
+    indent = _indent(lines[index])
+    end = index + 1
+    for j in range(index + 1, len(lines)):
+        line = lines[j]
+        if not _is_content(line):
+            continue
+        rest = line[indent:]
+        if _indent(line) > indent or (_indent(line) == indent and (rest.startswith('- ') or rest.rstrip() == '-')):
+            end = j + 1
+        else:
+            break
+    return end
+
+
+def _find_key(lines: List[str], start: int, end: int, key: str) -> Tuple[Optional[int], Optional[int]]:
+    """在 [start, end) 这段块映射中查找 key：(所在行, 该层缩进)；这段为空或不是块映射时缩进为 None"""
+    first = next((i for i in range(start, end) if _is_content(lines[i])), None)
+    if first is None or lines[first].lstrip(' ').startswith('- ') or lines[first].strip() == '-':
+        return None, None
+    indent = _indent(lines[first])
+    pattern = re.compile(r"(?:{0}|'{0}'|\"{0}\")\s*:(?:\s|$)".format(re.escape(key)))
+    for i in range(start, end):
+        line = lines[i]
+        if _is_content(line) and _indent(line) == indent and pattern.match(line, indent):
+            return i, indent
+    return None, indent
+
+
+class YamlPatchError(Exception):
+    """补丁应用失败（整批已回滚或尚未写入任何文件）"""
+
+
+class YamlPatchEngine:
+    def __init__(self, root: str = "."):
+        self.root = root
+        self.patches: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # 登记时跳过的文件（如尚不存在的架构索引文件）
+        self.skipped: List[str] = []
+
+    def add_change(self, file_path: str, field: str, value: Any, create: bool = False):
+        """
+        登记一个字段变更（同一文件的变更合并，最终只加载/写入一次）
+
+        Args:
+            file_path: 目标YAML文件（相对 root）
+            field: 点分字段路径，如 meta.description、providers[0].name
+            value: 新值
+            create: 文件不存在时是否允许新建
+        """
+        if not file_path:
+            raise YamlPatchError("变更缺少目标文件路径")
+        if not field:
+            raise YamlPatchError(f"{file_path}: 变更缺少字段路径")
+        patch = self.patches.setdefault(file_path, {'create': False, 'changes': []})
+        patch['create'] = patch['create'] or create
+        patch['changes'].append((field, value))
+
+    def add_document(self, file_path: str, document: Dict[str, Any]):
+        """登记一个新YAML文件：顶层字段逐个写入（文件已存在时等价于逐字段更新）"""
+        for key, value in document.items():
+            self.add_change(file_path, str(key), value, create=True)
+
+    @staticmethod
+    def split_path(field: str) -> List[Any]:
+        """把点分路径拆成键/下标序列：a.b[0].c -> ['a', 'b', 0, 'c']"""
+        parts: List[Any] = []
+        for segment in _INDEX_PATTERN.sub(r'.\1', field).split('.'):
+            if segment == '':
+                continue
+            parts.append(int(segment) if segment.isdigit() else segment)
+        if not parts:
+            raise YamlPatchError(f"无效的字段路径: {field!r}")
+        return parts
+
+    @classmethod
+    def set_path(cls, document: Dict[str, Any], field: str, value: Any):
+        """按点分路径设置字段，中间层不存在时自动创建映射"""
+        parts = cls.split_path(field)
+        node: Any = document
+        for depth, key in enumerate(parts[:-1]):
+            next_key = parts[depth + 1]
+            if isinstance(key, int):
+                if not isinstance(node, list) or key >= len(node):
+                    raise YamlPatchError(f"{field}: 下标 {key} 超出列表范围")
+                if node[key] is None:
+                    node[key] = [] if isinstance(next_key, int) else {}
+                node = node[key]
+                continue
+            if not isinstance(node, dict):
+                raise YamlPatchError(f"{field}: '{key}' 的上层不是映射")
+            if node.get(key) is None:
+                node[key] = [] if isinstance(next_key, int) else {}
+            node = node[key]
+
+        last = parts[-1]
+        if isinstance(last, int):
+            if not isinstance(node, list):
+                raise YamlPatchError(f"{field}: 下标 {last} 的上层不是列表")
+            if last == len(node):
+                node.append(value)
+            elif last < len(node):
+                node[last] = value
+            else:
+                raise YamlPatchError(f"{field}: 下标 {last} 超出列表范围")
+        else:
+            if not isinstance(node, dict):
+                raise YamlPatchError(f"{field}: '{last}' 的上层不是映射")
+            node[last] = value
+
+    @classmethod
+    def patch_text(cls, text: str, field: str, value: Any) -> Optional[str]:
+        """
+        只改写字段所在的几行，保留文件其余内容（注释、顺序、引号与换行风格）
+
+        支持映射键组成的路径：已有字段替换其值所占的行，缺少的字段追加到上层映射末尾。
+        路径含列表下标或上层不是块映射时返回 None，由调用方整体重新输出。
+        """
+        parts = cls.split_path(field)
+        if any(isinstance(part, int) for part in parts):
+            return None
+        lines = text.splitlines(keepends=True)
+        if lines and not lines[-1].endswith('\n'):
+            lines[-1] += '\n'
+        start, end = 0, len(lines)
+        for depth, key in enumerate(parts):
+            index, indent = _find_key(lines, start, end, key)
+            if index is None:
+                if depth < len(parts) - 1 or (indent is None and depth > 0):
+                    return None
+                if indent is None and any(map(_is_content, lines)):
+                    return None
+                # 缺少的字段追加到所在映射末尾（空文件时写在顶层）
+                indent, insert_at = indent or 0, end
+                break
+            if depth == len(parts) - 1:
+                insert_at = None
+                break
+            if lines[index].split(':', 1)[1].split('#', 1)[0].strip():
+                # 上层的值写在同一行（流式映射等）
+                return None
+            start, end = index + 1, _value_end(lines, index)
+
+        rendered = yaml.safe_dump({parts[-1]: value}, allow_unicode=True, sort_keys=False)
+        new_lines = [' ' * indent + line if line.strip() else line for line in rendered.splitlines(keepends=True)]
+        if insert_at is None:
+            lines[index:_value_end(lines, index)] = new_lines
+        else:
+            lines[insert_at:insert_at] = new_lines
+        return ''.join(lines)
+
+    def _abs(self, file_path: str) -> str:
+        return file_path if os.path.isabs(file_path) else os.path.join(self.root, file_path)
+
+    def exists(self, file_path: str) -> bool:
+        return os.path.exists(self._abs(file_path))
+
+    def _render(self) -> "OrderedDict[str, Dict[str, Any]]":
+        """阶段一：逐文件加载一次并在内存中应用全部变更（不写盘）"""
+        rendered: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        for file_path, patch in self.patches.items():
+            path = self._abs(file_path)
+            original: Optional[bytes] = None
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    original = f.read()
+                try:
+                    document = yaml.safe_load(original.decode('utf-8')) or {}
+                except yaml.YAMLError as e:
+                    raise YamlPatchError(f"{file_path}: YAML解析失败: {e}")
+                if not isinstance(document, dict):
+                    raise YamlPatchError(f"{file_path}: 顶层不是映射，无法按字段更新")
+            elif patch['create']:
+                document = {}
+            else:
+                raise YamlPatchError(f"{file_path}: 文件不存在（action 不是 create）")
+
+            before = copy.deepcopy(document)
+            for field, value in patch['changes']:
+                self.set_path(document, field, value)
+
+            content = self._render_content(original, before, document, patch['changes'])
+            rendered[file_path] = {
+                'path': path,
+                'original': original,
+                'content': content,
+                'changes': len(patch['changes']),
+            }
+        return rendered
+
+    @classmethod
+    def _render_content(cls, original: Optional[bytes], before: Dict[str, Any], document: Dict[str, Any],
+                        changes: List[Tuple[str, Any]]) -> bytes:
+        """已有文件优先逐行改写；改写结果解析后必须与整体更新的文档一致，否则整体重新输出"""
+        if original is not None:
+            if document == before:
+                return original
+            text: Optional[str] = original.decode('utf-8')
+            for field, value in changes:
+                text = cls.patch_text(text, field, value)
+                if text is None:
+                    break
+            if text is not None:
+                try:
+                    if (yaml.safe_load(text) or {}) == document:
+                        return text.encode('utf-8')
+                except yaml.YAMLError:
+                    pass
+        return yaml.safe_dump(document, allow_unicode=True, sort_keys=False).encode('utf-8')
+
+    @staticmethod
+    def _write_temp(path: str, content: bytes) -> str:
+        """写入同目录临时文件并落盘，返回临时文件路径"""
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(path):
+                os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        return tmp_path
+
+    def _rollback(self, rendered: Dict[str, Dict[str, Any]], replaced: List[str]) -> List[str]:
+        """把已替换的文件恢复为原内容（新建的文件直接删除），返回恢复失败的文件"""
+        failed = []
+        for file_path in reversed(replaced):
+            entry = rendered[file_path]
+            try:
+                if entry['original'] is None:
+                    os.unlink(entry['path'])
+                else:
+                    tmp_path = self._write_temp(entry['path'], entry['original'])
+                    os.replace(tmp_path, entry['path'])
+            except OSError:
+                failed.append(file_path)
+        return failed
+
+    def apply(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        应用全部已登记的变更
+
+        流程：内存中渲染全部文件 → 全部写入临时文件 → 逐个 rename 替换；
+        任一步骤失败都会清理临时文件并回滚已替换的文件，然后抛出 YamlPatchError。
+
+        Args:
+            dry_run: 只渲染和校验，不写盘
+
+        Returns:
+            {"files": [...], "changed": [...], "unchanged": [...], "changes": 变更总数, "skipped": [...]}
+        """
+        rendered = self._render()
+        changed = [p for p, e in rendered.items() if e['content'] != e['original']]
+        result = {
+            'files': list(rendered.keys()),
+            'changed': changed,
+            'unchanged': [p for p in rendered if p not in changed],
+            'changes': sum(e['changes'] for e in rendered.values()),
+            'skipped': list(self.skipped),
+        }
+        if dry_run or not changed:
+            return result
+
+        temp_files: Dict[str, str] = {}
+        replaced: List[str] = []
+        try:
+            # 阶段二：全部写入临时文件，任何一个失败都不会触碰目标文件
+            for file_path in changed:
+                entry = rendered[file_path]
+                temp_files[file_path] = self._write_temp(entry['path'], entry['content'])
+            # 阶段三：逐个原子替换
+            for file_path in changed:
+                os.replace(temp_files[file_path], rendered[file_path]['path'])
+                del temp_files[file_path]
+                replaced.append(file_path)
+        except Exception as e:
+            for tmp_path in temp_files.values():
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+            not_restored = self._rollback(rendered, replaced)
+            message = f"写入YAML失败，已回滚 {len(replaced) - len(not_restored)} 个文件: {e}"
+            if not_restored:
+                message += f"；以下文件回滚失败，需要手动检查: {', '.join(not_restored)}"
+            raise YamlPatchError(message) from e
+
+        return result
+
+
+def patch_engine_from_plan(config: Dict[str, Any], root: str = ".") -> YamlPatchEngine:
+    """plan 文档：yaml_specification_updates.updates[].changes[] -> 补丁引擎"""
+    engine = YamlPatchEngine(root)
+    updates = (config.get('yaml_specification_updates') or {}).get('updates') or []
+    for update in updates:
+        file_path = update.get('file', '')
+        create = update.get('action', '') == 'create'
+        for change in update.get('changes') or []:
+            engine.add_change(file_path, change.get('field', ''), change.get('value'), create=create)
+    return engine
+
+
+def architecture_type(file_path: str, file_info: Dict[str, Any]) -> Optional[str]:
+    """新文件对应的架构文档类型：优先所在类别目录，其次条目的 type；都不是时返回 None"""
+    doc_type = ARCH_TYPE_DIRS.get(os.path.basename(os.path.dirname(file_path)))
+    if doc_type is None and file_info.get('type') in MEMBER_SECTIONS.keys() | {'provider'}:
+        doc_type = file_info['type']
+    return doc_type
+
+
+def load_type_template(doc_type: str, template_dir: str = TEMPLATE_DIR) -> Dict[str, Any]:
+    path = os.path.join(template_dir, f'{doc_type}_template.yaml')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        raise YamlPatchError(f"无法读取 {doc_type} 文档模板 {path}: {e}")
+
+
+def architecture_fields(file_info: Dict[str, Any], doc_type: str) -> List[Tuple[str, Any]]:
+    """step-done 新文件条目 -> 架构文档字段（meta / <type>_definition / 成员节 / 调用关系）"""
+    file_path = file_info.get('file', '')
+    source = file_info.get('file_path')
+    if not source:
+        raise YamlPatchError(f"{file_path}: 新架构文档缺少 file_path（对应的 Dart 源文件）")
+    today = datetime.now().strftime('%y%m%d')
+    fields: List[Tuple[str, Any]] = [
+        ('meta.type', doc_type),
+        ('meta.file_path', source),
+        ('meta.last_updated', today),
+        ('source_of_truth', source),
+    ]
+    if file_info.get('class_name'):
+        name_key = 'implementation_class' if doc_type == 'repository' else 'name'
+        fields += [('meta.name', file_info['class_name']),
+                   (f'{doc_type}_definition.{name_key}', file_info['class_name'])]
+    if file_info.get('description'):
+        fields.append(('meta.description', file_info['description']))
+    for key, section in MEMBER_SECTIONS.get(doc_type, {}).items():
+        if file_info.get(key) is not None:
+            fields.append((section, file_info[key]))
+    for key in ('called_by', 'calls'):
+        if file_info.get(key) is not None:
+            fields.append((key, file_info[key]))
+    return fields
+
+
+def patch_engine_from_step_done(config: Dict[str, Any], root: str = ".") -> YamlPatchEngine:
+    """step-done 文档：yaml_updates 下的新建/修改/架构索引文件 -> 补丁引擎"""
+    engine = YamlPatchEngine(root)
+    yaml_updates = config.get('yaml_updates') or {}
+
+    # 新文件：架构文档从对应类型的模板出发，step-done 字段写入 meta 与定义节；其他文件除 file/based_on 外的字段即文档内容
+    for file_info in (yaml_updates.get('new_yaml_files') or {}).get('files') or []:
+        file_path = file_info.get('file', '')
+        doc_type = architecture_type(file_path, file_info)
+        if doc_type is None:
+            document = {k: v for k, v in file_info.items() if k not in ('file', 'based_on')}
+            engine.add_document(file_path, document)
+            continue
+        fields = architecture_fields(file_info, doc_type)
+        if file_path and not engine.exists(file_path):
+            document = load_type_template(doc_type)
+            # 模板中的引用列表是示例（指向不存在的文件、key 与 token），新文档从空列表开始
+            for key in REFERENCE_FIELDS:
+                if key in document:
+                    document[key] = []
+            engine.add_document(file_path, document)
+            fields.append(('meta.created_date', datetime.now().strftime('%y%m%d')))
+        for field, value in fields:
+            engine.add_change(file_path, field, value, create=True)
+
+    # 修改文件：changes[].field -> new_value
+    for file_info in (yaml_updates.get('modified_yaml_files') or {}).get('files') or []:
+        for change in file_info.get('changes') or []:
+            engine.add_change(file_info.get('file', ''), change.get('field', ''), change.get('new_value'))
+
+    # 架构索引文件：changes[].field -> value；索引文件尚不存在时跳过（不新建缺少 meta 的文档，也不让整批失败）
+    for file_info in (yaml_updates.get('architecture_updates') or {}).get('files') or []:
+        file_path = file_info.get('file', '')
+        if file_path and not engine.exists(file_path):
+            if file_path not in engine.skipped:
+                engine.skipped.append(file_path)
+            continue
+        for change in file_info.get('changes') or []:
+            engine.add_change(file_path, change.get('field', ''), change.get('value'))
+    return engine
+
+
+# 使用示例
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python yaml_patch_engine.py <plan_or_step_done_file> [--apply]")
+        print("默认只预览（dry run），加 --apply 才写入")
+        sys.exit(1)
+
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f) or {}
+
+    if 'yaml_updates' in config:
+        engine = patch_engine_from_step_done(config)
+    else:
+        engine = patch_engine_from_plan(config)
+
+    try:
+        result = engine.apply(dry_run='--apply' not in sys.argv)
+    except YamlPatchError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"📄 涉及 {len(result['files'])} 个文件，{result['changes']} 处变更")
+    for file_path in result['changed']:
+        print(f"  🔧 {file_path}")
+    for file_path in result['unchanged']:
+        print(f"  ⏭️ 内容未变化: {file_path}")
+    for file_path in result['skipped']:
+        print(f"  ⚠️ 架构索引文件不存在，已跳过: {file_path}")
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Dart 分析器子进程的自适应并发控制
+
+每个 `dart run tools/dart_analyzer.dart` 都会启动完整的 Dart VM + analyzer（常见数百 MB），
+固定并发数在内存小或负载高的机器上会导致换页和超时。本模块根据以下观测值动态调整同时运行的分析器数量：
+
+- 单个分析器进程的峰值 RSS（getrusage(RUSAGE_CHILDREN).ru_maxrss，初始按 DEFAULT_PROCESS_RSS 估计）
+- 系统可用内存（/proc/meminfo 的 MemAvailable，macOS 使用 vm_stat）
+- CPU 负载（1 分钟 load average 与核数）
+- 可选的内存硬上限（--max-analyzer-memory 或环境变量 ANALYZER_MEMORY_LIMIT，例如 4G）
+
+用法：
+    with analyzer_limiter().slot():
+        subprocess.run([...])
+"""
+import os
+import re
+import resource
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+DEFAULT_PROCESS_RSS = 400 * 1024 * 1024
+# 为系统和其他进程保留的可用内存
+MEMORY_RESERVE = 512 * 1024 * 1024
+# 采样间隔（秒），避免每次 acquire 都读取系统状态
+SAMPLE_INTERVAL = 0.5
+# 进程启动后多久视为内存已分配完毕（此前的进程按估计值从可用内存中预扣）
+WARMUP_SECONDS = 5.0
+
+_LIMITER: Optional['AdaptiveLimiter'] = None
+_LIMITER_LOCK = threading.Lock()
+
+
+def parse_size(text: str) -> int:
+    """解析 512M / 4G / 1073741824 形式的大小"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*', text.upper())
+    if not match:
+        raise ValueError(f'无法解析大小: {text}')
+    factor = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}[match.group(2)]
+    return int(float(match.group(1)) * factor)
+
+
+def available_memory() -> Optional[int]:
+    """系统可用内存（字节），无法获取时返回 None"""
+    try:
+        with open('/proc/meminfo', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if sys.platform == 'darwin':
+        try:
+            output = subprocess.run(['vm_stat'], capture_output=True, text=True, timeout=2).stdout
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        page_size = int((re.search(r'page size of (\d+) bytes', output) or [None, 4096])[1])
+        pages = 0
+        for key in ('Pages free', 'Pages inactive', 'Pages speculative', 'Pages purgeable'):
+            match = re.search(rf'{key}:\s+(\d+)', output)
+            if match:
+                pages += int(match.group(1))
+        return pages * page_size
+    return None
+
+
+def children_peak_rss() -> int:
+    """已结束子进程中的最大峰值 RSS（字节）；Linux 的 ru_maxrss 单位为 KB，macOS 为字节"""
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class AdaptiveLimiter:
+    def __init__(self, max_workers: Optional[int] = None, memory_limit: Optional[int] = None):
+        """
+        Args:
+            max_workers: 并发上限（默认 CPU 核数）
+            memory_limit: 所有分析器进程合计内存的硬上限（字节），None 表示只看系统可用内存
+        """
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.memory_limit = memory_limit
+        self.process_rss = DEFAULT_PROCESS_RSS
+        self.in_flight = 0
+        self._started: list = []
+        self.limit = 1
+        self.stats = {'runs': 0, 'peak_in_flight': 0, 'peak_limit': 1, 'wait_seconds': 0.0}
+        self._cond = threading.Condition()
+        self._sampled_at = 0.0
+
+    def _sample(self):
+        """根据观测值重新计算并发上限（持有锁时调用）"""
+        now = time.monotonic()
+        if now - self._sampled_at < SAMPLE_INTERVAL:
+            return
+        self._sampled_at = now
+
+        observed = children_peak_rss()
+        if observed > 0 and self.stats['runs']:
+            self.process_rss = max(observed, 64 * 1024 * 1024)
+
+        limit = self.max_workers
+        available = available_memory()
+        if available is not None:
+            # 运行已久的进程的内存已反映在可用内存中；刚启动的进程尚未分配完，按估计值预扣
+            warming = sum(1 for started in self._started if now - started < WARMUP_SECONDS)
+            headroom = available - MEMORY_RESERVE - warming * self.process_rss
+            limit = min(limit, self.in_flight + headroom // self.process_rss)
+        if self.memory_limit is not None:
+            limit = min(limit, self.memory_limit // self.process_rss)
+        try:
+            load = os.getloadavg()[0]
+            cpus = os.cpu_count() or 1
+            if load > cpus * 1.5:
+                limit = min(limit, max(1, self.in_flight - 1))
+        except OSError:
+            pass
+        self.limit = max(1, int(limit))
+        self.stats['peak_limit'] = max(self.stats['peak_limit'], self.limit)
+
+    def acquire(self) -> float:
+        """占用一个名额，返回凭据（本次启动时间），结束时原样交给 release()"""
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                self._sample()
+                if self.in_flight < self.limit:
+                    break
+                self._cond.wait(timeout=SAMPLE_INTERVAL)
+            self.in_flight += 1
+            token = time.monotonic()
+            self._started.append(token)
+            self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.in_flight)
+            self.stats['wait_seconds'] += token - started
+        return token
+
+    def release(self, token: float):
+        """归还 acquire() 返回的名额；各分析器结束顺序与启动顺序无关"""
+        with self._cond:
+            self.in_flight -= 1
+            self._started.remove(token)
+            self.stats['runs'] += 1
+            self._sampled_at = 0.0
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        token = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(token)
+
+    def summary(self) -> Dict:
+        return dict(self.stats, process_rss_mb=round(self.process_rss / (1 << 20)),
+                    max_workers=self.max_workers,
+                    memory_limit_mb=round(self.memory_limit / (1 << 20)) if self.memory_limit else None)
+
+
+def configure_limiter(max_workers: Optional[int] = None, memory_limit: Optional[int] = None) -> AdaptiveLimiter:
+    """创建进程内共享的限流器（需在第一次调用分析器之前）"""
+    global _LIMITER
+    if memory_limit is None and os.environ.get('ANALYZER_MEMORY_LIMIT'):
+        memory_limit = parse_size(os.environ['ANALYZER_MEMORY_LIMIT'])
+    limiter = AdaptiveLimiter(max_workers, memory_limit)
+    with _LIMITER_LOCK:
+        _LIMITER = limiter
+    return limiter
+
+
+def analyzer_limiter() -> AdaptiveLimiter:
+    """进程内共享的限流器（未配置时按默认值创建）"""
+    global _LIMITER
+    with _LIMITER_LOCK:
+        if _LIMITER is None:
+            memory_limit = os.environ.get('ANALYZER_MEMORY_LIMIT')
+            _LIMITER = AdaptiveLimiter(memory_limit=parse_size(memory_limit) if memory_limit else None)
+        return _LIMITER
+
+
+if __name__ == '__main__':
+    limiter = analyzer_limiter()
+    limiter._sample()
+    available = available_memory()
+    print(f'CPU 核数: {os.cpu_count()}')
+    print(f'可用内存: {available // (1 << 20) if available is not None else "未知"} MB')
+    print(f'单进程估计: {limiter.process_rss // (1 << 20)} MB')
+    print(f'当前并发上限: {limiter.limit}')
@@ -5,12 +5,26 @@
   called_by, calls, test_mapping, i18n_keys, design_tokens, supersedes, deprecated_since
 
 仅补齐缺失，不覆盖已有值；输出修改的文件清单。
+
+--stale / --sync：通过一次 git log --name-only 遍历找到每个 meta.file_path 最近一次被修改的提交，
+与文档记录的 meta.last_synced_sha 比较，列出过期文档或批量回填为最新提交。
+
+文档从汇总清单与语料快照读取（architecture_manifest.py，只重新解析有变化的文档），修改后回写清单。
 """
+import argparse
+import re
+import subprocess
+import os
 import sys
 from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
 import yaml
 
-ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from architecture_manifest import Manifest, load_corpus
+
+# 项目根目录（GRANOFLOW_ROOT 可覆盖，用于基准测试的合成语料）
+ROOT = Path(os.environ.get('GRANOFLOW_ROOT') or Path(__file__).resolve().parents[1]).resolve()
 ARCH_DIR = ROOT / 'documents' / 'architecture'
 
 DEFAULTS = {
@@ -63,16 +77,107 @@ def ensure_defaults(doc: dict) -> bool:
             changed = True
     return changed
 
-def main():
+def latest_commits(paths: Iterable[str]) -> Dict[str, Tuple[str, int]]:
+    """
+    一次 git log 遍历，返回每个路径最近一次被修改的提交 {path: (sha, 提交时间戳)}
+
+    按时间倒序读取提交，路径第一次出现即为最新提交；全部路径找到后提前结束遍历。
+    """
+    wanted = set(paths)
+    if not wanted:
+        return {}
+    pathspecs = sorted({p.split('/', 1)[0] for p in wanted})
+    process = subprocess.Popen(
+        ['git', '-c', 'core.quotePath=false', 'log', '--format=@@%H %ct', '--name-only', '--'] + pathspecs,
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, encoding='utf-8',
+    )
+    found: Dict[str, Tuple[str, int]] = {}
+    current: Optional[Tuple[str, int]] = None
+    try:
+        for line in process.stdout:
+            line = line.rstrip('\n')
+            if line.startswith('@@'):
+                sha, timestamp = line[2:].split(' ', 1)
+                current = (sha, int(timestamp))
+            elif line and current and line in wanted and line not in found:
+                found[line] = current
+                if len(found) == len(wanted):
+                    break
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+    return found
+
+def iter_arch_docs(manifest: Optional[Manifest] = None):
+    for p, doc in (manifest or load_corpus()).documents():
+        if isinstance(doc, dict) and isinstance(doc.get('meta'), dict):
+            yield p, doc
+
+def find_stale(manifest: Optional[Manifest] = None):
+    """
+    比较每个文档的 meta.last_synced_sha 与 meta.file_path 的最新提交（只需清单中的 meta 关键字段）
+
+    Returns:
+        [(文档路径, file_path, 记录的 sha, 最新 sha 或 None)]，最新 sha 为 None 表示源文件不在 git 历史中
+    """
+    manifest = manifest or load_corpus(snapshot=False)
+    docs = [(ARCH_DIR / rel, entry['meta']) for rel, entry in sorted(manifest.entries.items())
+            if entry['meta'] and entry['meta'].get('file_path')]
+    latest = latest_commits(meta['file_path'] for _, meta in docs)
+    stale = []
+    for p, meta in docs:
+        recorded = str(meta.get('last_synced_sha') or '')
+        commit = latest.get(meta['file_path'])
+        if commit is None or recorded != commit[0]:
+            stale.append((p, meta['file_path'], recorded, commit[0] if commit else None))
+    return stale
+
+SYNCED_SHA_LINE = re.compile(r"^(\s+last_synced_sha:).*$", re.MULTILINE)
+
+def write_synced_sha(p: Path, sha: str):
+    """只替换 last_synced_sha 这一行，保留文档其余格式；缺少该字段时整体回写"""
+    text = p.read_text(encoding='utf-8')
+    new_text, count = SYNCED_SHA_LINE.subn(lambda m: f"{m.group(1)} '{sha}'", text, count=1)
+    if count:
+        p.write_text(new_text, encoding='utf-8')
+        return
+    doc = load_yaml(p)
+    doc.setdefault('meta', {})['last_synced_sha'] = sha
+    dump_yaml(p, doc)
+
+def report_stale(sync: bool) -> int:
+    manifest = load_corpus(snapshot=False)
+    stale = find_stale(manifest)
+    if not stale:
+        print('[bulk-update] 所有文档的 last_synced_sha 均为最新')
+        return 0
+    missing = [item for item in stale if item[3] is None]
+    outdated = [item for item in stale if item[3] is not None]
+    for p, file_path, recorded, latest in outdated:
+        print(f" - {p.relative_to(ROOT)}: {file_path} {recorded[:10] or '(未同步)'} -> {latest[:10]}")
+    for p, file_path, _, _ in missing:
+        print(f" ? {p.relative_to(ROOT)}: {file_path} 不在 git 历史中")
+    if sync:
+        for p, _, _, latest in outdated:
+            write_synced_sha(p, latest)
+            manifest.record(p)
+        manifest.save()
+        print(f'[bulk-update] 已回填 {len(outdated)} 个文档的 last_synced_sha')
+        return 0
+    print(f'[bulk-update] 过期文档 {len(outdated)} 个，源文件缺失 {len(missing)} 个')
+    return 1
+
+def fill_defaults():
     modified = []
-    for p in ARCH_DIR.rglob('*.y*ml'):
-        doc = load_yaml(p)
-        if not isinstance(doc, dict) or 'meta' not in doc:
-            # 跳过无法解析或非架构格式的 YAML
-            continue
+    manifest = load_corpus()
+    # 跳过无法解析或非架构格式的 YAML
+    for p, doc in iter_arch_docs(manifest):
         if ensure_defaults(doc):
             dump_yaml(p, doc)
+            manifest.record(p, doc)
             modified.append(str(p.relative_to(ROOT)))
+    manifest.save()
 
     if modified:
         print('[bulk-update] 修改文件:')
@@ -81,6 +186,17 @@ def main():
     else:
         print('[bulk-update] 无需修改')
 
+def main():
+    parser = argparse.ArgumentParser(description='批量补齐架构 YAML 规范字段 / 检查 last_synced_sha')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--stale', action='store_true', help='列出 last_synced_sha 落后于源文件最新提交的文档（有过期时退出码为 1）')
+    group.add_argument('--sync', action='store_true', help='将过期文档的 last_synced_sha 回填为源文件最新提交')
+    args = parser.parse_args()
+
+    if args.stale or args.sync:
+        return report_stale(args.sync)
+    fill_defaults()
+
 if __name__ == '__main__':
     sys.exit(main())
 
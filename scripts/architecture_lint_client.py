@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+architecture_linter 的轻量客户端（pre-commit 使用）
+
+参数与 architecture_linter.py 相同。若 architecture_lint_server.py 正在运行，
+通过 Unix socket 把参数转发给它（索引常驻内存，省去 PyYAML 导入与索引重建）；
+服务未运行、无响应或代码已更新时，在本进程内直接校验。
+
+本文件只使用标准库中的轻量模块，不导入 yaml。
+
+用法：
+    python3 scripts/architecture_lint_client.py --files <changed_paths...>
+"""
+import hashlib
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 项目根目录（GRANOFLOW_ROOT 可覆盖，用于基准测试的合成语料）
+ROOT = Path(os.environ.get('GRANOFLOW_ROOT') or Path(__file__).resolve().parents[1]).resolve()
+
+CONNECT_TIMEOUT = 0.2
+REQUEST_TIMEOUT = 120
+
+
+def socket_path(root: Path = ROOT) -> Path:
+    """按仓库根目录区分的 socket 路径（放在临时目录，避免超出 Unix socket 路径长度限制）"""
+    digest = hashlib.sha1(str(root).encode('utf-8')).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / f'granoflow-lint-{os.getuid()}-{digest}.sock'
+
+
+def request(message: Dict[str, Any], timeout: float = REQUEST_TIMEOUT) -> Optional[Dict[str, Any]]:
+    """发送一条请求并读取响应（一行 JSON）；服务不可用时返回 None"""
+    path = socket_path()
+    if not path.exists():
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(str(path))
+            sock.settimeout(timeout)
+            sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+            data = b''
+            while not data.endswith(b'\n'):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+        return json.loads(data) if data else None
+    except (OSError, ValueError):
+        return None
+
+
+def lint_in_process(argv: List[str]) -> int:
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import architecture_linter
+    return architecture_linter.main(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    response = request({'cmd': 'lint', 'argv': argv})
+    if response is None or 'errors' not in response:
+        # 服务未运行、参数错误或服务代码已过期：退回进程内校验（输出与退出码与 linter 一致）
+        return lint_in_process(argv)
+    errors = response['errors']
+    if errors:
+        print("\n架构文档校验失败：\n" + "\n".join(errors))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+architecture_linter 常驻服务（Unix socket）
+
+进程内保持 PyYAML 与 ARB key / 设计 token 索引；每次请求前比对 ARB 与主题文件的 mtime/size，
+有变化时只重建对应索引。linter、结构校验器、语料清单或本服务的代码更新后，服务拒绝请求并退出，客户端自动退回进程内校验。
+空闲超过 --idle-timeout 秒后自动退出。
+
+协议：每个连接一行 JSON 请求、一行 JSON 响应
+    {"cmd": "lint", "argv": ["--files", ...]}  → {"errors": [...], "checked": N, "elapsed_ms": ...}
+    {"cmd": "ping"}                              → {"ok": true, "pid": ..., "requests": ...}
+    {"cmd": "shutdown"}                          → {"ok": true}
+
+用法：
+    python scripts/architecture_lint_server.py start [--idle-timeout 1800]   # 后台启动
+    python scripts/architecture_lint_server.py serve                         # 前台运行
+    python scripts/architecture_lint_server.py status | stop
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+import architecture_linter
+import architecture_manifest
+import architecture_schema
+from architecture_lint_client import ROOT, request, socket_path
+from architecture_linter import build_parser, collect_targets, index_stamps, lint_paths, load_indexes
+
+DEFAULT_IDLE_TIMEOUT = 30 * 60
+LOG_FILE = ROOT / 'build' / 'architecture_lint_server.log'
+# 这些文件变化后常驻进程中的代码已过期
+CODE_FILES = [Path(m.__file__).resolve() for m in (architecture_linter, architecture_manifest, architecture_schema)] + [Path(__file__).resolve()]
+
+
+def _code_stamp() -> tuple:
+    return tuple(p.stat().st_mtime_ns for p in CODE_FILES)
+
+
+class LintServer:
+    def __init__(self, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.code_stamp = _code_stamp()
+        self.stamps = None
+        self.requests = 0
+        self.started = time.time()
+        self.running = True
+
+    def refresh_indexes(self):
+        """ARB / 主题文件有变化时重建对应索引"""
+        stamps = index_stamps()
+        if stamps == self.stamps:
+            return
+        previous = self.stamps or {}
+        arb = stamps['arb'] != previous.get('arb')
+        tokens = stamps['tokens'] != previous.get('tokens')
+        load_indexes(arb=arb, tokens=tokens)
+        self.stamps = stamps
+        print(f"[lint-server] 重建索引：{'ARB ' if arb else ''}{'tokens' if tokens else ''}", flush=True)
+
+    def handle(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        cmd = message.get('cmd')
+        if cmd == 'ping':
+            return {'ok': True, 'pid': os.getpid(), 'requests': self.requests,
+                    'uptime_s': round(time.time() - self.started)}
+        if cmd == 'shutdown':
+            self.running = False
+            return {'ok': True}
+        if cmd != 'lint':
+            return {'error': f'未知命令: {cmd}'}
+
+        if _code_stamp() != self.code_stamp:
+            self.running = False
+            return {'error': 'linter 代码已更新，服务退出'}
+        try:
+            args = build_parser().parse_args(message.get('argv', []))
+        except SystemExit:
+            return {'error': '参数错误'}
+
+        started = time.perf_counter()
+        self.refresh_indexes()
+        targets = collect_targets(args.files, args.all)
+        errors = lint_paths(targets, use_cache=not args.no_cache)
+        self.requests += 1
+        return {'errors': errors, 'checked': len(targets),
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+    def serve(self):
+        path = socket_path()
+        if path.exists():
+            if request({'cmd': 'ping'}, timeout=1) is not None:
+                print(f'[lint-server] 已在运行: {path}')
+                return 1
+            path.unlink()
+
+        self.refresh_indexes()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            server.bind(str(path))
+        finally:
+            os.umask(old_umask)
+        server.listen(8)
+        server.settimeout(self.idle_timeout)
+        print(f'[lint-server] 监听 {path}（pid {os.getpid()}，空闲 {self.idle_timeout:.0f}s 后退出）', flush=True)
+        try:
+            while self.running:
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    print('[lint-server] 空闲超时，退出', flush=True)
+                    break
+                with conn:
+                    self._serve_connection(conn)
+        finally:
+            server.close()
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        return 0
+
+    def _serve_connection(self, conn: socket.socket):
+        conn.settimeout(10)
+        data = b''
+        try:
+            while not data.endswith(b'\n'):
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+            try:
+                response = self.handle(json.loads(data))
+            except Exception as e:
+                response = {'error': str(e)}
+            conn.sendall(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+        except OSError as e:
+            print(f'[lint-server] 连接错误: {e}', flush=True)
+
+
+def start(idle_timeout: float) -> int:
+    status = request({'cmd': 'ping'}, timeout=1)
+    if status is not None:
+        print(f"✅ 服务已在运行（pid {status['pid']}）")
+        return 0
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with LOG_FILE.open('a', encoding='utf-8') as log:
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), 'serve', '--idle-timeout', str(idle_timeout)],
+            stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, start_new_session=True,
+        )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        status = request({'cmd': 'ping'}, timeout=1)
+        if status is not None:
+            print(f"✅ 服务已启动（pid {status['pid']}，socket {socket_path()}）")
+            return 0
+        time.sleep(0.1)
+    print(f'❌ 服务启动失败，查看日志: {LOG_FILE}')
+    return 1
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='architecture_linter 常驻服务')
+    parser.add_argument('command', choices=['start', 'serve', 'status', 'stop'])
+    parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help='空闲多少秒后自动退出（默认 1800）')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        return LintServer(args.idle_timeout).serve()
+    if args.command == 'start':
+        return start(args.idle_timeout)
+    if args.command == 'status':
+        status = request({'cmd': 'ping'}, timeout=1)
+        if status is None:
+            print('⏹️  服务未运行')
+            return 1
+        print(f"✅ 运行中：pid {status['pid']}，已处理 {status['requests']} 次请求，运行 {status['uptime_s']}s")
+        return 0
+    # stop
+    if request({'cmd': 'shutdown'}, timeout=1) is None:
+        print('⏹️  服务未运行')
+        return 0
+    print('🛑 服务已停止')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,16 +4,23 @@ Architecture Linter (precise)
 
 用途：在 pre-commit 中仅校验本次修改涉及的 architecture YAML 与模板一致性：
 1) file_path 存在性与命名匹配
-2) 必填字段存在（meta/file_path/widget|page|model|provider_definition 等）
+2) 必填字段存在（meta/file_path/widget|page|model|provider_definition 等），
+   且结构、类型与枚举取值符合 documents/templates 中对应类型的模板（见 architecture_schema.py）
 3) called_by/calls 指向的文件存在（如提供）
 4) i18n_keys 在 ARB 中存在（如提供）
 5) design_tokens 在主题中存在（如提供）
 
 使用：
-  scripts/architecture_linter.py --files <changed_paths...>
+  scripts/architecture_linter.py --files <changed_paths...> [--no-cache]
+  scripts/architecture_linter.py --all
+
+校验结论按文档内容摘要 + 依赖索引版本缓存在 build/architecture_lint_cache.json，
+只有文档本身、其用到的 ARB/token 索引、类型模板或引用文件的存在性变化时才重新校验。
+大量文档需要重新校验时，解析结果取自语料快照（architecture_manifest.py），只解析内容有变化的文档。
 返回：非零退出表示失败
 """
 import argparse
+import hashlib
 import json
 import os
 import sys
@@ -21,7 +28,11 @@ from pathlib import Path
 
 import yaml
 
-REPO_ROOT = Path(__file__).resolve().parents[1]
+from architecture_manifest import load_corpus
+from architecture_schema import doc_type_of, validate, validator_for
+
+# 项目根目录（GRANOFLOW_ROOT 可覆盖，用于基准测试的合成语料）
+REPO_ROOT = Path(os.environ.get("GRANOFLOW_ROOT") or Path(__file__).resolve().parents[1]).resolve()
 
 ARCH_DIR = REPO_ROOT / "documents" / "architecture"
 L10N_DIR = REPO_ROOT / "lib" / "l10n"
@@ -29,10 +40,13 @@ THEME_DIR = REPO_ROOT / "lib" / "core" / "theme"
 
 REQUIRED_TOP_FIELDS = ["meta"]
 
+# libyaml 可用时使用 C 实现的 SafeLoader（解析结果相同，速度快一个数量级）
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 def load_yaml(p: Path):
     try:
         with p.open("r", encoding="utf-8") as f:
-            return yaml.safe_load(f) or {}
+            return yaml.load(f, Loader=YAML_LOADER) or {}
     except Exception as e:
         return {"__error__": str(e)}
 
@@ -52,6 +66,13 @@ def check_required_fields(doc: dict, p: Path, errors: list):
         if f not in doc:
             errors.append(f"{p}: 缺少必填字段 {f}")
 
+def check_schema(doc: dict, p: Path, errors: list):
+    # 按类型模板编译的校验器（已缓存）；meta 缺失已由 check_required_fields 报告
+    for problem in validate(doc, p):
+        if problem.startswith("meta: "):
+            continue
+        errors.append(f"{p}: 结构不符合模板: {problem}")
+
 def _collect_arb_keys() -> set:
     keys = set()
     if L10N_DIR.exists():
@@ -79,20 +100,33 @@ def _collect_token_names() -> set:
 
 ARB_KEYS_CACHE = None
 TOKENS_CACHE = None
+# 索引内容的版本号（内容摘要），校验结果缓存据此判断是否失效
+INDEX_VERSIONS = {}
+
+def _version_of(names: set) -> str:
+    return hashlib.sha1("\n".join(sorted(names)).encode("utf-8")).hexdigest()[:16]
+
+def load_indexes(arb: bool = False, tokens: bool = False):
+    """构建 ARB key 与设计 token 索引（arb/tokens=True 时强制重建，用于源文件变化后）"""
+    global ARB_KEYS_CACHE, TOKENS_CACHE
+    if arb or ARB_KEYS_CACHE is None:
+        ARB_KEYS_CACHE = _collect_arb_keys()
+        INDEX_VERSIONS["arb"] = _version_of(ARB_KEYS_CACHE)
+    if tokens or TOKENS_CACHE is None:
+        TOKENS_CACHE = _collect_token_names()
+        INDEX_VERSIONS["tokens"] = _version_of(TOKENS_CACHE)
 
 def check_i18n_keys(doc: dict, p: Path, errors: list):
-    global ARB_KEYS_CACHE
     if ARB_KEYS_CACHE is None:
-        ARB_KEYS_CACHE = _collect_arb_keys()
+        load_indexes()
     keys = doc.get("i18n_keys") or []
     for k in keys:
         if k not in ARB_KEYS_CACHE:
             errors.append(f"{p}: i18n key 不存在于 ARB: {k}")
 
 def check_design_tokens(doc: dict, p: Path, errors: list):
-    global TOKENS_CACHE
     if TOKENS_CACHE is None:
-        TOKENS_CACHE = _collect_token_names()
+        load_indexes()
     tokens = doc.get("design_tokens") or []
     for t in tokens:
         if t not in TOKENS_CACHE:
@@ -106,25 +140,154 @@ def check_calls(doc: dict, p: Path, errors: list):
             if not rel_path.exists():
                 errors.append(f"{p}: {field} 指向的文件不存在: {rel}")
 
-def lint_arch_file(path: Path) -> list:
+def _lint_doc(data, path: Path) -> list:
     errors: list[str] = []
-    data = load_yaml(path)
     if "__error__" in data:
         errors.append(f"{path}: YAML 解析失败: {data['__error__']}")
         return errors
     check_required_fields(data, path, errors)
+    check_schema(data, path, errors)
     check_file_path(data, path, errors)
     check_calls(data, path, errors)
     check_i18n_keys(data, path, errors)
     check_design_tokens(data, path, errors)
     return errors
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--files", nargs="*", default=[])
-    args = parser.parse_args()
+def lint_arch_file(path: Path) -> list:
+    return _lint_doc(load_yaml(path), path)
+
+# ---- 校验结果缓存 ----
+# 每个文档记录：内容摘要、所依赖索引的版本（仅文档实际用到的 ARB / token 索引）、类型模板版本、
+# 引用文件（file_path / calls / called_by）的存在性。都未变化时直接返回上次的结论。
+LINT_CACHE_FILE = REPO_ROOT / "build" / "architecture_lint_cache.json"
+LINT_CACHE = None
+LINT_CACHE_DIRTY = False
+CACHE_STATS = {"hits": 0, "misses": 0}
+
+def _linter_version() -> str:
+    """linter 与结构校验器的版本（源码摘要），规则变化后缓存整体失效"""
+    digest = hashlib.sha1(Path(__file__).read_bytes())
+    digest.update(Path(sys.modules[validate.__module__].__file__).read_bytes())
+    return digest.hexdigest()[:16]
+
+def load_lint_cache() -> dict:
+    global LINT_CACHE
+    if LINT_CACHE is None:
+        version = _linter_version()
+        LINT_CACHE = {"linter": version, "entries": {}}
+        try:
+            with LINT_CACHE_FILE.open("r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("linter") == version:
+                LINT_CACHE = stored
+        except (OSError, ValueError):
+            pass
+    return LINT_CACHE
+
+def save_lint_cache():
+    global LINT_CACHE_DIRTY
+    if LINT_CACHE is None or not LINT_CACHE_DIRTY:
+        return
+    try:
+        LINT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = LINT_CACHE_FILE.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(LINT_CACHE, f, ensure_ascii=False)
+        os.replace(tmp, LINT_CACHE_FILE)
+        LINT_CACHE_DIRTY = False
+    except OSError:
+        pass
+
+def _dependencies(data, path: Path) -> dict:
+    """文档结论所依赖的索引版本、模板版本与引用文件存在性"""
+    deps = {}
+    if not isinstance(data, dict) or "__error__" in data:
+        return deps
+    doc_type = doc_type_of(data, path)
+    compiled = validator_for(doc_type) if doc_type else None
+    if compiled:
+        deps["schema"] = [doc_type, compiled[1]]
+    if data.get("i18n_keys"):
+        deps["arb"] = INDEX_VERSIONS["arb"]
+    if data.get("design_tokens"):
+        deps["tokens"] = INDEX_VERSIONS["tokens"]
+    refs = [(data.get("meta") or {}).get("file_path")]
+    for field in ("called_by", "calls"):
+        refs.extend(data.get(field) or [])
+    deps["files"] = {rel: (REPO_ROOT / rel).exists() for rel in refs if isinstance(rel, str) and rel}
+    return deps
 
-    changed = [Path(f) for f in args.files]
+def _dependencies_valid(deps: dict) -> bool:
+    for index in ("arb", "tokens"):
+        if index in deps and deps[index] != INDEX_VERSIONS.get(index):
+            return False
+    if "schema" in deps:
+        doc_type, version = deps["schema"]
+        compiled = validator_for(doc_type)
+        if compiled is None or compiled[1] != version:
+            return False
+    return all((REPO_ROOT / rel).exists() == exists for rel, exists in deps.get("files", {}).items())
+
+def lint_arch_file_cached(path: Path, manifest=None) -> list:
+    """带缓存的 lint_arch_file：文档内容与依赖均未变化时返回缓存的结论
+
+    manifest 为已加载的语料快照（architecture_manifest.Manifest）时，未命中的文档优先取快照中的解析结果。
+    """
+    global LINT_CACHE_DIRTY
+    try:
+        raw = path.read_bytes()
+    except OSError:
+        return lint_arch_file(path)
+    load_indexes()
+    entries = load_lint_cache()["entries"]
+    key = str(path.relative_to(REPO_ROOT)) if REPO_ROOT in path.parents else str(path)
+    digest = hashlib.sha1(raw).hexdigest()
+    prefix = f"{path}: "
+
+    entry = entries.get(key)
+    if entry and entry["hash"] == digest and _dependencies_valid(entry["deps"]):
+        CACHE_STATS["hits"] += 1
+        return [prefix + message for message in entry["errors"]]
+
+    CACHE_STATS["misses"] += 1
+    data = manifest.cached_doc(path, digest) if manifest is not None else None
+    if data is None:
+        try:
+            data = yaml.load(raw, Loader=YAML_LOADER) or {}
+        except Exception as e:
+            data = {"__error__": str(e)}
+    errors = _lint_doc(data, path)
+    # 错误信息去掉路径前缀后存储，仓库移动位置后缓存仍可用
+    entries[key] = {
+        "hash": digest,
+        "deps": _dependencies(data, path),
+        "errors": [e[len(prefix):] if e.startswith(prefix) else e for e in errors],
+    }
+    LINT_CACHE_DIRTY = True
+    return errors
+
+def _stat_stamp(paths) -> tuple:
+    stamp = []
+    for path in sorted(paths):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        stamp.append((str(path), st.st_mtime_ns, st.st_size))
+    return tuple(stamp)
+
+def index_stamps() -> dict:
+    """ARB 与主题源文件的 (路径, mtime, size) 快照，用于判断索引是否需要重建"""
+    return {
+        "arb": _stat_stamp(L10N_DIR.glob("*.arb") if L10N_DIR.exists() else []),
+        "tokens": _stat_stamp(THEME_DIR.rglob("*.dart") if THEME_DIR.exists() else []),
+    }
+
+def collect_targets(files, all_docs: bool = False) -> list:
+    """筛选出 documents/architecture 下的 YAML（相对路径按仓库根目录解析）"""
+    changed = [Path(f) for f in files]
+    if all_docs:
+        changed.extend(sorted(ARCH_DIR.rglob("*.y*ml")))
     targets = []
     for f in changed:
         try:
@@ -135,20 +298,48 @@ def main():
                 targets.append(p)
         except Exception:
             continue
+    return targets
 
-    if not targets:
-        return 0
+# 缓存未命中达到该数量（首次运行、模板或索引变化）且剩余文档仍不少于该数量时，
+# 加载语料快照（architecture_manifest），其余未命中的文档不再逐个解析
+MANIFEST_MIN_MISSES = 50
 
+def lint_paths(targets, use_cache: bool = True) -> list:
     all_errors: list[str] = []
-    for t in targets:
-        all_errors.extend(lint_arch_file(t))
+    if not use_cache:
+        for t in targets:
+            all_errors.extend(lint_arch_file(t))
+        return all_errors
+    manifest = None
+    misses_before = CACHE_STATS["misses"]
+    for index, t in enumerate(targets):
+        if (manifest is None and CACHE_STATS["misses"] - misses_before >= MANIFEST_MIN_MISSES
+                and len(targets) - index >= MANIFEST_MIN_MISSES):
+            manifest = load_corpus()
+        all_errors.extend(lint_arch_file_cached(t, manifest))
+    save_lint_cache()
+    return all_errors
 
-    if all_errors:
-        print("\n架构文档校验失败：\n" + "\n".join(all_errors))
+def report(errors: list) -> int:
+    if errors:
+        print("\n架构文档校验失败：\n" + "\n".join(errors))
         return 1
     return 0
 
-if __name__ == "__main__":
-    sys.exit(main())
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", nargs="*", default=[])
+    parser.add_argument("--all", action="store_true", help="校验 documents/architecture 下全部 YAML")
+    parser.add_argument("--no-cache", action="store_true", help="忽略校验结果缓存，逐个重新校验")
+    return parser
 
+def main(argv=None):
+    args = build_parser().parse_args(argv)
 
+    targets = collect_targets(args.files, args.all)
+    if not targets:
+        return 0
+    return report(lint_paths(targets, use_cache=not args.no_cache))
+
+if __name__ == "__main__":
+    sys.exit(main())
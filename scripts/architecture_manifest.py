@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+architecture YAML 的汇总清单与语料快照
+
+- build/architecture_manifest.json：documents/architecture 下每个文档的相对路径、大小、mtime、内容哈希、
+  文档类型与 meta 关键字段（name、type、file_path、last_synced_sha、last_updated、schema_version）
+- build/architecture_snapshot.marshal（可选）：全部文档的解析结果，一次读取即可拿到整个语料。
+  用 marshal 而不是 pickle：build/ 可被任意进程写入，pickle 读取时可能执行其中的代码，marshal 只还原基本类型
+
+生成器（yaml_create_all、yaml_generator、监听模式、bulk_update、provider_graph --write）写文档后调用
+record() 增量更新并 save()；其余改动由 refresh() 发现：mtime 与大小未变的文档直接沿用，变化的文档重新计算哈希，
+哈希也变化时才重新解析。快照中每个文档都带有哈希，与清单不一致的条目视为过期并重新解析，
+因此多个进程先后写入（后写覆盖先写）时最多多解析几个文档，不会读到旧内容。
+只读的调用方（lint、bulk_update --stale 等）通过 load_corpus() 刷新后不写回，不会改动 build/。
+
+用法：
+    python scripts/architecture_manifest.py [--no-snapshot] [--rebuild]   # 刷新并写回清单
+    python scripts/architecture_manifest.py --bench                       # 对比快照加载与逐个解析
+"""
+import hashlib
+import json
+import marshal
+import os
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import yaml
+
+from architecture_schema import ARCH_DIR, ROOT, doc_type_of
+
+MANIFEST_FILE = ROOT / 'build' / 'architecture_manifest.json'
+SNAPSHOT_FILE = ROOT / 'build' / 'architecture_snapshot.marshal'
+# 条目格式或解析方式变化时递增，旧清单与快照整体作废
+MANIFEST_VERSION = 1
+# 清单中记录的 meta 字段
+KEY_FIELDS = ('name', 'type', 'file_path', 'last_synced_sha', 'last_updated', 'schema_version')
+
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def _parse(raw: bytes) -> Tuple[Any, Optional[str]]:
+    """(解析结果, 错误信息)"""
+    try:
+        return yaml.load(raw, Loader=YAML_LOADER) or {}, None
+    except Exception as e:
+        return None, str(e)
+
+
+def _plain(value: Any) -> Any:
+    """转为可写入 JSON 的值（YAML 中未加引号的日期会解析为 date）"""
+    if isinstance(value, date):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+# 快照中日期的标记：marshal 不支持 date，存为 (标记, ISO 字符串)。YAML 解析结果中不会出现 tuple，不会混淆
+DATE_TAG = '!date'
+DATETIME_TAG = '!datetime'
+
+
+def _encode(value: Any) -> Tuple[Any, bool]:
+    """(可写入 marshal 的值, 是否含日期)"""
+    if isinstance(value, datetime):
+        return (DATETIME_TAG, value.isoformat()), True
+    if isinstance(value, date):
+        return (DATE_TAG, value.isoformat()), True
+    if isinstance(value, dict):
+        encoded, dated = {}, False
+        for k, v in value.items():
+            k, key_dated = _encode(k)
+            encoded[k], item_dated = _encode(v)
+            dated = dated or key_dated or item_dated
+        return encoded, dated
+    if isinstance(value, list):
+        items = [_encode(v) for v in value]
+        return [v for v, _ in items], any(d for _, d in items)
+    return value, False
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, tuple):
+        tag, iso = value
+        return datetime.fromisoformat(iso) if tag == DATETIME_TAG else date.fromisoformat(iso)
+    if isinstance(value, dict):
+        return {_decode(k): _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+def _entry(path: Path, raw: bytes, st: os.stat_result, doc: Any, error: Optional[str]) -> Dict[str, Any]:
+    meta = doc.get('meta') if isinstance(doc, dict) else None
+    entry = {
+        'hash': hashlib.sha1(raw).hexdigest(),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'doc_type': doc_type_of(doc, path) if isinstance(doc, dict) else None,
+        'meta': {k: _plain(meta[k]) for k in KEY_FIELDS if k in meta} if isinstance(meta, dict) else None,
+    }
+    if error is not None:
+        entry['error'] = error
+    return entry
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class Manifest:
+    """清单与快照的内存形式
+
+    entries: {相对 architecture 目录的路径: 条目}
+    docs:    {相对路径: (哈希, 解析结果)}，仅 snapshot=True 时维护
+    """
+
+    def __init__(self, snapshot: bool = True, arch_dir: Path = ARCH_DIR):
+        self.snapshot = snapshot
+        self.arch_dir = arch_dir
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.docs: Dict[str, Tuple[str, Any]] = {}
+        self.stats = {'parsed': 0, 'rehashed': 0, 'unchanged': 0, 'removed': 0}
+        self._dirty = False
+        self._docs_dirty = False
+
+    def load(self) -> 'Manifest':
+        try:
+            with MANIFEST_FILE.open('r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get('version') == MANIFEST_VERSION:
+                self.entries = stored['entries']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+        if self.snapshot:
+            try:
+                with SNAPSHOT_FILE.open('rb') as f:
+                    stored = marshal.load(f)
+                if stored.get('version') == MANIFEST_VERSION:
+                    docs = stored['docs']
+                    # 只有含日期的文档需要逐层还原
+                    for rel in stored['dated']:
+                        digest, doc = docs[rel]
+                        docs[rel] = (digest, _decode(doc))
+                    self.docs = docs
+            except Exception:
+                # 快照损坏或不兼容时整体丢弃，按清单重新解析
+                pass
+        return self
+
+    def save(self, snapshot: bool = True):
+        """写回有变化的清单与快照；snapshot=False 时暂不写快照（较大，常驻进程退出时再写）"""
+        if self._dirty:
+            payload = {'version': MANIFEST_VERSION, 'entries': self.entries}
+            _write_atomic(MANIFEST_FILE, json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+            self._dirty = False
+        if snapshot and self.snapshot and self._docs_dirty:
+            docs, dated = {}, []
+            for rel, (digest, doc) in self.docs.items():
+                encoded, has_dates = _encode(doc)
+                docs[rel] = (digest, encoded)
+                if has_dates:
+                    dated.append(rel)
+            payload = {'version': MANIFEST_VERSION, 'docs': docs, 'dated': dated}
+            _write_atomic(SNAPSHOT_FILE, marshal.dumps(payload))
+            self._docs_dirty = False
+
+    def _rel(self, path: Path) -> Optional[str]:
+        try:
+            return path.resolve().relative_to(self.arch_dir).as_posix()
+        except ValueError:
+            return None
+
+    def _fresh(self, rel: str, entry: Optional[Dict[str, Any]], st: os.stat_result) -> bool:
+        if not entry or entry['size'] != st.st_size or entry['mtime_ns'] != st.st_mtime_ns:
+            return False
+        if not self.snapshot or 'error' in entry:
+            return True
+        cached = self.docs.get(rel)
+        return cached is not None and cached[0] == entry['hash']
+
+    def _update(self, rel: str, path: Path, raw: bytes, st: os.stat_result, doc: Any = None):
+        digest = hashlib.sha1(raw).hexdigest()
+        entry = self.entries.get(rel)
+        cached = self.docs.get(rel)
+        if doc is None and entry and entry['hash'] == digest and (
+                not self.snapshot or 'error' in entry or (cached is not None and cached[0] == digest)):
+            # 内容未变，只有 mtime 变化（touch、git checkout 等）
+            entry['size'], entry['mtime_ns'] = st.st_size, st.st_mtime_ns
+            self.stats['rehashed'] += 1
+        else:
+            error = None
+            if doc is None:
+                doc, error = _parse(raw)
+                self.stats['parsed'] += 1
+            self.entries[rel] = _entry(path, raw, st, doc, error)
+            if self.snapshot:
+                if error is None:
+                    self.docs[rel] = (digest, doc)
+                else:
+                    self.docs.pop(rel, None)
+                self._docs_dirty = True
+        self._dirty = True
+
+    def refresh(self) -> Dict[str, int]:
+        """按当前文件同步清单：mtime/大小变化的文档重新计算哈希，哈希变化时重新解析"""
+        seen = set()
+        for path in sorted(self.arch_dir.rglob('*.y*ml')):
+            rel = path.relative_to(self.arch_dir).as_posix()
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            seen.add(rel)
+            if self._fresh(rel, self.entries.get(rel), st):
+                self.stats['unchanged'] += 1
+                continue
+            try:
+                raw = path.read_bytes()
+            except OSError:
+                seen.discard(rel)
+                continue
+            self._update(rel, path, raw, st)
+
+        for rel in set(self.entries) - seen:
+            del self.entries[rel]
+            self.stats['removed'] += 1
+            self._dirty = True
+        for rel in set(self.docs) - set(self.entries):
+            del self.docs[rel]
+            self._docs_dirty = True
+        return self.stats
+
+    def record(self, path: Path, doc: Any = None):
+        """生成器写入文档后调用
+
+        doc 为刚写入的内容（省去重新解析）；不在 architecture 目录下的路径忽略，文件已不存在时移除条目。
+        """
+        rel = self._rel(path)
+        if rel is None:
+            return
+        try:
+            # 先 stat 再读：两者之间文件若被改写，记录的 mtime 偏旧，下次 refresh 会重新计算哈希
+            st = path.stat()
+            raw = path.read_bytes()
+        except OSError:
+            self.forget(path)
+            return
+        self._update(rel, path, raw, st, doc)
+
+    def forget(self, path: Path):
+        rel = self._rel(path)
+        if self.entries.pop(rel, None) is not None:
+            self._dirty = True
+        if self.docs.pop(rel, None) is not None:
+            self._docs_dirty = True
+
+    def cached_doc(self, path: Path, digest: str) -> Any:
+        """快照中哈希为 digest 的解析结果；没有或已过期时返回 None"""
+        cached = self.docs.get(self._rel(path))
+        if cached is not None and cached[0] == digest:
+            return cached[1]
+        return None
+
+    def documents(self) -> Iterator[Tuple[Path, Any]]:
+        """按路径顺序返回 (路径, 解析结果)，跳过无法解析的文档（需要 snapshot=True）"""
+        for rel in sorted(self.entries):
+            cached = self.docs.get(rel)
+            if cached is not None and cached[0] == self.entries[rel]['hash']:
+                yield self.arch_dir / rel, cached[1]
+
+
+def load_corpus(snapshot: bool = True) -> Manifest:
+    """读取清单（与快照）并按当前文件刷新；不写回，修改了文档的调用方自行 save()"""
+    manifest = Manifest(snapshot=snapshot).load()
+    manifest.refresh()
+    return manifest
+
+
+def bench(rounds: int) -> Dict[str, float]:
+    """整个语料的加载耗时：快照一次读取 vs 逐个文件解析（取最快一轮）"""
+    load_corpus().save()
+    paths = sorted(ARCH_DIR.rglob('*.y*ml'))
+
+    def best_of(fn) -> float:
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - started)
+        return min(samples) * 1000
+
+    snapshot_ms = best_of(lambda: list(load_corpus().documents()))
+    manifest_ms = best_of(lambda: load_corpus(snapshot=False))
+    parse_ms = best_of(lambda: [_parse(p.read_bytes()) for p in paths])
+    return {'docs': len(paths), 'snapshot_ms': snapshot_ms, 'manifest_ms': manifest_ms, 'parse_ms': parse_ms}
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='刷新 architecture YAML 汇总清单与语料快照')
+    parser.add_argument('--no-snapshot', action='store_true', help='只维护清单，不读写语料快照')
+    parser.add_argument('--rebuild', action='store_true', help='忽略已有清单与快照，全部重新解析')
+    parser.add_argument('--bench', action='store_true', help='对比快照加载与逐个解析的耗时')
+    parser.add_argument('--rounds', type=int, default=5, help='--bench 的重复轮数（取最快一轮）')
+    args = parser.parse_args()
+
+    if args.bench:
+        result = bench(args.rounds)
+        print(f"📇 {result['docs']} 个文档：快照加载 {result['snapshot_ms']:.1f} ms，"
+              f"仅清单 {result['manifest_ms']:.1f} ms，逐个解析 {result['parse_ms']:.1f} ms")
+        return 0
+
+    started = time.perf_counter()
+    manifest = Manifest(snapshot=not args.no_snapshot)
+    if args.rebuild:
+        manifest._dirty = manifest._docs_dirty = True
+    else:
+        manifest.load()
+    stats = manifest.refresh()
+    manifest.save()
+    errors = sum(1 for entry in manifest.entries.values() if 'error' in entry)
+    print(f"📇 {len(manifest.entries)} 个文档：解析 {stats['parsed']}，仅 mtime 变化 {stats['rehashed']}，"
+          f"未变化 {stats['unchanged']}，移除 {stats['removed']}"
+          f"{f'，{errors} 个无法解析' if errors else ''}（{(time.perf_counter() - started) * 1000:.0f} ms）")
+    print(f'   {MANIFEST_FILE.relative_to(ROOT)}' + ('' if args.no_snapshot else f'，{SNAPSHOT_FILE.relative_to(ROOT)}'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
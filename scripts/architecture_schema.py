@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+按文档类型从模板编译的 architecture YAML 结构校验器
+
+documents/templates/<type>_template.yaml 即各类型文档的结构定义。模板编译一次（按 mtime 缓存）
+为嵌套的校验闭包，校验时不再遍历模板：
+
+- 必填：meta 与 <type>_definition，以及模板中这两节列出的全部键（performance_lints 等自动生成的键除外）
+- 类型：模板为映射/列表/布尔/整数的字段，文档中必须是同类值；字符串占位符接受任意标量
+- 枚举：模板值为 "a|b|c" 且各项均为小写标识符时视为枚举（如 pattern、storage），
+  取值必须是其中之一；原样保留的占位符视为未填写，不报错
+- meta.type 必须与文档类型（类别目录）一致
+
+列表字段按模板中各条目键的并集校验条目（条目内不要求必填）。
+
+用法：
+    python scripts/architecture_schema.py [--all | <yaml 文件...>]
+    python scripts/architecture_schema.py --bench [--rounds 5]   # 校验吞吐量（不含 YAML 解析）
+"""
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+# 项目根目录（GRANOFLOW_ROOT 可覆盖，用于基准测试的合成语料）
+ROOT = Path(os.environ.get('GRANOFLOW_ROOT') or Path(__file__).resolve().parents[1]).resolve()
+TEMPLATE_DIR = ROOT / 'documents' / 'templates'
+ARCH_DIR = ROOT / 'documents' / 'architecture'
+
+DOC_TYPES = ('widget', 'page', 'model', 'provider', 'repository', 'service')
+# 类别目录 → 文档类型
+DIR_TYPES = {f'{t}s' if t != 'repository' else 'repositories': t for t in DOC_TYPES}
+# 定义节中由工具生成、可以缺省的键
+OPTIONAL_DEFINITION_KEYS = {'performance_lints'}
+
+_ENUM_CHOICE = re.compile(r'^[a-z][a-z0-9_]*$')
+_BOOL_PLACEHOLDER = 'true|false'
+
+# 校验函数：(value, emit, location) → None；emit(location, message) 记录一条问题
+Emit = Callable[[str, str], None]
+Validator = Callable[[Any, Emit, str], None]
+
+_VALIDATORS: Dict[str, Tuple[int, Validator, str]] = {}
+_lock = threading.Lock()
+
+
+def _join(location: str, key: Any) -> str:
+    return f'{location}.{key}' if location else str(key)
+
+
+def _type_name(value: Any) -> str:
+    if isinstance(value, dict):
+        return '映射'
+    if isinstance(value, list):
+        return '列表'
+    if isinstance(value, bool):
+        return '布尔'
+    if isinstance(value, int):
+        return '整数'
+    if value is None:
+        return '空值'
+    return '字符串' if isinstance(value, str) else type(value).__name__
+
+
+def _any(value, emit, location):
+    pass
+
+
+def _scalar(value, emit, location):
+    if isinstance(value, (dict, list)):
+        emit(location, f'应为标量，实际为{_type_name(value)}')
+
+
+def _boolean(value, emit, location):
+    if not isinstance(value, bool) and value != _BOOL_PLACEHOLDER:
+        emit(location, f'应为布尔值，实际为{_type_name(value)}: {value!r}')
+
+
+def _integer(value, emit, location):
+    if isinstance(value, bool) or not isinstance(value, int):
+        emit(location, f'应为整数，实际为{_type_name(value)}: {value!r}')
+
+
+def _enum(placeholder: str) -> Validator:
+    choices = frozenset(placeholder.split('|'))
+
+    def check(value, emit, location):
+        if value in choices or value == placeholder:
+            return
+        emit(location, f'取值 {value!r} 不在 {placeholder} 中')
+    return check
+
+
+def _mapping(children: Dict[str, Validator], required: frozenset) -> Validator:
+    items = tuple(children.items())
+    # 按模板顺序报告缺失字段，输出稳定
+    required_keys = tuple(k for k in children if k in required) + tuple(sorted(required - children.keys()))
+
+    def check(value, emit, location):
+        if not isinstance(value, dict):
+            emit(location, f'应为映射，实际为{_type_name(value)}')
+            return
+        for key in required_keys:
+            if key not in value:
+                emit(_join(location, key), '缺少必填字段')
+        for key, child in items:
+            item = value.get(key)
+            # 可选字段允许为空值
+            if item is not None:
+                child(item, emit, _join(location, key))
+    return check
+
+
+def _sequence(item: Optional[Validator]) -> Validator:
+    def check(value, emit, location):
+        if not isinstance(value, list):
+            emit(location, f'应为列表，实际为{_type_name(value)}')
+            return
+        if item is None:
+            return
+        for index, element in enumerate(value):
+            if element is not None:
+                item(element, emit, f'{location}[{index}]')
+    return check
+
+
+def compile_node(template: Any, required: frozenset = frozenset()) -> Validator:
+    """把模板中的一个值编译为校验函数"""
+    if isinstance(template, dict):
+        children = {key: compile_node(value) for key, value in template.items()}
+        return _mapping(children, required)
+    if isinstance(template, list):
+        mappings = [t for t in template if isinstance(t, dict)]
+        if not mappings:
+            return _sequence(None)
+        # 条目键取并集（同一列表中的示例条目可能展示不同的可选键），后出现的同名键不覆盖
+        merged: Dict[str, Any] = {}
+        for entry in mappings:
+            for key, value in entry.items():
+                merged.setdefault(key, value)
+        return _sequence(compile_node(merged))
+    if isinstance(template, bool):
+        return _boolean
+    if isinstance(template, int):
+        return _integer
+    if isinstance(template, str):
+        if template == _BOOL_PLACEHOLDER:
+            return _boolean
+        if '|' in template and all(_ENUM_CHOICE.match(c) for c in template.split('|')):
+            return _enum(template)
+        return _scalar
+    return _any
+
+
+def compile_template(doc_type: str, template: Dict[str, Any]) -> Validator:
+    """编译整份模板：meta 与定义节必填，其余顶层键可选"""
+    definition = f'{doc_type}_definition'
+    children: Dict[str, Validator] = {}
+    for key, value in template.items():
+        if key == 'meta' and isinstance(value, dict):
+            children[key] = compile_node(value, frozenset(value))
+        elif key == definition and isinstance(value, dict):
+            children[key] = compile_node(value, frozenset(value) - OPTIONAL_DEFINITION_KEYS)
+        else:
+            children[key] = compile_node(value)
+    root = _mapping(children, frozenset({'meta', definition}))
+
+    def check(doc, emit, location=''):
+        root(doc, emit, location)
+        doc_meta = doc.get('meta') if isinstance(doc, dict) else None
+        if isinstance(doc_meta, dict) and 'type' in doc_meta and doc_meta['type'] != doc_type:
+            emit('meta.type', f'应为 {doc_type}，实际为 {doc_meta["type"]!r}')
+    return check
+
+
+def validator_for(doc_type: str) -> Optional[Tuple[Validator, str]]:
+    """类型对应的 (校验函数, 模板版本)；模板不存在时返回 None。模板修改后自动重新编译"""
+    template_path = TEMPLATE_DIR / f'{doc_type}_template.yaml'
+    try:
+        mtime = template_path.stat().st_mtime_ns
+    except OSError:
+        return None
+    with _lock:
+        cached = _VALIDATORS.get(doc_type)
+    if cached is not None and cached[0] == mtime:
+        return cached[1], cached[2]
+    raw = template_path.read_bytes()
+    template = yaml.load(raw, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
+    compiled = (mtime, compile_template(doc_type, template), hashlib.sha1(raw).hexdigest()[:16])
+    with _lock:
+        _VALIDATORS[doc_type] = compiled
+    return compiled[1], compiled[2]
+
+
+def doc_type_of(doc: Any, path: Optional[Path] = None) -> Optional[str]:
+    """文档类型：优先类别目录名（meta.type 写错时仍按目录校验），其次 meta.type"""
+    if path is not None and path.parent.name in DIR_TYPES:
+        return DIR_TYPES[path.parent.name]
+    meta = doc.get('meta') if isinstance(doc, dict) else None
+    if isinstance(meta, dict) and meta.get('type') in DOC_TYPES:
+        return meta['type']
+    return None
+
+
+def validate(doc: Any, path: Optional[Path] = None) -> List[str]:
+    """校验一份文档，返回问题列表（"位置: 说明"）；类型未知时不校验"""
+    doc_type = doc_type_of(doc, path)
+    if doc_type is None:
+        return []
+    compiled = validator_for(doc_type)
+    if compiled is None:
+        return []
+    problems: List[str] = []
+    compiled[0](doc, lambda location, message: problems.append(f'{location}: {message}'))
+    return problems
+
+
+def bench(paths: List[Path], rounds: int) -> Dict[str, float]:
+    """校验吞吐量：文档预先解析，只计编译与校验耗时"""
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    docs = []
+    for path in paths:
+        with path.open('r', encoding='utf-8') as f:
+            docs.append((yaml.load(f, Loader=loader) or {}, path))
+
+    _VALIDATORS.clear()
+    started = time.perf_counter()
+    for doc_type in DOC_TYPES:
+        validator_for(doc_type)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    samples = []
+    problems = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        problems = sum(len(validate(doc, path)) for doc, path in docs)
+        samples.append(time.perf_counter() - started)
+    best = min(samples)
+    return {
+        'docs': len(docs),
+        'compile_ms': compile_ms,
+        'validate_ms': best * 1000,
+        'docs_per_s': len(docs) / best if best else float('inf'),
+        'problems': problems,
+    }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='按模板校验 architecture YAML 结构')
+    parser.add_argument('files', nargs='*', help='要校验的 YAML 文件')
+    parser.add_argument('--all', action='store_true', help='校验 documents/architecture 下全部文档')
+    parser.add_argument('--bench', action='store_true', help='测量全部文档的校验吞吐量')
+    parser.add_argument('--rounds', type=int, default=5, help='--bench 的重复轮数（取最快一轮）')
+    args = parser.parse_args()
+
+    paths = [Path(f).resolve() for f in args.files]
+    if args.all or args.bench or not paths:
+        paths.extend(sorted(ARCH_DIR.rglob('*.yaml')))
+
+    if args.bench:
+        result = bench(paths, args.rounds)
+        print(f"📐 {result['docs']} 个文档：编译 {result['compile_ms']:.1f} ms，"
+              f"校验 {result['validate_ms']:.1f} ms（{result['docs_per_s']:.0f} 文档/s），"
+              f"发现 {result['problems']} 个问题")
+        return 0
+
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    failed = 0
+    for path in paths:
+        with path.open('r', encoding='utf-8') as f:
+            doc = yaml.load(f, Loader=loader) or {}
+        problems = validate(doc, path)
+        if problems:
+            failed += 1
+            for problem in problems:
+                print(f'{path}: {problem}')
+    print(f'[schema] {len(paths)} 个文档，{failed} 个不符合模板', file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
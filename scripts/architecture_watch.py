@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+architecture YAML 的监听模式（常驻进程）
+
+监听 lib/ 与 documents/templates/ 的保存事件（Linux 使用 inotify，其他平台或 --poll 时按 mtime 轮询），
+去抖后只重新生成并校验受影响的文档：
+
+- Dart 源文件：重新生成所属类别的文档（源文件删除或变为 enum 文件时删除文档）；
+  provider 依赖图按文件增量更新，watched_by 等字段变化的 provider 文档一并重新生成；
+  Isar 实体变化时重新生成全部 repository 文档
+- 文件新增/删除：重新校验 calls/called_by 引用了该文件的文档
+- ARB 文件：重建 i18n key 索引，重新校验含 i18n_keys 的文档
+- 主题文件（lib/core/theme）：重建设计 token 索引，重新校验含 design_tokens 的文档
+- 文档模板：重新生成该类型的全部文档
+
+模板、lint 索引、源文件内容与依赖图都保存在进程内，每次只刷新变化部分。
+Dart 分析器以常驻进程运行（dart_analyzer.dart --stdin），VM 与分析上下文只启动一次，
+每次保存只增量分析变化的文件；依赖图在预热时构建（Dart 与正则路径相同）。
+文档索引从语料快照预热（architecture_manifest.py）；每批处理后更新汇总清单，退出时写回快照。
+
+用法：
+    python scripts/architecture_watch.py [--poll] [--interval 0.5] [--debounce 0.2] [--no-lint]
+"""
+import concurrent.futures
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+import architecture_linter
+import isar_query_analyzer
+import provider_graph
+import source_index
+from adaptive_concurrency import analyzer_limiter
+from architecture_linter import lint_arch_file, load_indexes, load_yaml
+from architecture_manifest import Manifest
+from source_index import EXCLUDE_DIRS, files_under, is_excluded
+from yaml_create_all import ROOT, TYPE_MAPPINGS, category_for, generate_yaml_file, is_enum_file
+from yaml_generator import DartAnalyzerProcess, dart_analyzer_available, use_persistent_analyzer
+
+LIB_DIR = ROOT / 'lib'
+TEMPLATE_DIR = ROOT / 'documents' / 'templates'
+L10N_DIR = architecture_linter.L10N_DIR
+THEME_DIR = architecture_linter.THEME_DIR
+ENTITY_DIR = isar_query_analyzer.ENTITY_DIR
+WATCH_ROOTS = [LIB_DIR, TEMPLATE_DIR]
+
+DEFAULT_DEBOUNCE = 0.2
+DEFAULT_INTERVAL = 0.5
+
+# inotify 事件掩码（linux/inotify.h）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+_EVENT = struct.Struct('iIII')
+
+
+def is_watched_file(path: Path) -> bool:
+    """是否为需要响应的文件：Dart 源文件、ARB、文档模板"""
+    name = path.name
+    if name.startswith('.'):
+        return False
+    if name.endswith('.dart'):
+        return not is_excluded(name)
+    if name.endswith('.arb'):
+        return True
+    return path.parent == TEMPLATE_DIR and name.endswith('_template.yaml')
+
+
+def _watched_dirs(root: Path) -> Iterable[Path]:
+    yield root
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.') and d not in EXCLUDE_DIRS]
+        for d in dirnames:
+            yield Path(dirpath) / d
+
+
+class InotifyWatcher:
+    """基于 inotify 的目录监听（仅 Linux）"""
+
+    def __init__(self, roots: List[Path]):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        self.dirs: Dict[int, Path] = {}
+        for root in roots:
+            for directory in _watched_dirs(root):
+                self._add(directory)
+
+    def _add(self, directory: Path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f'inotify_add_watch 失败: {directory}（可调大 fs.inotify.max_user_watches 或使用 --poll）')
+        self.dirs[wd] = directory
+
+    def poll(self, timeout: Optional[float]) -> Optional[Set[Path]]:
+        """等待事件，返回变化的文件；事件队列溢出时返回 None（需要全量处理）"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return set()
+        changed: Set[Path] = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            directory = self.dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not path.name.startswith('.') and path.name not in EXCLUDE_DIRS:
+                    # 新目录：补充监听并把已存在的文件视为新增（mkdir 与写入之间可能已有文件）
+                    for sub in _watched_dirs(path):
+                        self._add(sub)
+                        changed.update(p for p in sub.iterdir() if p.is_file() and is_watched_file(p))
+                continue
+            if is_watched_file(path):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """按 mtime/size 轮询的降级实现"""
+
+    def __init__(self, roots: List[Path], interval: float = DEFAULT_INTERVAL):
+        self.roots = roots
+        self.interval = interval
+        self.state = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        state = {}
+        for root in self.roots:
+            for directory in _watched_dirs(root):
+                try:
+                    entries = list(os.scandir(directory))
+                except OSError:
+                    continue
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False) and is_watched_file(Path(entry.path)):
+                        stat = entry.stat(follow_symlinks=False)
+                        state[Path(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def poll(self, timeout: Optional[float]) -> Optional[Set[Path]]:
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        current = self._scan()
+        changed = {p for p, sig in current.items() if self.state.get(p) != sig}
+        changed.update(p for p in self.state if p not in current)
+        self.state = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(force_poll: bool = False, interval: float = DEFAULT_INTERVAL):
+    roots = [r for r in WATCH_ROOTS if r.exists()]
+    if not force_poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError) as e:
+            print(f'⚠️  inotify 不可用（{e}），改为轮询')
+    return PollingWatcher(roots, interval)
+
+
+class WatchSession:
+    """保持各类缓存常驻，按变化的文件增量重新生成与校验文档"""
+
+    def __init__(self, lint: bool = True):
+        self.lint = lint
+        # 文档索引：被引用文件 → 文档、含 i18n_keys / design_tokens 的文档
+        self.referenced_by: Dict[str, Set[Path]] = {}
+        self.docs_with_i18n: Set[Path] = set()
+        self.docs_with_tokens: Set[Path] = set()
+        self.known_sources: Set[Path] = set(source_index.dart_files(LIB_DIR))
+        self.manifest = Manifest()
+        self.analyzer: Optional[DartAnalyzerProcess] = None
+
+    def warm_up(self):
+        started = time.perf_counter()
+        load_indexes()
+        self.manifest.load().refresh()
+        self.manifest.save()
+        count = 0
+        for doc_path, doc in self.manifest.documents():
+            self._index_doc(doc_path, doc)
+            count += 1
+        use_dart = dart_analyzer_available()
+        if use_dart:
+            self.analyzer = DartAnalyzerProcess(LIB_DIR)
+            use_persistent_analyzer(self.analyzer)
+        # 依赖图必须在第一次变化前建好，否则无法比较其他 provider 的 watched_by / 扇出变化；
+        # Dart 路径下整个 lib/ 经常驻进程批量分析，同时完成分析器预热
+        provider_graph.load_graph(use_dart=use_dart)
+        print(f'🔥 预热完成：{count} 个文档，{len(self.known_sources)} 个源文件，'
+              f'{"常驻 Dart 分析器" if use_dart else "正则分析"}（{(time.perf_counter() - started) * 1000:.0f} ms）')
+
+    def close(self):
+        if self.analyzer is not None:
+            use_persistent_analyzer(None)
+            self.analyzer.close()
+            self.analyzer = None
+        self.manifest.save()
+
+    def _index_doc(self, doc_path: Path, doc=None):
+        self._unindex_doc(doc_path)
+        if doc is None:
+            doc = load_yaml(doc_path)
+        if not isinstance(doc, dict) or '__error__' in doc:
+            return
+        for field in ('called_by', 'calls'):
+            for rel in doc.get(field) or []:
+                self.referenced_by.setdefault(rel, set()).add(doc_path)
+        if doc.get('i18n_keys'):
+            self.docs_with_i18n.add(doc_path)
+        if doc.get('design_tokens'):
+            self.docs_with_tokens.add(doc_path)
+
+    def _unindex_doc(self, doc_path: Path):
+        for docs in self.referenced_by.values():
+            docs.discard(doc_path)
+        self.docs_with_i18n.discard(doc_path)
+        self.docs_with_tokens.discard(doc_path)
+
+    def _relative(self, path: Path) -> str:
+        return str(path.relative_to(ROOT))
+
+    def _target(self, dart_file: Path) -> Optional[Tuple[Path, str]]:
+        """源文件对应的文档路径与类型（文件名与同类别中已有文件重复时归属先出现的文件）"""
+        match = category_for(dart_file)
+        if match is None:
+            return None
+        _, config = match
+        dirs = [config['dart_dir']] if 'dart_dir' in config else config.get('dart_dirs', [])
+        siblings = [f for f in files_under([d for d in dirs if d.exists()], config.get('pattern', '*.dart'))
+                    if f.stem == dart_file.stem]
+        if siblings and siblings[0] != dart_file.resolve():
+            return None
+        return config['yaml_dir'] / f'{dart_file.stem}.yaml', config['type']
+
+    def _all_targets(self, doc_type: str) -> Dict[Path, Tuple[Path, str]]:
+        config = next(c for c in TYPE_MAPPINGS.values() if c['type'] == doc_type)
+        dirs = [config['dart_dir']] if 'dart_dir' in config else config.get('dart_dirs', [])
+        return {
+            f: (config['yaml_dir'] / f'{f.stem}.yaml', doc_type)
+            for f in files_under([d for d in dirs if d.exists()], config.get('pattern', '*.dart'))
+        }
+
+    def _provider_sections(self) -> Dict[str, Dict]:
+        graph = provider_graph.cached_graph()
+        if graph is None:
+            return {}
+        return {p['file']: provider_graph.file_section(graph, p['file']) for p in graph['providers'].values()}
+
+    def handle(self, changed: Optional[Set[Path]]):
+        """处理一批变化的文件（None 表示事件丢失，按全部源文件处理）"""
+        started = time.perf_counter()
+        if changed is None:
+            print('⚠️  事件队列溢出，重新处理全部源文件')
+            source_index.invalidate()
+            provider_graph.invalidate()
+            isar_query_analyzer.invalidate()
+            changed = set(source_index.dart_files(LIB_DIR)) | set(L10N_DIR.glob('*.arb'))
+        changed = {p.resolve() if p.exists() else p for p in changed}
+
+        dart_changed = sorted(p for p in changed if p.suffix == '.dart')
+        arb_changed = any(p.suffix == '.arb' for p in changed)
+        templates_changed = sorted(p for p in changed if p.suffix == '.yaml')
+
+        regenerate: Dict[Path, Tuple[Path, str]] = {}
+        relint: Set[Path] = set()
+
+        # 1. 刷新源文件缓存
+        added_or_removed = []
+        for path in dart_changed:
+            exists = path.exists()
+            if exists != (path in self.known_sources):
+                added_or_removed.append(path)
+                (self.known_sources.add if exists else self.known_sources.discard)(path)
+            source_index.invalidate(path, rescan=path in added_or_removed)
+        if self.analyzer is not None and dart_changed:
+            # 依赖这些文件的其他文件下次分析时重新解析
+            self.analyzer.changed(dart_changed)
+
+        # 2. 源文件自身的文档
+        for path in dart_changed:
+            target = self._target(path)
+            if target:
+                regenerate[path] = target
+            # 文件新增/删除会改变 calls/called_by 引用的有效性
+            if path in added_or_removed:
+                relint.update(self.referenced_by.get(self._relative(path), ()))
+
+        # 3. 依赖图：增量收集变化的文件，找出依赖关系变化的 provider 文档
+        if dart_changed:
+            before = self._provider_sections()
+            provider_graph.invalidate(dart_changed)
+            provider_graph.load_graph(use_dart=self.analyzer is not None)
+            after = self._provider_sections()
+            for rel in set(before) | set(after):
+                if before.get(rel) != after.get(rel):
+                    path = ROOT / rel
+                    target = self._target(path) if path.exists() else None
+                    if target:
+                        regenerate[path] = target
+
+        # 4. Isar 实体：查询分析依赖全部集合定义
+        if any(ENTITY_DIR in p.parents for p in dart_changed):
+            isar_query_analyzer.invalidate()
+            regenerate.update(self._all_targets('repository'))
+
+        # 5. 模板：该类型全部文档
+        for template in templates_changed:
+            doc_type = template.name[:-len('_template.yaml')]
+            if any(c['type'] == doc_type for c in TYPE_MAPPINGS.values()):
+                regenerate.update(self._all_targets(doc_type))
+
+        # 6. lint 索引
+        theme_changed = any(THEME_DIR in p.parents for p in dart_changed)
+        if arb_changed or theme_changed:
+            load_indexes(arb=arb_changed, tokens=theme_changed)
+            if arb_changed:
+                relint.update(self.docs_with_i18n)
+            if theme_changed:
+                relint.update(self.docs_with_tokens)
+
+        results = self._regenerate(regenerate)
+        relint.update(p for p, status in results.items() if status not in ('removed', 'failed'))
+        relint = {p for p in relint if p.exists()}
+
+        self.manifest.save(snapshot=False)
+
+        errors: List[str] = []
+        if self.lint:
+            for doc_path in sorted(relint):
+                errors.extend(lint_arch_file(doc_path))
+
+        elapsed = (time.perf_counter() - started) * 1000
+        counts = {}
+        for status in results.values():
+            counts[status] = counts.get(status, 0) + 1
+        summary = '，'.join(f'{k} {v}' for k, v in sorted(counts.items())) or '无文档需要重新生成'
+        lint_note = f'，校验 {len(relint)} 个' if self.lint else ''
+        icon = '❌' if errors or counts.get('failed') else '✅'
+        print(f'{icon} [{time.strftime("%H:%M:%S")}] {len(changed)} 个文件变化 → {summary}{lint_note}（{elapsed:.0f} ms）')
+        for error in errors:
+            print(f'    {error}')
+
+    def _regenerate(self, targets: Dict[Path, Tuple[Path, str]]) -> Dict[Path, str]:
+        """重新生成文档，返回 {文档路径: created/updated/unchanged/removed/failed}"""
+        results: Dict[Path, str] = {}
+        to_generate = {}
+        for dart_file, (yaml_path, doc_type) in targets.items():
+            if not dart_file.exists() or is_enum_file(dart_file):
+                if yaml_path.exists():
+                    yaml_path.unlink()
+                    self._unindex_doc(yaml_path)
+                    self.manifest.forget(yaml_path)
+                    results[yaml_path] = 'removed'
+                    print(f'    🗑️  {yaml_path.relative_to(ROOT)}')
+                continue
+            to_generate[dart_file] = (yaml_path, doc_type)
+
+        if not to_generate:
+            return results
+
+        def run(item):
+            dart_file, (yaml_path, doc_type) = item
+            yaml_path.parent.mkdir(parents=True, exist_ok=True)
+            return dart_file, yaml_path, generate_yaml_file(dart_file, yaml_path, doc_type)
+
+        workers = min(len(to_generate), analyzer_limiter().max_workers)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            for dart_file, yaml_path, (success, message, doc, status) in executor.map(run, to_generate.items()):
+                if success:
+                    results[yaml_path] = status
+                    self._index_doc(yaml_path, doc)
+                    if status != 'unchanged':
+                        self.manifest.record(yaml_path, doc)
+                        print(f"    {'🆕' if status == 'created' else '✏️ '} {yaml_path.relative_to(ROOT)}")
+                else:
+                    results[yaml_path] = 'failed'
+                    print(f'    ❌ {yaml_path.relative_to(ROOT)}: {message[:100]}')
+        return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='监听源文件变化，增量重新生成并校验 architecture YAML')
+    parser.add_argument('--poll', action='store_true', help='强制使用轮询（不使用 inotify）')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='轮询间隔（秒）')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                        help='去抖时间（秒）：最后一次事件后静默这么久才开始处理')
+    parser.add_argument('--no-lint', action='store_true', help='只重新生成，不校验')
+    args = parser.parse_args()
+
+    session = WatchSession(lint=not args.no_lint)
+    session.warm_up()
+    watcher = create_watcher(args.poll, args.interval)
+    mode = 'inotify' if isinstance(watcher, InotifyWatcher) else f'轮询（{args.interval}s）'
+    print(f'👀 监听 {", ".join(str(r.relative_to(ROOT)) for r in WATCH_ROOTS)}（{mode}），Ctrl+C 退出')
+
+    try:
+        while True:
+            batch = watcher.poll(None)
+            if batch is not None and not batch:
+                continue
+            # 去抖：编辑器保存常伴随多次写入/重命名，静默 debounce 秒后一次处理
+            while batch is not None:
+                more = watcher.poll(args.debounce)
+                if more is None:
+                    batch = None
+                elif more:
+                    batch |= more
+                else:
+                    break
+            try:
+                session.handle(batch)
+            except Exception as e:
+                print(f'❌ 处理失败: {e}')
+    except KeyboardInterrupt:
+        print('\n👋 已退出监听')
+    finally:
+        watcher.close()
+        session.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+基准测试用合成 Dart 语料生成器
+
+按本仓库的目录结构生成 widget / page / provider / repository / model / service 源文件，
+以及配套的 Isar 实体、主题令牌、ARB 文件与 documents/architecture 下的 YAML 文档，
+用于在 100 ~ 20000 个文件的规模上测量 yaml_generator / yaml_create_all / architecture_linter /
+architecture_bulk_update 的扩展性（真实仓库太小，看不出问题）。
+
+生成结果是一个独立的“项目根目录”，配合环境变量 GRANOFLOW_ROOT 使用：
+    python scripts/benchmark_corpus.py --files 1000 --out /tmp/corpus-1000
+    GRANOFLOW_ROOT=/tmp/corpus-1000 GRANOFLOW_NO_DART=1 python scripts/yaml_create_all.py
+
+同一 seed 与规模的输出完全确定。
+"""
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+TEMPLATE_DIR = SCRIPTS_DIR.parent / 'documents' / 'templates'
+
+# 各类型占比（与真实仓库接近：widget 最多，其次 model）
+DISTRIBUTION = [
+    ('widget', 0.35),
+    ('page', 0.10),
+    ('provider', 0.10),
+    ('repository', 0.10),
+    ('model', 0.20),
+    ('service', 0.15),
+]
+
+PAGE_DIRS = ['home', 'tasks', 'inbox', 'achievements', 'timer', 'completion_management']
+WIDGET_GROUPS = ['', '', '', 'cards', 'dialogs', 'lists']
+
+ADJECTIVES = ['quick', 'focus', 'daily', 'smart', 'calm', 'bright', 'deep', 'shared', 'pinned', 'nested']
+NOUNS = ['task', 'tag', 'session', 'metric', 'timer', 'goal', 'note', 'project', 'habit', 'reminder']
+COLOR_TOKENS = [
+    'primaryBlue', 'seaSaltBlue', 'lakeCyan', 'softGreen', 'softPink', 'warmYellow',
+    'silverGray', 'lightBlueGray', 'disabledGray', 'secondaryText', 'errorDark', 'surfaceLight',
+]
+
+# 生成器写入输出目录的标记文件：只有带标记的目录才会被自动清空重建
+MARKER_FILE = '.granoflow-bench-corpus'
+
+ARCH_CATEGORY = {
+    'widget': 'widgets', 'page': 'pages', 'provider': 'providers',
+    'repository': 'repositories', 'model': 'models', 'service': 'services',
+}
+
+
+def _pascal(snake: str) -> str:
+    return ''.join(part.capitalize() for part in snake.split('_'))
+
+
+def _camel(snake: str) -> str:
+    pascal = _pascal(snake)
+    return pascal[0].lower() + pascal[1:]
+
+
+def _relative_import(from_file: str, to_file: str) -> str:
+    return os.path.relpath(to_file, os.path.dirname(from_file)).replace(os.sep, '/')
+
+
+class CorpusBuilder:
+    def __init__(self, out: Path, files: int, seed: int = 0, force: bool = False):
+        self.out = out
+        self.files = files
+        self.force = force
+        self.rng = random.Random(seed)
+        self.i18n_keys = [f'{_camel(a + "_" + n)}{i}' for i in range(max(20, files // 20))
+                          for a, n in [(ADJECTIVES[i % 10], NOUNS[(i // 10) % 10])]]
+        self.entries: Dict[str, List[Dict]] = {kind: [] for kind, _ in DISTRIBUTION}
+
+    # ---- 规划 ----
+
+    def plan(self):
+        """按占比分配文件名与路径（先规划再生成，便于跨文件引用）"""
+        remaining = self.files
+        for index, (kind, share) in enumerate(DISTRIBUTION):
+            count = remaining if index == len(DISTRIBUTION) - 1 else max(1, round(self.files * share))
+            count = min(count, remaining)
+            remaining -= count
+            for n in range(count):
+                stem = f'{ADJECTIVES[n % 10]}_{NOUNS[(n // 10) % 10]}_{n}'
+                if kind == 'widget':
+                    group = WIDGET_GROUPS[n % len(WIDGET_GROUPS)]
+                    path = '/'.join(p for p in ['lib/presentation/widgets', group, f'{stem}.dart'] if p)
+                elif kind == 'page':
+                    stem = f'{stem}_page'
+                    path = f'lib/presentation/{PAGE_DIRS[n % len(PAGE_DIRS)]}/{stem}.dart'
+                elif kind == 'provider':
+                    stem = f'{stem}_providers'
+                    path = f'lib/core/providers/{stem}.dart'
+                elif kind == 'repository':
+                    stem = f'{stem}_repository'
+                    path = f'lib/data/repositories/{stem}.dart'
+                elif kind == 'model':
+                    stem = f'{stem}_data'
+                    path = f'lib/data/models/{stem}.dart'
+                else:
+                    stem = f'{stem}_service'
+                    path = f'lib/core/services/{stem}.dart'
+                self.entries[kind].append({'stem': stem, 'class': _pascal(stem), 'path': path})
+
+        # 每个 widget 挂到一个页面下：页面 import 它，widget 文档的 called_by 指向该页面
+        pages = self.entries['page']
+        for n, widget in enumerate(self.entries['widget']):
+            if pages:
+                host = pages[n % len(pages)]
+                host.setdefault('widgets', []).append(widget['path'])
+                widget['called_by'] = [host['path']]
+
+    def _pick(self, kind: str) -> Optional[Dict]:
+        entries = self.entries[kind]
+        return self.rng.choice(entries) if entries else None
+
+    # ---- 源文件 ----
+
+    def _ui_body(self, cls: str, path: str, consumer: bool, widgets: List[str] = ()) -> Dict:
+        keys = self.rng.sample(self.i18n_keys, k=min(len(self.i18n_keys), self.rng.randint(1, 4)))
+        tokens = self.rng.sample(COLOR_TOKENS, k=self.rng.randint(1, 3))
+        provider = self._pick('provider')
+        model = self._pick('model')
+        imports = ["import 'package:flutter/material.dart';"]
+        if consumer:
+            imports.append("import 'package:flutter_riverpod/flutter_riverpod.dart';")
+        imports.append(f"import '{_relative_import(path, 'lib/core/theme/ocean_breeze_color_schemes.dart')}';")
+        imports.append(f"import '{_relative_import(path, 'lib/generated/l10n/app_localizations.dart')}';")
+        if model:
+            imports.append(f"import '{_relative_import(path, model['path'])}';")
+        if consumer and provider:
+            imports.append(f"import '{_relative_import(path, provider['path'])}';")
+        imports.extend(f"import '{_relative_import(path, widget)}';" for widget in widgets)
+
+        rows = []
+        for index in range(self.rng.randint(3, 40)):
+            token = tokens[index % len(tokens)]
+            key = keys[index % len(keys)]
+            rows.append(
+                f"          Padding(\n"
+                f"            padding: const EdgeInsets.all({4 + index % 4}),\n"
+                f"            child: Text(\n"
+                f"              AppLocalizations.of(context).{key},\n"
+                f"              style: TextStyle(color: OceanBreezeColorSchemes.{token}),\n"
+                f"            ),\n"
+                f"          ),"
+            )
+        list_widget = (
+            "ListView(children: [for (final item in items) Text(item.toString())])"
+            if self.rng.random() < 0.3 else
+            "ListView.builder(itemCount: items.length, itemBuilder: (context, i) => Text(items[i].toString()))"
+        )
+        watch = (f"    final items = ref.watch({_camel(provider['stem'])}ListProvider).value ?? const [];\n"
+                 if consumer and provider else "    const items = <Object>[];\n")
+        build_args = 'BuildContext context, WidgetRef ref' if consumer else 'BuildContext context'
+        base = 'ConsumerWidget' if consumer else 'StatelessWidget'
+        source = (
+            '\n'.join(imports) + '\n\n'
+            f"/// {cls}（基准语料）\n"
+            f"class {cls} extends {base} {{\n"
+            f"  const {cls}({{super.key, required this.title, this.count = 0}});\n\n"
+            f"  final String title;\n"
+            f"  final int count;\n\n"
+            f"  @override\n"
+            f"  Widget build({build_args}) {{\n"
+            f"{watch}"
+            f"    return Container(\n"
+            f"      color: OceanBreezeColorSchemes.{tokens[0]},\n"
+            f"      child: Column(\n"
+            f"        children: [\n"
+            + '\n'.join(rows) + '\n'
+            f"          Expanded(child: {list_widget}),\n"
+            f"        ],\n"
+            f"      ),\n"
+            f"    );\n"
+            f"  }}\n"
+            f"}}\n"
+        )
+        return {'source': source, 'i18n_keys': sorted(keys), 'tokens': sorted(tokens)}
+
+    def _provider(self, entry: Dict) -> str:
+        repo = self._pick('repository')
+        model = self._pick('model')
+        var = _camel(entry['stem'])
+        other = self._pick('provider')
+        lines = ["import 'package:flutter_riverpod/flutter_riverpod.dart';", '']
+        if repo:
+            lines.insert(1, f"import '{_relative_import(entry['path'], repo['path'])}';")
+        if model:
+            lines.insert(1, f"import '{_relative_import(entry['path'], model['path'])}';")
+        if other and other is not entry:
+            lines.insert(1, f"import '{_relative_import(entry['path'], other['path'])}';")
+        repo_type = repo['class'] if repo else 'Object'
+        model_type = model['class'] if model else 'Object'
+        lines += [
+            f"final {var}RepositoryProvider = Provider<{repo_type}>((ref) {{",
+            f"  throw UnimplementedError('override in main');",
+            f"}});",
+            '',
+            f"final {var}ListProvider = StreamProvider<List<{model_type}>>((ref) {{",
+            f"  return ref.watch({var}RepositoryProvider).watchAll();",
+            f"}});",
+            '',
+            f"final {var}CountProvider = Provider<int>((ref) {{",
+            f"  final items = ref.watch({var}ListProvider).value ?? const [];",
+        ]
+        if other and other is not entry:
+            lines.append(f"  ref.listen({_camel(other['stem'])}CountProvider, (_, __) {{}});")
+        lines += ["  return items.length;", "});", '']
+        return '\n'.join(lines)
+
+    def _repository(self, entry: Dict, entity: Dict) -> str:
+        model = self._pick('model')
+        model_type = model['class'] if model else 'Object'
+        accessor = _camel(entity['class']) + 's'
+        imports = ["import 'package:isar/isar.dart';", '',
+                   f"import '{_relative_import(entry['path'], entity['path'])}';"]
+        if model:
+            imports.append(f"import '{_relative_import(entry['path'], model['path'])}';")
+        return '\n'.join(imports) + f"""
+
+class {entry['class']} {{
+  {entry['class']}(this._isar);
+
+  final Isar _isar;
+
+  Stream<List<{model_type}>> watchAll() {{
+    return _isar.{accessor}.where().watch(fireImmediately: true).map((items) => items.map(_toDomain).toList());
+  }}
+
+  Future<List<{model_type}>> findBySlug(String slug) async {{
+    final items = await _isar.{accessor}.filter().slugEqualTo(slug).findAll();
+    return items.map(_toDomain).toList();
+  }}
+
+  Future<List<{model_type}>> findRecent(DateTime since) async {{
+    final items = await _isar.{accessor}.filter().updatedAtGreaterThan(since).sortByUpdatedAtDesc().findAll();
+    return items.map(_toDomain).toList();
+  }}
+
+  Future<int> countByStatus(int status) {{
+    return _isar.{accessor}.filter().statusEqualTo(status).count();
+  }}
+
+  {model_type} _toDomain({entity['class']} entity) => throw UnimplementedError();
+}}
+"""
+
+    def _entity(self, entity: Dict) -> str:
+        return f"""import 'package:isar/isar.dart';
+
+part '{entity['stem']}.g.dart';
+
+@collection
+class {entity['class']} {{
+  {entity['class']}();
+
+  Id id = Isar.autoIncrement;
+
+  @Index(unique: true)
+  late String slug;
+
+  late int status;
+
+  late DateTime updatedAt;
+}}
+"""
+
+    def _model(self, entry: Dict) -> str:
+        fields = [('int', 'id'), ('String', 'title')] + [
+            (self.rng.choice(['String', 'int', 'bool', 'DateTime?', 'double']), f'field{n}')
+            for n in range(self.rng.randint(2, 12))
+        ]
+        cls = entry['class']
+        ctor = ', '.join(f"required this.{name}" if not t.endswith('?') else f"this.{name}" for t, name in fields)
+        decl = '\n'.join(f"  final {t} {name};" for t, name in fields)
+        copy_params = ', '.join(f"{t.rstrip('?')}? {name}" for t, name in fields)
+        copy_body = ', '.join(f"{name}: {name} ?? this.{name}" for _, name in fields)
+        return f"""import 'package:flutter/foundation.dart';
+
+@immutable
+class {cls} {{
+  const {cls}({{{ctor}}});
+
+{decl}
+
+  {cls} copyWith({{{copy_params}}}) {{
+    return {cls}({copy_body});
+  }}
+}}
+"""
+
+    def _service(self, entry: Dict) -> str:
+        repo = self._pick('repository')
+        repo_type = repo['class'] if repo else 'Object'
+        imports = [f"import '{_relative_import(entry['path'], repo['path'])}';"] if repo else []
+        methods = '\n'.join(
+            f"  Future<int> {_camel(ADJECTIVES[n % 10] + '_' + NOUNS[n % 10])}{n}(int status) async {{\n"
+            f"    final count = await _repository.countByStatus(status + {n});\n"
+            f"    return count * {n + 1};\n"
+            f"  }}\n"
+            for n in range(self.rng.randint(2, 8))
+        )
+        return '\n'.join(imports) + f"""
+
+class {entry['class']} {{
+  {entry['class']}(this._repository);
+
+  final {repo_type} _repository;
+
+{methods}}}
+"""
+
+    # ---- 写出 ----
+
+    def _write(self, rel: str, content: str):
+        path = self.out / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+
+    def _write_doc(self, kind: str, entry: Dict, calls: List[str], keys: List[str], tokens: List[str]):
+        template = self.templates[kind]
+        doc = json.loads(json.dumps(template))
+        doc['meta']['name'] = entry['class']
+        doc['meta']['file_path'] = entry['path']
+        doc['meta']['created_date'] = '250101'
+        doc['meta']['last_updated'] = '250101'
+        doc['source_of_truth'] = entry['path']
+        doc['called_by'] = entry.get('called_by', [])
+        doc['calls'] = calls
+        doc['i18n_keys'] = keys
+        doc['design_tokens'] = [f'OceanBreezeColorSchemes.{t}' for t in tokens]
+        self._write(f"documents/architecture/{ARCH_CATEGORY[kind]}/{entry['stem']}.yaml",
+                    yaml.safe_dump(doc, allow_unicode=True, sort_keys=False))
+
+    def _prepare_out(self):
+        """清空并重建输出目录；非空且没有标记文件的目录（不是本脚本生成的）除非 force 否则拒绝"""
+        if self.out.exists():
+            if (not self.force and not (self.out / MARKER_FILE).exists()
+                    and (not self.out.is_dir() or any(self.out.iterdir()))):
+                raise FileExistsError(f'{self.out} 已存在且不是基准语料目录（缺少 {MARKER_FILE}），'
+                                      f'拒绝清空；确认可以删除时加 --force')
+            if self.out.is_dir():
+                shutil.rmtree(self.out)
+            else:
+                self.out.unlink()
+        self.out.mkdir(parents=True)
+        (self.out / MARKER_FILE).write_text('benchmark_corpus.py 生成的语料，重新生成时会整体清空\n',
+                                            encoding='utf-8')
+
+    def build(self) -> Dict[str, int]:
+        self._prepare_out()
+        self.plan()
+
+        # 模板（生成器与 linter 都从项目根下读取）
+        self.templates = {}
+        for kind in ARCH_CATEGORY:
+            name = f'{kind}_template.yaml'
+            shutil.copy2(TEMPLATE_DIR / name, self._ensure_dir('documents/templates') / name)
+            with (TEMPLATE_DIR / name).open('r', encoding='utf-8') as f:
+                self.templates[kind] = yaml.safe_load(f)
+
+        # 主题令牌与 ARB
+        self._write('lib/core/theme/ocean_breeze_color_schemes.dart',
+                    "import 'package:flutter/material.dart';\n\nclass OceanBreezeColorSchemes {\n"
+                    + ''.join(f"  static const Color {t} = Color(0xFF{(i * 1234567) % 0xFFFFFF:06X});\n"
+                              for i, t in enumerate(COLOR_TOKENS))
+                    + "}\n")
+        self._write('lib/generated/l10n/app_localizations.dart',
+                    "class AppLocalizations {\n"
+                    + ''.join(f"  String get {key} => '{key}';\n" for key in sorted(self.i18n_keys))
+                    + "}\n")
+        for locale in ('en', 'zh'):
+            arb = {'@@locale': locale}
+            arb.update({key: f'{locale}:{key}' for key in sorted(self.i18n_keys)})
+            self._write(f'lib/l10n/app_{locale}.arb', json.dumps(arb, ensure_ascii=False, indent=2) + '\n')
+
+        for kind, entries in self.entries.items():
+            for n, entry in enumerate(entries):
+                keys: List[str] = []
+                tokens: List[str] = []
+                if kind in ('widget', 'page'):
+                    body = self._ui_body(entry['class'], entry['path'], consumer=(kind == 'page' or n % 2 == 0),
+                                         widgets=entry.get('widgets', []))
+                    source, keys, tokens = body['source'], body['i18n_keys'], body['tokens']
+                elif kind == 'provider':
+                    source = self._provider(entry)
+                elif kind == 'repository':
+                    entity_stem = entry['stem'].replace('_repository', '_entity')
+                    entity = {'stem': entity_stem, 'class': _pascal(entity_stem),
+                              'path': f'lib/data/isar/{entity_stem}.dart'}
+                    self._write(entity['path'], self._entity(entity))
+                    source = self._repository(entry, entity)
+                elif kind == 'model':
+                    source = self._model(entry)
+                else:
+                    source = self._service(entry)
+                self._write(entry['path'], source)
+                calls = sorted({
+                    line.split("'")[1] for line in source.splitlines()
+                    if line.startswith("import '") and not line.startswith("import 'package:")
+                })
+                calls = [os.path.normpath(os.path.join(os.path.dirname(entry['path']), c)).replace(os.sep, '/')
+                         for c in calls]
+                self._write_doc(kind, entry, calls, keys, tokens)
+
+        return {kind: len(entries) for kind, entries in self.entries.items()}
+
+    def _ensure_dir(self, rel: str) -> Path:
+        path = self.out / rel
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+
+def init_git(root: Path):
+    """初始化 git 仓库并提交全部文件（architecture_bulk_update --stale 需要提交历史）"""
+    env = dict(os.environ, GIT_AUTHOR_NAME='bench', GIT_AUTHOR_EMAIL='bench@example.com',
+               GIT_COMMITTER_NAME='bench', GIT_COMMITTER_EMAIL='bench@example.com')
+    for command in (['git', 'init', '-q'], ['git', 'add', '-A'], ['git', 'commit', '-q', '-m', 'corpus']):
+        subprocess.run(command, cwd=root, check=True, env=env, capture_output=True)
+
+
+def generate_corpus(out: Path, files: int, seed: int = 0, git: bool = False,
+                    force: bool = False) -> Dict[str, int]:
+    """
+    生成合成语料
+
+    Args:
+        out: 输出目录（本脚本生成过的目录会被清空；其他非空目录需 force=True）
+        files: 源文件总数（不含 Isar 实体、主题与 ARB）
+        seed: 随机种子
+        git: 是否初始化 git 仓库并提交
+        force: 输出目录非空且不是基准语料时仍然清空
+
+    Returns:
+        各类型文件数
+
+    Raises:
+        FileExistsError: 输出目录非空且不是基准语料目录（未指定 force）
+    """
+    counts = CorpusBuilder(out, files, seed, force).build()
+    if git:
+        init_git(out)
+    return counts
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='生成基准测试用合成 Dart 语料')
+    parser.add_argument('--files', type=int, default=1000, help='源文件数（建议 100 ~ 20000）')
+    parser.add_argument('--out', required=True, help='输出目录（本脚本生成过的目录会被清空重建）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--git', action='store_true', help='初始化 git 仓库并提交')
+    parser.add_argument('--force', action='store_true', help='输出目录非空且不是基准语料时也清空')
+    args = parser.parse_args()
+
+    try:
+        counts = generate_corpus(Path(args.out), args.files, args.seed, args.git, args.force)
+    except FileExistsError as e:
+        print(f'[bench-corpus] ❌ {e}')
+        return 1
+    summary = ', '.join(f'{kind} {count}' for kind, count in counts.items())
+    print(f'[bench-corpus] 已生成 {sum(counts.values())} 个源文件到 {args.out}: {summary}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
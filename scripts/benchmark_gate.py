@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+流水线基准的基线存储与回归门禁
+
+基线按机器指纹（CPU 型号、核数、内存、系统、Python 版本）分别保存，
+不同机器之间的耗时不可比，只与本机记录的基线比较。
+
+- record：运行 benchmark_pipeline 的基准（重复 N 次取中位数），写入本机基线
+- check：按基线记录的规模/基准/重复次数重新运行，任一指标超出容差即失败（退出码 1）
+- show：列出已保存的基线
+
+比较的指标（越小越好）：wall_s（中位耗时）、p95_ms（单文件 p95）、peak_rss_mb（峰值内存）。
+耗时阈值为 容差 + min(3 × 该指标样本的相对离散度, 容差)：噪声最多把阈值放宽到两倍容差，
+且基线与本次都至少有 MIN_NOISE_SAMPLES 个样本时才计入（样本太少时离散度估计不可靠）。
+
+用法：
+    python scripts/benchmark_gate.py record [--sizes 100,1000] [--repeat 5]
+    python scripts/benchmark_gate.py check [--tolerance 0.1] [--memory-tolerance 0.2] [--results bench.json]
+    python scripts/benchmark_gate.py show
+"""
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+from benchmark_pipeline import BENCHMARKS, DEFAULT_SIZES, run_suite, print_results
+
+ROOT = SCRIPTS_DIR.parent
+BASELINE_FILE = ROOT / 'build' / 'benchmark_baselines.json'
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.10
+DEFAULT_MEMORY_TOLERANCE = 0.20
+# 估计测量噪声所需的最少重复次数
+MIN_NOISE_SAMPLES = 5
+# 参与比较的指标：(键, 单位, 是否为耗时类指标)
+METRICS: List[Tuple[str, str, bool]] = [
+    ('wall_s', 's', True),
+    ('p95_ms', 'ms', True),
+    ('peak_rss_mb', 'MB', False),
+]
+
+
+def machine_info() -> Dict[str, Any]:
+    """描述本机硬件/运行环境的字段（用于指纹）"""
+    cpu = platform.processor() or platform.machine()
+    memory = None
+    try:
+        with open('/proc/cpuinfo', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    cpu = line.split(':', 1)[1].strip()
+                    break
+        with open('/proc/meminfo', 'r', encoding='ascii') as f:
+            memory = int(f.readline().split()[1]) * 1024
+    except OSError:
+        if sys.platform == 'darwin':
+            try:
+                cpu = subprocess.run(['sysctl', '-n', 'machdep.cpu.brand_string'],
+                                     capture_output=True, text=True).stdout.strip() or cpu
+                memory = int(subprocess.run(['sysctl', '-n', 'hw.memsize'],
+                                            capture_output=True, text=True).stdout.strip() or 0) or None
+            except (OSError, ValueError):
+                pass
+    return {
+        'system': platform.system(),
+        'machine': platform.machine(),
+        'cpu': cpu,
+        'cpu_count': os.cpu_count(),
+        # 按 GB 取整，避免可用内存报告的细微差异改变指纹
+        'memory_gb': round(memory / (1 << 30)) if memory else None,
+        'python': platform.python_version(),
+    }
+
+
+def fingerprint(info: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(info, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def load_baselines(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    with path.open('r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baselines(path: Path, baselines: Dict[str, Any]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with tmp.open('w', encoding='utf-8') as f:
+        json.dump(baselines, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def git_sha() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    return f"{result['benchmark']}@{result['size']}"
+
+
+def relative_spread(samples: List[float]) -> float:
+    """样本的相对离散度（中位绝对偏差 / 中位数）"""
+    if len(samples) < 2:
+        return 0.0
+    median = statistics.median(samples)
+    if median <= 0:
+        return 0.0
+    return statistics.median(abs(s - median) for s in samples) / median
+
+
+def metric_noise(base: Dict[str, Any], result: Dict[str, Any], metric: str) -> float:
+    """指标自身样本的相对离散度（wall_s 用 wall_samples，其余用 <指标>_samples）；样本不足时为 0"""
+    key = 'wall_samples' if metric == 'wall_s' else f'{metric}_samples'
+    samples = [base.get(key) or [], result.get(key) or []]
+    if any(len(s) < MIN_NOISE_SAMPLES for s in samples):
+        return 0.0
+    return max(relative_spread(s) for s in samples)
+
+
+def compare(baseline: Dict[str, Dict[str, Any]], current: List[Dict[str, Any]],
+            tolerance: float, memory_tolerance: float) -> List[Dict[str, Any]]:
+    """逐项比较，返回每个 (基准, 指标) 的差异行"""
+    rows = []
+    for result in current:
+        key = result_key(result)
+        if 'skipped' in result:
+            continue
+        base = baseline.get(key)
+        if base is None:
+            rows.append({'key': key, 'metric': '-', 'status': 'new'})
+            continue
+        for metric, unit, timing in METRICS:
+            if metric not in result or metric not in base:
+                continue
+            old, new = base[metric], result[metric]
+            limit = memory_tolerance
+            if timing:
+                limit = tolerance + min(3 * metric_noise(base, result, metric), tolerance)
+            change = (new - old) / old if old else 0.0
+            if change > limit:
+                status = 'regressed'
+            elif change < -limit:
+                status = 'improved'
+            else:
+                status = 'ok'
+            rows.append({'key': key, 'metric': metric, 'unit': unit, 'baseline': old, 'current': new,
+                         'change': change, 'limit': limit, 'status': status})
+    for key in baseline:
+        if key not in {result_key(r) for r in current}:
+            rows.append({'key': key, 'metric': '-', 'status': 'missing'})
+    return rows
+
+
+def print_diff(rows: List[Dict[str, Any]]):
+    icons = {'ok': '✅', 'improved': '🚀', 'regressed': '❌', 'new': '🆕', 'missing': '⚠️'}
+    print(f"\n{'':2} {'基准@规模':32} {'指标':12} {'基线':>10} {'当前':>10} {'变化':>8} {'阈值':>7}")
+    for row in rows:
+        icon = icons[row['status']]
+        if row['status'] == 'new':
+            print(f"{icon} {row['key']:32} 基线中不存在（未比较）")
+            continue
+        if row['status'] == 'missing':
+            print(f"{icon} {row['key']:32} 本次未运行")
+            continue
+        print(f"{icon} {row['key']:32} {row['metric']:12} "
+              f"{row['baseline']:10.2f} {row['current']:10.2f} {row['change']:+8.1%} {row['limit']:7.0%}")
+
+
+def current_machine(baselines: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Optional[Dict[str, Any]]]:
+    info = machine_info()
+    key = fingerprint(info)
+    return key, info, baselines.get(key)
+
+
+def cmd_record(args) -> int:
+    baselines = load_baselines(args.baseline)
+    key, info, _ = current_machine(baselines)
+    sizes = [int(s) for s in args.sizes.split(',')]
+    benchmarks = args.benchmarks.split(',')
+    results = run_suite(sizes, benchmarks, args.repeat)
+    print_results(results)
+    baselines[key] = {
+        'machine': info,
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'git_sha': git_sha(),
+        'sizes': sizes,
+        'benchmarks': benchmarks,
+        'repeat': args.repeat,
+        'results': {result_key(r): r for r in results if 'skipped' not in r},
+    }
+    save_baselines(args.baseline, baselines)
+    print(f'\n💾 基线已写入 {args.baseline}（机器指纹 {key}）')
+    return 0
+
+
+def cmd_check(args) -> int:
+    baselines = load_baselines(args.baseline)
+    key, info, stored = current_machine(baselines)
+    if stored is None:
+        print(f'❌ 本机（指纹 {key}）没有基线，请先运行: python scripts/benchmark_gate.py record')
+        print(f"   {info['cpu']} / {info['cpu_count']} 核 / {info['memory_gb']} GB / Python {info['python']}")
+        return 2
+
+    if args.results:
+        with open(args.results, 'r', encoding='utf-8') as f:
+            results = json.load(f)['results']
+    else:
+        repeat = args.repeat or stored['repeat']
+        results = run_suite(stored['sizes'], stored['benchmarks'], repeat)
+
+    rows = compare(stored['results'], results, args.tolerance, args.memory_tolerance)
+    print(f"\n📏 对比基线：{stored['recorded_at']}（{stored.get('git_sha') or '未知提交'}，指纹 {key}）")
+    print_diff(rows)
+    regressed = [row for row in rows if row['status'] == 'regressed']
+    if regressed:
+        print(f'\n❌ {len(regressed)} 项指标超出容差')
+        return 1
+    print('\n✅ 未发现性能回归')
+    return 0
+
+
+def cmd_show(args) -> int:
+    baselines = load_baselines(args.baseline)
+    if not baselines:
+        print(f'（{args.baseline} 中没有基线）')
+        return 0
+    current, _, _ = current_machine(baselines)
+    for key, stored in baselines.items():
+        marker = '👉' if key == current else '  '
+        machine = stored['machine']
+        print(f"{marker} {key}  {stored['recorded_at']}  {stored.get('git_sha') or '-'}  "
+              f"{machine['cpu']} / {machine['cpu_count']} 核 / {machine['memory_gb']} GB  "
+              f"规模 {','.join(map(str, stored['sizes']))}  ×{stored['repeat']}")
+    return 0
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='流水线基准的基线存储与回归门禁')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE, help=f'基线文件（默认 {BASELINE_FILE}）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    record = sub.add_parser('record', help='运行基准并记录本机基线')
+    record.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='语料规模，逗号分隔')
+    record.add_argument('--benchmarks', default=','.join(BENCHMARKS), help='基准项，逗号分隔')
+    record.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='每项重复次数（取中位数）')
+
+    check = sub.add_parser('check', help='重新运行基准并与本机基线比较')
+    check.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                       help='耗时类指标允许的相对增幅（默认 0.10）')
+    check.add_argument('--memory-tolerance', type=float, default=DEFAULT_MEMORY_TOLERANCE,
+                       help='峰值内存允许的相对增幅（默认 0.20）')
+    check.add_argument('--repeat', type=int, help='重复次数（默认与基线相同）')
+    check.add_argument('--results', help='直接比较 benchmark_pipeline.py --json 的输出，不重新运行')
+
+    sub.add_parser('show', help='列出已保存的基线')
+
+    args = parser.parse_args()
+    handlers = {'record': cmd_record, 'check': cmd_check, 'show': cmd_show}
+    sys.exit(handlers[args.command](args))
+
+
+if __name__ == '__main__':
+    main()
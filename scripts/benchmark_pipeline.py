@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+YAML 流水线基准测试
+
+在 benchmark_corpus.py 生成的合成语料上运行各脚本（通过 GRANOFLOW_ROOT 指向语料根目录），
+测量吞吐量（文件/秒）、单文件延迟（p50/p95）与峰值内存（子进程 maxrss）。
+
+基准项：
+    architecture_linter         architecture_linter.py --all --no-cache
+    architecture_linter_cached  architecture_linter.py --all（校验结果缓存已预热）
+    architecture_schema         architecture_schema.py --all（按模板编译的结构校验）
+    bulk_update                 architecture_bulk_update.py（补齐缺失字段）
+    bulk_update_stale           architecture_bulk_update.py --stale（需要 git 历史）
+    yaml_generator              对抽样文件逐个运行 yaml_generator.py（单文件延迟）
+    yaml_create_all             yaml_create_all.py 冷启动（每次运行前恢复语料中的原始文档）
+    yaml_create_all_rerun       yaml_create_all.py 重复运行（文档已是最新，走跳过写入路径）
+
+默认设置 GRANOFLOW_NO_DART=1 只测 Python 路径；--with-dart 时使用真实 Dart 分析器。
+
+用法：
+    python scripts/benchmark_pipeline.py --sizes 100,1000 [--benchmarks yaml_create_all,architecture_linter]
+                                         [--repeat 3] [--with-dart] [--json results.json] [--keep]
+"""
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+from benchmark_corpus import generate_corpus
+from pipeline_profiler import percentile
+
+BENCHMARKS = [
+    'architecture_linter',
+    'architecture_linter_cached',
+    'architecture_schema',
+    'bulk_update',
+    'bulk_update_stale',
+    'yaml_generator',
+    'yaml_create_all',
+    'yaml_create_all_rerun',
+]
+DEFAULT_SIZES = [100, 1000]
+# yaml_generator 单文件基准的抽样数量
+GENERATOR_SAMPLE = 20
+
+
+def run_measured(command: List[str], env: Dict[str, str], cwd: Path) -> Dict[str, Any]:
+    """运行子进程，返回墙钟耗时、峰值 RSS（MB）与退出码（os.wait4 取该子进程自身的 rusage）"""
+    with tempfile.TemporaryFile() as output:
+        started = time.perf_counter()
+        process = subprocess.Popen(command, cwd=cwd, env=env, stdout=output, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+        output.seek(0)
+        tail = output.read()[-2000:].decode('utf-8', errors='replace')
+    peak = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return {'wall_s': elapsed, 'peak_rss_mb': peak / (1 << 20), 'returncode': process.returncode, 'tail': tail}
+
+
+class CorpusRun:
+    def __init__(self, root: Path, files: int, with_dart: bool):
+        self.root = root
+        self.files = files
+        self.env = dict(os.environ, GRANOFLOW_ROOT=str(root), PYTHONDONTWRITEBYTECODE='1')
+        if not with_dart:
+            self.env['GRANOFLOW_NO_DART'] = '1'
+        self.arch_dir = root / 'documents' / 'architecture'
+        self.pristine = root.parent / f'{root.name}-pristine-architecture'
+        if not self.pristine.exists():
+            shutil.copytree(self.arch_dir, self.pristine)
+        self.docs = sum(1 for _ in self.arch_dir.rglob('*.yaml'))
+
+    def restore_docs(self):
+        shutil.rmtree(self.arch_dir)
+        shutil.copytree(self.pristine, self.arch_dir)
+
+    def script(self, name: str, *args: str) -> List[str]:
+        return [sys.executable, str(SCRIPTS_DIR / name), *args]
+
+    def sample_sources(self) -> List[Path]:
+        sources = sorted((self.root / 'lib').rglob('*.dart'))
+        typed = [
+            (p, kind) for p in sources for kind in [_kind_of(p.relative_to(self.root).as_posix())] if kind
+        ]
+        rng = random.Random(0)
+        return rng.sample(typed, k=min(GENERATOR_SAMPLE, len(typed)))
+
+    def run(self, benchmark: str) -> Dict[str, Any]:
+        """运行一次基准，返回耗时/内存/单文件延迟"""
+        if benchmark == 'architecture_linter':
+            return self._whole(self.script('architecture_linter.py', '--all', '--no-cache'), self.docs, ok=(0, 1))
+        if benchmark == 'architecture_linter_cached':
+            if not (self.root / 'build' / 'architecture_lint_cache.json').exists():
+                run_measured(self.script('architecture_linter.py', '--all'), self.env, self.root)
+            return self._whole(self.script('architecture_linter.py', '--all'), self.docs, ok=(0, 1))
+        if benchmark == 'architecture_schema':
+            return self._whole(self.script('architecture_schema.py', '--all'), self.docs, ok=(0, 1))
+        if benchmark == 'bulk_update':
+            return self._whole(self.script('architecture_bulk_update.py'), self.docs)
+        if benchmark == 'bulk_update_stale':
+            if not (self.root / '.git').exists():
+                return {'skipped': '语料未初始化 git（使用 --git）'}
+            return self._whole(self.script('architecture_bulk_update.py', '--stale'), self.docs, ok=(0, 1))
+        if benchmark == 'yaml_generator':
+            return self._per_file()
+        if benchmark == 'yaml_create_all':
+            self.restore_docs()
+            return self._create_all()
+        if benchmark == 'yaml_create_all_rerun':
+            return self._create_all()
+        raise ValueError(f'未知基准: {benchmark}')
+
+    def _whole(self, command: List[str], items: int, ok=(0,)) -> Dict[str, Any]:
+        measured = run_measured(command, self.env, self.root)
+        if measured['returncode'] not in ok:
+            raise RuntimeError(f"{' '.join(command)} 退出码 {measured['returncode']}:\n{measured['tail']}")
+        return {
+            'items': items,
+            'wall_s': measured['wall_s'],
+            'throughput': items / measured['wall_s'],
+            'per_file_ms': measured['wall_s'] * 1000 / max(items, 1),
+            'peak_rss_mb': measured['peak_rss_mb'],
+        }
+
+    def _create_all(self) -> Dict[str, Any]:
+        trace = self.root / 'build' / 'bench_trace.json'
+        result = self._whole(self.script('yaml_create_all.py', '--no-backup', '--profile', str(trace)),
+                             self.files)
+        with trace.open('r', encoding='utf-8') as f:
+            events = json.load(f)['traceEvents']
+        durations = [e['dur'] / 1000.0 for e in events if e.get('name') == 'file' and e.get('ph') == 'X']
+        result['items'] = len(durations)
+        result['p50_ms'] = percentile(durations, 50)
+        result['p95_ms'] = percentile(durations, 95)
+        return result
+
+    def _per_file(self) -> Dict[str, Any]:
+        out_dir = self.root / 'build' / 'bench_yaml'
+        out_dir.mkdir(parents=True, exist_ok=True)
+        latencies, peak = [], 0.0
+        for source, kind in self.sample_sources():
+            command = self.script('yaml_generator.py', str(source), str(out_dir / f'{source.stem}.yaml'), kind)
+            measured = run_measured(command, self.env, self.root)
+            if measured['returncode'] != 0:
+                raise RuntimeError(f"{' '.join(command)} 退出码 {measured['returncode']}:\n{measured['tail']}")
+            latencies.append(measured['wall_s'] * 1000)
+            peak = max(peak, measured['peak_rss_mb'])
+        total = sum(latencies) / 1000
+        return {
+            'items': len(latencies),
+            'wall_s': total,
+            'throughput': len(latencies) / total,
+            'per_file_ms': statistics.mean(latencies),
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'peak_rss_mb': peak,
+        }
+
+
+def _kind_of(rel: str) -> Optional[str]:
+    if rel.startswith('lib/presentation/widgets/'):
+        return 'widget'
+    if rel.startswith('lib/presentation/') and rel.endswith('_page.dart'):
+        return 'page'
+    for prefix, kind in (('lib/core/providers/', 'provider'), ('lib/data/repositories/', 'repository'),
+                         ('lib/data/models/', 'model'), ('lib/core/services/', 'service')):
+        if rel.startswith(prefix):
+            return kind
+    return None
+
+
+def aggregate(name: str, size: int, runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """合并多次重复运行：耗时取中位数并保留全部样本"""
+    if any('skipped' in r for r in runs):
+        return {'benchmark': name, 'size': size, 'skipped': runs[0].get('skipped')}
+    walls = [r['wall_s'] for r in runs]
+    median_run = sorted(runs, key=lambda r: r['wall_s'])[len(runs) // 2]
+    result = {
+        'benchmark': name,
+        'size': size,
+        'items': median_run['items'],
+        'repeat': len(runs),
+        'wall_s': statistics.median(walls),
+        'wall_samples': walls,
+        'throughput': median_run['throughput'],
+        'per_file_ms': median_run['per_file_ms'],
+        'peak_rss_mb': max(r['peak_rss_mb'] for r in runs),
+    }
+    for key in ('p50_ms', 'p95_ms'):
+        if key in median_run:
+            samples = [r[key] for r in runs]
+            result[key] = statistics.median(samples)
+            result[f'{key}_samples'] = samples
+    return result
+
+
+def run_suite(sizes: List[int], benchmarks: List[str], repeat: int = 1, with_dart: bool = False,
+              workdir: Optional[Path] = None, git: bool = True, keep: bool = False,
+              log=print) -> List[Dict[str, Any]]:
+    """
+    生成各规模语料并运行基准
+
+    Args:
+        sizes: 语料规模（源文件数）
+        benchmarks: 基准项（按 BENCHMARKS 的顺序执行，保证 yaml_create_all 之前语料未被改写）
+        repeat: 每项重复次数
+        with_dart: 是否使用真实 Dart 分析器
+        workdir: 语料目录（默认临时目录）
+        git: 语料是否初始化 git（bulk_update_stale 需要）
+        keep: 结束后保留语料
+    """
+    base = workdir or Path(tempfile.mkdtemp(prefix='granoflow-bench-'))
+    ordered = [b for b in BENCHMARKS if b in benchmarks]
+    results = []
+    try:
+        for size in sizes:
+            root = base / f'corpus-{size}'
+            started = time.perf_counter()
+            generate_corpus(root, size, git=git and 'bulk_update_stale' in ordered)
+            log(f'[bench] 语料 {size} 个文件已生成（{time.perf_counter() - started:.1f}s）: {root}')
+            corpus = CorpusRun(root, size, with_dart)
+            for name in ordered:
+                runs = [corpus.run(name) for _ in range(repeat)]
+                result = aggregate(name, size, runs)
+                results.append(result)
+                if 'skipped' in result:
+                    log(f"[bench] {name:28} size={size:<6} 跳过: {result['skipped']}")
+                else:
+                    log(f"[bench] {name:28} size={size:<6} {result['wall_s']:8.2f}s")
+    finally:
+        if not keep and workdir is None:
+            shutil.rmtree(base, ignore_errors=True)
+    return results
+
+
+def print_results(results: List[Dict[str, Any]]):
+    print(f"\n{'基准':28} {'规模':>6} {'文件':>6} {'耗时(s)':>9} {'文件/s':>9} {'单文件(ms)':>11} "
+          f"{'p50(ms)':>9} {'p95(ms)':>9} {'峰值内存(MB)':>12}")
+    for r in results:
+        if 'skipped' in r:
+            print(f"{r['benchmark']:28} {r['size']:6} 跳过: {r['skipped']}")
+            continue
+        p50 = f"{r['p50_ms']:9.1f}" if 'p50_ms' in r else f"{'-':>9}"
+        p95 = f"{r['p95_ms']:9.1f}" if 'p95_ms' in r else f"{'-':>9}"
+        print(f"{r['benchmark']:28} {r['size']:6} {r['items']:6} {r['wall_s']:9.2f} {r['throughput']:9.1f} "
+              f"{r['per_file_ms']:11.2f} {p50} {p95} {r['peak_rss_mb']:12.1f}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='YAML 流水线基准测试（合成语料）')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='语料规模，逗号分隔（100 ~ 20000，默认 100,1000）')
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS), help='基准项，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=1, help='每项重复次数（取中位数）')
+    parser.add_argument('--with-dart', action='store_true', help='使用真实 Dart 分析器（默认只测 Python 降级路径）')
+    parser.add_argument('--workdir', help='语料目录（默认临时目录，结束后删除）')
+    parser.add_argument('--keep', action='store_true', help='保留临时语料目录')
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    benchmarks = [b.strip() for b in args.benchmarks.split(',') if b.strip()]
+    unknown = [b for b in benchmarks if b not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知基准: {', '.join(unknown)}（可选: {', '.join(BENCHMARKS)}）")
+
+    results = run_suite(sizes, benchmarks, args.repeat, args.with_dart,
+                        Path(args.workdir) if args.workdir else None, keep=args.keep)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'results': results}, f, indent=2, ensure_ascii=False)
+        print(f'\n[bench] 结果已写入 {args.json}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Isar 查询-索引交叉分析：找出 Repository 中的慢查询
+
+分析内容：
+- lib/data/isar/*_entity.dart 中的 @collection 字段与 @Index() 声明
+- lib/data/repositories/*.dart 中的 filter()/where() 查询链
+- 交叉比对后标记：
+  1. filter_on_indexed_field: filter() 条件命中了索引字段，可改为 where() 子句走索引
+  2. full_scan: filter() 或不带 where 子句的 where() 全集合扫描
+  3. unindexed_sort: sortBy/thenBy 使用了未建索引的字段（内存排序）
+
+策略（与 yaml_generator.py 一致）：
+1. 优先使用 tools/dart_analyzer.dart 输出的 isar_collections / isar_queries
+2. 降级到正则表达式分析
+
+用法：
+    python scripts/isar_query_analyzer.py [--write] [--json] [--no-dart]
+
+    --write   将分析结果写入 documents/architecture/repositories/*.yaml 的 isar_query_analysis 字段
+"""
+import os
+import sys
+import re
+import threading
+import json
+import yaml
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from source_index import read_source
+
+# 项目根目录（GRANOFLOW_ROOT 可覆盖，用于基准测试的合成语料）
+ROOT = Path(os.environ.get('GRANOFLOW_ROOT') or Path(__file__).resolve().parents[1]).resolve()
+ENTITY_DIR = ROOT / 'lib' / 'data' / 'isar'
+REPOSITORY_DIR = ROOT / 'lib' / 'data' / 'repositories'
+REPOSITORY_YAML_DIR = ROOT / 'documents' / 'architecture' / 'repositories'
+
+# 终结查询链的方法（之后的 .then()/.map() 等不再属于查询）
+TERMINAL_METHODS = {
+    'findAll', 'findFirst', 'findAllSync', 'findFirstSync', 'count',
+    'countSync', 'deleteAll', 'deleteFirst', 'deleteAllSync', 'watch',
+    'watchLazy', 'exportJson', 'isEmpty', 'isNotEmpty',
+}
+
+# 条件方法后缀，按长度倒序匹配（如 ElementEqualTo 需先于 EqualTo）
+CONDITION_SUFFIXES = sorted([
+    'EqualTo', 'GreaterThan', 'LessThan', 'Between', 'IsNull', 'IsNotNull',
+    'StartsWith', 'EndsWith', 'Contains', 'Matches', 'IsEmpty', 'IsNotEmpty',
+    'ElementEqualTo', 'ElementGreaterThan', 'ElementLessThan', 'ElementBetween',
+    'ElementStartsWith', 'ElementEndsWith', 'ElementContains', 'ElementMatches',
+    'LengthEqualTo', 'LengthGreaterThan', 'LengthLessThan', 'LengthBetween',
+], key=len, reverse=True)
+
+# 可以直接改写为 where() 索引子句的条件
+WHERE_COMPATIBLE_SUFFIXES = {
+    'EqualTo', 'GreaterThan', 'LessThan', 'Between', 'IsNull', 'IsNotNull', 'StartsWith',
+}
+
+SEVERITY_ORDER = {'high': 0, 'medium': 1, 'low': 2}
+
+_COLLECTIONS_CACHE: Optional[Dict[str, Dict]] = None
+# 并发生成 Repository 文档的线程共用一次加载：后到的线程等待并复用结果
+_collections_lock = threading.Lock()
+
+
+def collection_accessor(class_name: str) -> str:
+    """Isar 生成的集合访问器名：TaskEntity -> taskEntitys"""
+    return class_name[:1].lower() + class_name[1:] + 's'
+
+
+def _lower_first(name: str) -> str:
+    return name[:1].lower() + name[1:]
+
+
+def extract_collections(content: str) -> List[Dict]:
+    """正则降级：提取 @collection 类的字段与 @Index() 字段"""
+    collections = []
+    for match in re.finditer(r'@collection\s+class\s+(\w+)[^{]*\{', content):
+        class_name = match.group(1)
+        body = _balanced_block(content, match.end() - 1)
+        fields: List[str] = []
+        indexes: List[str] = []
+        pending_index = False
+        for raw_line in body.split('\n'):
+            line = raw_line.split('//')[0].strip()
+            if not line:
+                continue
+            if line.startswith('@Index'):
+                pending_index = True
+                continue
+            if line.startswith('@'):
+                continue
+            field = re.match(
+                r'(?:late\s+)?(?:final\s+)?([\w<>?,\s]+?)\s+(\w+)\s*(?:=[^;]*)?;$', line
+            )
+            if field and '(' not in line:
+                field_type, name = field.group(1).strip(), field.group(2)
+                fields.append(name)
+                if pending_index or field_type == 'Id':
+                    indexes.append(name)
+            pending_index = False
+        collections.append({
+            'class_name': class_name,
+            'fields': fields,
+            'indexes': indexes,
+        })
+    return collections
+
+
+def _balanced_block(content: str, open_pos: int) -> str:
+    """返回从 open_pos 处的 '{' 开始、到配对 '}' 结束之间的内容"""
+    depth = 0
+    for i in range(open_pos, len(content)):
+        ch = content[i]
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return content[open_pos + 1:i]
+    return content[open_pos + 1:]
+
+
+def _skip_parens(content: str, pos: int) -> int:
+    """跳过 pos 处开始的括号组（考虑字符串），返回右括号之后的位置"""
+    depth = 0
+    quote = None
+    i = pos
+    while i < len(content):
+        ch = content[i]
+        if quote:
+            if ch == '\\':
+                i += 2
+                continue
+            if ch == quote:
+                quote = None
+        elif ch in ('"', "'"):
+            quote = ch
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _read_chain(content: str, pos: int) -> List[str]:
+    """从 pos 开始读取 `.method(...)` 调用链，返回方法名列表"""
+    chain = []
+    ident = re.compile(r'\s*\.\s*(\w+)\s*')
+    while True:
+        match = ident.match(content, pos)
+        if not match:
+            break
+        end = match.end()
+        if end < len(content) and content[end] == '(':
+            chain.append(match.group(1))
+            pos = _skip_parens(content, end)
+        else:
+            break
+    return chain
+
+
+def extract_queries(content: str) -> List[Dict]:
+    """正则降级：提取 Isar 查询链
+
+    输出结构与 dart_analyzer.dart 的 isar_queries 一致：
+    accessor/variable/assigned_to/line/chain
+    """
+    queries = []
+    builders = set()
+    accessor_pattern = re.compile(r'(?:(\w+)\s*=\s*(?:await\s+)?)?\b\w+\s*\.\s*(\w+)(?=\s*\.\s*(?:filter|where)\s*\(\s*\))')
+    for match in accessor_pattern.finditer(content):
+        chain = _read_chain(content, match.end())
+        if not chain or chain[0] not in ('filter', 'where'):
+            continue
+        assigned_to = match.group(1)
+        if assigned_to and not any(m in TERMINAL_METHODS for m in chain):
+            builders.add(assigned_to)
+        queries.append({
+            'accessor': match.group(2),
+            'variable': None,
+            'assigned_to': assigned_to,
+            'line': content.count('\n', 0, match.start(2)) + 1,
+            'chain': chain,
+            '_offset': match.start(),
+        })
+
+    for var in builders:
+        var_pattern = re.compile(r'(?:(\w+)\s*=\s*(?:await\s+)?)?\b' + re.escape(var) + r'(?=\s*\.\s*\w+\s*\()')
+        for match in var_pattern.finditer(content):
+            chain = _read_chain(content, match.end())
+            if not chain:
+                continue
+            queries.append({
+                'accessor': None,
+                'variable': var,
+                'assigned_to': match.group(1),
+                'line': content.count('\n', 0, match.start()) + 1,
+                'chain': chain,
+                '_offset': match.start(),
+            })
+
+    queries.sort(key=lambda q: q.pop('_offset'))
+    return queries
+
+
+def link_builder_chains(raw_queries: List[Dict]) -> List[Dict]:
+    """把 `builder.sortBy...findAll()` 这类变量续接链并入对应的查询
+
+    续接链会附加到该变量上所有尚未终结的查询（例如 switch 各分支赋值的 builder）。
+    """
+    queries: List[Dict] = []
+    open_by_var: Dict[str, List[Dict]] = {}
+    for raw in sorted(raw_queries, key=lambda q: q.get('line') or 0):
+        chain = _truncate_at_terminal(raw.get('chain') or [])
+        if raw.get('accessor'):
+            query = {
+                'accessor': raw['accessor'],
+                'line': raw.get('line'),
+                'chain': chain,
+            }
+            queries.append(query)
+            var = raw.get('assigned_to')
+            if var and not _is_terminated(chain):
+                open_by_var.setdefault(var, []).append(query)
+        elif raw.get('variable') in open_by_var:
+            var = raw['variable']
+            targets = open_by_var[var]
+            for query in targets:
+                query['chain'] = _truncate_at_terminal(query['chain'] + chain)
+            if _is_terminated(chain) or raw.get('assigned_to') != var:
+                open_by_var.pop(var, None)
+    return queries
+
+
+def _truncate_at_terminal(chain: List[str]) -> List[str]:
+    for i, method in enumerate(chain):
+        if method in TERMINAL_METHODS:
+            return chain[:i + 1]
+    return list(chain)
+
+
+def _is_terminated(chain: List[str]) -> bool:
+    return any(m in TERMINAL_METHODS for m in chain)
+
+
+def _condition_field(method: str, fields: List[str]) -> Optional[str]:
+    """条件方法名 -> 字段名（statusEqualTo -> status）"""
+    for suffix in CONDITION_SUFFIXES:
+        if method.endswith(suffix) and len(method) > len(suffix):
+            candidate = method[:-len(suffix)]
+            if candidate in fields:
+                return candidate
+    return None
+
+
+def _condition_suffix(method: str, field: str) -> str:
+    return method[len(field):]
+
+
+def _sort_field(method: str, fields: List[str]) -> Optional[str]:
+    """sortByCreatedAtDesc/thenBySortIndex -> createdAt/sortIndex"""
+    match = re.match(r'(?:sortBy|thenBy)(\w+?)(?:Desc)?$', method)
+    if not match:
+        return None
+    name = _lower_first(match.group(1))
+    if name in fields:
+        return name
+    # 字段名本身以 Desc 结尾的极少见情况
+    full = _lower_first(method.split('By', 1)[1])
+    return full if full in fields else None
+
+
+def analyze_query(query: Dict, collection: Dict) -> List[Dict]:
+    """分析单条查询链，返回发现列表"""
+    findings = []
+    fields = collection.get('fields', [])
+    indexes = set(collection.get('indexes', []))
+    chain = query['chain']
+    chain_text = query['accessor'] + ''.join(f'.{m}()' for m in chain)
+    base = {
+        'line': query.get('line'),
+        'collection': collection['class_name'],
+        'chain': chain_text,
+    }
+
+    if 'filter' in chain:
+        filter_pos = chain.index('filter')
+        conditions = []
+        for method in chain[filter_pos + 1:]:
+            field = _condition_field(method, fields)
+            if field:
+                conditions.append((field, _condition_suffix(method, field)))
+        indexed = [
+            (f, s) for f, s in conditions
+            if f in indexes and s in WHERE_COMPATIBLE_SUFFIXES
+        ]
+        if indexed:
+            field, suffix = indexed[0]
+            findings.append(dict(base, **{
+                'kind': 'filter_on_indexed_field',
+                'severity': 'high',
+                'fields': sorted({f for f, _ in indexed}),
+                'suggestion': (
+                    f'filter() 全表扫描后才过滤；{field} 已建索引，'
+                    f'改用 where().{field}{suffix}() 走索引，其余条件放在其后的 filter() 中'
+                ),
+            }))
+        else:
+            findings.append(dict(base, **{
+                'kind': 'full_scan',
+                'severity': 'medium',
+                'fields': sorted({f for f, _ in conditions}),
+                'suggestion': (
+                    'filter() 条件均未命中索引，需要扫描整个集合；'
+                    '高频查询建议为首个条件字段添加 @Index()'
+                ),
+            }))
+    elif 'where' in chain:
+        where_pos = chain.index('where')
+        clause = chain[where_pos + 1] if where_pos + 1 < len(chain) else ''
+        # anyXxx() 只决定读取顺序，仍然读取整个集合
+        if _condition_field(clause, fields) not in indexes:
+            findings.append(dict(base, **{
+                'kind': 'full_scan',
+                'severity': 'low',
+                'fields': [],
+                'suggestion': 'where() 未带索引子句，读取整个集合；确认是否需要全部记录',
+            }))
+
+    unindexed_sorts = []
+    for method in chain:
+        if method.startswith('sortBy') or method.startswith('thenBy'):
+            field = _sort_field(method, fields)
+            if field and field not in indexes:
+                unindexed_sorts.append(field)
+    if unindexed_sorts:
+        findings.append(dict(base, **{
+            'kind': 'unindexed_sort',
+            'severity': 'low',
+            'fields': unindexed_sorts,
+            'suggestion': (
+                f'按未建索引字段 {", ".join(unindexed_sorts)} 排序，结果需在内存中排序；'
+                '大集合建议添加索引并用 where().anyXxx() 按索引顺序读取'
+            ),
+        }))
+    return findings
+
+
+def load_collections(use_dart: bool = True) -> Dict[str, Dict]:
+    """加载全部 Isar 集合定义，按访问器名索引（进程内缓存）"""
+    global _COLLECTIONS_CACHE
+    with _collections_lock:
+        if _COLLECTIONS_CACHE is not None:
+            return _COLLECTIONS_CACHE
+
+        collections: Dict[str, Dict] = {}
+        entity_files = [f for f in sorted(ENTITY_DIR.glob('*.dart')) if not f.name.endswith('.g.dart')] \
+            if ENTITY_DIR.exists() else []
+        analyzed = {}
+        if use_dart and entity_files:
+            from yaml_generator import analyze_batch
+            analyzed = analyze_batch(entity_files)
+        for entity_file in entity_files:
+            dart_data = analyzed.get(entity_file)
+            if dart_data and 'isar_collections' in dart_data:
+                entries = dart_data['isar_collections']
+            else:
+                entries = extract_collections(read_source(entity_file))
+            for entry in entries:
+                collections[collection_accessor(entry['class_name'])] = entry
+
+        _COLLECTIONS_CACHE = collections
+        return collections
+
+
+def invalidate():
+    """清除 Isar 集合缓存（实体文件变化后调用）"""
+    global _COLLECTIONS_CACHE
+    with _collections_lock:
+        _COLLECTIONS_CACHE = None
+
+
+def build_query_report(content: str, dart_data: Optional[Dict] = None,
+                       collections: Optional[Dict[str, Dict]] = None) -> Dict:
+    """生成单个 Repository 文件的查询分析结果（写入 YAML 的 isar_query_analysis）"""
+    if collections is None:
+        collections = load_collections(use_dart=dart_data is not None)
+    if dart_data and 'isar_queries' in dart_data:
+        raw_queries = dart_data['isar_queries']
+    else:
+        raw_queries = extract_queries(content)
+
+    queries = [
+        q for q in link_builder_chains(raw_queries)
+        if q['accessor'] in collections
+    ]
+    findings: List[Dict] = []
+    for query in queries:
+        findings.extend(analyze_query(query, collections[query['accessor']]))
+    findings.sort(key=lambda f: (SEVERITY_ORDER[f['severity']], f['line'] or 0))
+
+    summary: Dict[str, int] = {}
+    for finding in findings:
+        summary[finding['kind']] = summary.get(finding['kind'], 0) + 1
+
+    used = sorted({q['accessor'] for q in queries})
+    return {
+        'analyzed_queries': len(queries),
+        'indexes': {
+            collections[a]['class_name']: collections[a]['indexes'] for a in used
+        },
+        'summary': summary,
+        'findings': findings,
+    }
+
+
+def write_report_to_yaml(yaml_path: Path, report: Dict) -> bool:
+    """把分析结果写入 Repository 架构 YAML，返回是否写入"""
+    if not yaml_path.exists():
+        return False
+    with yaml_path.open('r', encoding='utf-8') as f:
+        doc = yaml.safe_load(f) or {}
+    doc['isar_query_analysis'] = report
+    with yaml_path.open('w', encoding='utf-8') as f:
+        yaml.safe_dump(doc, f, allow_unicode=True, sort_keys=False)
+    return True
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Isar 查询-索引交叉分析')
+    parser.add_argument('--write', action='store_true',
+                        help='将结果写入 repositories 架构 YAML')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出完整结果')
+    parser.add_argument('--no-dart', action='store_true',
+                        help='不调用 Dart 分析器，仅使用正则分析')
+    args = parser.parse_args()
+
+    use_dart = not args.no_dart
+    collections = load_collections(use_dart=use_dart)
+
+    reports = {}
+    for repo_file in sorted(REPOSITORY_DIR.glob('*.dart')):
+        if repo_file.name.endswith('.g.dart'):
+            continue
+        dart_data = None
+        if use_dart:
+            from yaml_generator import call_dart_analyzer
+            dart_data = call_dart_analyzer(repo_file)
+        content = read_source(repo_file)
+        reports[repo_file] = build_query_report(content, dart_data, collections)
+
+    if args.json:
+        print(json.dumps(
+            {str(p.relative_to(ROOT)): r for p, r in reports.items()},
+            ensure_ascii=False, indent=2,
+        ))
+    else:
+        total_findings = 0
+        for repo_file, report in reports.items():
+            if not report['analyzed_queries']:
+                continue
+            print(f"{repo_file.relative_to(ROOT)}  (查询 {report['analyzed_queries']} 条)")
+            for finding in report['findings']:
+                total_findings += 1
+                print(f"  [{finding['severity']:6}] L{finding['line']:<4} {finding['kind']:24} {finding['chain']}")
+                print(f"           {finding['suggestion']}")
+        print(f"\n[isar-query] 共发现 {total_findings} 个潜在慢查询")
+
+    if args.write:
+        written = 0
+        for repo_file, report in reports.items():
+            yaml_path = REPOSITORY_YAML_DIR / f'{repo_file.stem}.yaml'
+            if write_report_to_yaml(yaml_path, report):
+                written += 1
+        print(f'[isar-query] 已写入 {written} 个 Repository YAML')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+YAML 生成流水线的分阶段性能剖析
+
+记录每个文件、每个阶段的耗时区间（span），导出为 Chrome trace JSON
+（chrome://tracing 或 https://ui.perfetto.dev 打开），并汇总每个阶段的 p50/p95。
+
+未启用时 span() 只返回空上下文，不产生额外开销。
+
+用法：
+    from pipeline_profiler import span
+    with span('template_load', type='widget') as args:
+        ...
+        args['path'] = 'fallback'   # 结束前可补充参数
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+_PROFILER: Optional['Profiler'] = None
+
+
+def percentile(values: List[float], q: float) -> float:
+    """最近秩百分位（q 取 0~100）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(-(-q * len(ordered) // 100)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Profiler:
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.origin = time.perf_counter()
+        self._threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _tid(self) -> int:
+        ident = threading.get_ident()
+        with self._lock:
+            return self._threads.setdefault(ident, len(self._threads) + 1)
+
+    def add(self, name: str, start: float, duration: float, args: Optional[Dict[str, Any]] = None):
+        """记录一个区间（start 为 time.perf_counter() 值，duration 单位秒）"""
+        event = {
+            'name': name,
+            'ph': 'X',
+            'pid': os.getpid(),
+            'tid': self._tid(),
+            'ts': round((start - self.origin) * 1e6, 1),
+            'dur': round(duration * 1e6, 1),
+            'args': dict(args or {}),
+        }
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, **args):
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.add(name, start, time.perf_counter() - start, args)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+        metadata = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid,
+             'args': {'name': 'main' if tid == 1 else f'worker-{tid - 1}'}}
+            for tid in threads.values()
+        ]
+        return {'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+        return path
+
+    def stage_summary(self) -> List[Dict[str, Any]]:
+        """每个阶段的次数、总耗时与 p50/p95/max（毫秒）；build_doc 按分析路径拆分"""
+        samples: Dict[str, List[float]] = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            stage = event['name']
+            path = event['args'].get('path')
+            if path:
+                stage = f"{stage}[{path}]"
+            samples.setdefault(stage, []).append(event['dur'] / 1000.0)
+        rows = [
+            {
+                'stage': stage,
+                'count': len(values),
+                'total_ms': sum(values),
+                'p50_ms': percentile(values, 50),
+                'p95_ms': percentile(values, 95),
+                'max_ms': max(values),
+            }
+            for stage, values in samples.items()
+        ]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+def print_stage_summary(rows: List[Dict[str, Any]]):
+    print(f"{'阶段':28} {'次数':>6} {'总计(ms)':>10} {'p50(ms)':>9} {'p95(ms)':>9} {'max(ms)':>9}")
+    for row in rows:
+        print(f"{row['stage']:28} {row['count']:6} {row['total_ms']:10.1f} "
+              f"{row['p50_ms']:9.1f} {row['p95_ms']:9.1f} {row['max_ms']:9.1f}")
+
+
+def enable_profiling() -> Profiler:
+    global _PROFILER
+    _PROFILER = Profiler()
+    return _PROFILER
+
+
+def profiler() -> Optional[Profiler]:
+    return _PROFILER
+
+
+def span(name: str, **args):
+    """记录一个阶段；未启用剖析时为空操作"""
+    if _PROFILER is None:
+        return nullcontext(args)
+    return _PROFILER.span(name, **args)
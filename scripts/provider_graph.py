@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Riverpod provider 依赖图：估算每个 provider 变更时的重建扇出
+
+分析内容：
+- lib/ 下全部顶层 provider 声明（final xxxProvider = StreamProvider...(...)）
+- 声明内部的 ref.watch/listen/read，以及 Notifier 类中的 ref.* 调用（归属到对应 provider）
+- lib/presentation 中 Widget/Page 对 provider 的 ref.watch
+
+只有 ref.watch 会让依赖方随之重建，因此重建边只取 watch：
+    A 被 B watch  =>  A 变化时 B 重建，B 的下游继续被传递重建
+rebuild_fan_out 为沿 watch 边传递可达的 provider 数与 Widget 数。
+
+策略（与 yaml_generator.py 一致）：
+1. 优先使用 tools/dart_analyzer.dart 输出的 provider_declarations / provider_usages
+2. 降级到正则表达式分析
+
+用法：
+    python scripts/provider_graph.py [--no-dart] [--json] [--write] [--top N]
+
+    --write   将结果写入 documents/architecture/providers/*.yaml 的 provider_graph 字段
+"""
+import os
+import sys
+import re
+import json
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from source_index import dart_files, read_source
+from widget_perf_lint import _enclosing_class, _line_of, _matching_close
+
+# 项目根目录（GRANOFLOW_ROOT 可覆盖，用于基准测试的合成语料）
+ROOT = Path(os.environ.get('GRANOFLOW_ROOT') or Path(__file__).resolve().parents[1]).resolve()
+LIB_DIR = ROOT / 'lib'
+PRESENTATION_DIR = LIB_DIR / 'presentation'
+PROVIDER_YAML_DIR = ROOT / 'documents' / 'architecture' / 'providers'
+
+REF_KINDS = ('watch', 'listen', 'read')
+
+_DECLARATION = re.compile(
+    r'^final\s+(\w+)\s*=\s*((?:[A-Z]\w*)?Provider)((?:\.\w+)*)\s*(?:<\s*(\w+))?',
+    re.MULTILINE,
+)
+_REF_CALL = re.compile(r'\bref\s*\.\s*(watch|listen|read)\s*\(\s*(\w+Provider)\b')
+
+_GRAPH_CACHE: Optional[Dict] = None
+# 单文件收集结果（按相对路径），文件变化后只需重新收集该文件
+_FILES_CACHE: Dict[str, Dict[str, List[Dict]]] = {}
+# 生成器并发线程共用一次构建：后到的线程等待并复用结果，而不是各自扫描 lib/
+_graph_lock = threading.Lock()
+
+
+def _relative(path: Path) -> str:
+    try:
+        return str(path.relative_to(ROOT))
+    except ValueError:
+        return str(path)
+
+
+def extract_providers(content: str) -> Dict[str, List[Dict]]:
+    """正则降级：提取 provider 声明与声明外的 ref.* 使用"""
+    declarations: List[Dict] = []
+    spans = []
+    for match in _DECLARATION.finditer(content):
+        open_pos = content.find('(', match.end())
+        end = _matching_close(content, open_pos) if open_pos >= 0 else match.end()
+        body = content[match.start():end + 1]
+        calls: Dict[str, List[str]] = {kind: [] for kind in REF_KINDS}
+        for call in _REF_CALL.finditer(body):
+            if call.group(2) not in calls[call.group(1)]:
+                calls[call.group(1)].append(call.group(2))
+        provider_type = match.group(2)
+        declarations.append({
+            'name': match.group(1),
+            'type': provider_type,
+            'modifiers': [m for m in match.group(3).split('.') if m],
+            'notifier': match.group(4) if 'Notifier' in provider_type else None,
+            'line': _line_of(content, match.start()),
+            'watches': calls['watch'],
+            'listens': calls['listen'],
+            'reads': calls['read'],
+        })
+        spans.append((match.start(), end))
+
+    usages: List[Dict] = []
+    for call in _REF_CALL.finditer(content):
+        if any(start <= call.start() <= end for start, end in spans):
+            continue
+        usages.append({
+            'provider': call.group(2),
+            'kind': call.group(1),
+            'class': _enclosing_class(content, call.start()),
+            'line': _line_of(content, call.start()),
+        })
+    return {'provider_declarations': declarations, 'provider_usages': usages}
+
+
+def collect_file(dart_file: Path, use_dart: bool = True, dart_data: Optional[Dict] = None) -> Dict[str, List[Dict]]:
+    """优先使用 Dart 分析器结果（dart_data 为已取得的分析结果），否则降级为正则提取"""
+    if use_dart:
+        if dart_data is None:
+            from yaml_generator import call_dart_analyzer
+            dart_data = call_dart_analyzer(dart_file)
+        if dart_data and 'provider_declarations' in dart_data:
+            return {
+                'provider_declarations': dart_data['provider_declarations'],
+                'provider_usages': dart_data.get('provider_usages', []),
+            }
+    return extract_providers(read_source(dart_file))
+
+
+def build_graph(files: Dict[str, Dict[str, List[Dict]]]) -> Dict:
+    """由逐文件提取结果构建依赖图并计算每个 provider 的重建扇出"""
+    providers: Dict[str, Dict] = {}
+    notifier_owner: Dict[str, str] = {}
+    for rel, data in files.items():
+        for decl in data['provider_declarations']:
+            providers[decl['name']] = {**decl, 'file': rel}
+            if decl.get('notifier'):
+                notifier_owner[decl['notifier']] = decl['name']
+
+    # Notifier 类中的 ref.* 调用属于对应 provider 的依赖
+    for rel, data in files.items():
+        for usage in data['provider_usages']:
+            owner = notifier_owner.get(usage['class'] or '')
+            if owner is None or usage['provider'] not in providers:
+                continue
+            key = {'watch': 'watches', 'listen': 'listens', 'read': 'reads'}[usage['kind']]
+            if usage['provider'] not in providers[owner][key]:
+                providers[owner][key] = providers[owner][key] + [usage['provider']]
+
+    # 反向 watch 边：provider -> 直接 watch 它的 provider / widget
+    dependents = {name: set() for name in providers}
+    widget_dependents: Dict[str, Set[str]] = {name: set() for name in providers}
+    for name, decl in providers.items():
+        for target in decl['watches']:
+            if target in dependents and target != name:
+                dependents[target].add(name)
+    presentation_prefix = _relative(PRESENTATION_DIR) + '/'
+    for rel, data in files.items():
+        if not rel.startswith(presentation_prefix):
+            continue
+        for usage in data['provider_usages']:
+            if usage['kind'] == 'watch' and usage['provider'] in providers and usage['class']:
+                widget_dependents[usage['provider']].add(f"{usage['class']} ({rel})")
+
+    for name, decl in providers.items():
+        reached = _transitive_dependents(name, dependents)
+        widgets = set(widget_dependents[name])
+        for dependent in reached:
+            widgets |= widget_dependents[dependent]
+        decl['watched_by'] = sorted(dependents[name])
+        decl['watched_by_widgets'] = sorted(widget_dependents[name])
+        decl['rebuild_fan_out'] = {
+            'providers': len(reached),
+            'widgets': len(widgets),
+            'total': len(reached) + len(widgets),
+        }
+
+    return {
+        'providers': providers,
+        'ranking': rank_providers(providers),
+    }
+
+
+def _transitive_dependents(name: str, dependents: Dict[str, Set[str]]) -> Set[str]:
+    seen: Set[str] = set()
+    queue = deque(dependents[name])
+    while queue:
+        current = queue.popleft()
+        if current in seen or current == name:
+            continue
+        seen.add(current)
+        queue.extend(dependents.get(current, ()))
+    return seen
+
+
+def rank_providers(providers: Dict[str, Dict], top: Optional[int] = None) -> List[Dict]:
+    """按重建扇出从高到低排序"""
+    ranked = sorted(
+        providers.values(),
+        key=lambda p: (-p['rebuild_fan_out']['total'], p['name']),
+    )
+    if top is not None:
+        ranked = ranked[:top]
+    return [
+        {'name': p['name'], 'file': p['file'], **p['rebuild_fan_out']}
+        for p in ranked
+    ]
+
+
+def load_graph(use_dart: bool = True) -> Dict:
+    """扫描 lib/ 构建完整依赖图（进程内缓存，线程安全）
+
+    尚未收集的文件一次性交给 Dart 分析器批量分析（一个 --stdin 进程），不再每个文件启动一次 VM。
+    """
+    global _GRAPH_CACHE
+    with _graph_lock:
+        if _GRAPH_CACHE is not None:
+            return _GRAPH_CACHE
+
+        sources = {_relative(f): f for f in dart_files(LIB_DIR)}
+        missing = [f for rel, f in sources.items() if rel not in _FILES_CACHE]
+        analyzed = {}
+        if use_dart and missing:
+            from yaml_generator import analyze_batch
+            analyzed = analyze_batch(missing)
+        for dart_file in missing:
+            # 分析失败的文件降级为正则提取
+            dart_data = analyzed.get(dart_file)
+            _FILES_CACHE[_relative(dart_file)] = collect_file(dart_file, dart_data is not None, dart_data)
+
+        _GRAPH_CACHE = build_graph({rel: _FILES_CACHE[rel] for rel in sources})
+        return _GRAPH_CACHE
+
+
+def cached_graph() -> Optional[Dict]:
+    """已构建的依赖图（尚未构建时返回 None，不触发扫描）"""
+    return _GRAPH_CACHE
+
+
+def invalidate(paths: Optional[Iterable[Path]] = None):
+    """清除依赖图缓存；给定 paths 时只丢弃这些文件的收集结果，其余文件下次直接复用"""
+    global _GRAPH_CACHE
+    with _graph_lock:
+        _GRAPH_CACHE = None
+        if paths is None:
+            _FILES_CACHE.clear()
+            return
+        for path in paths:
+            _FILES_CACHE.pop(_relative(path), None)
+
+
+def file_section(graph: Dict, rel_path: str) -> Dict:
+    """单个 provider 源文件的 provider_graph 字段内容"""
+    entries = sorted(
+        (p for p in graph['providers'].values() if p['file'] == rel_path),
+        key=lambda p: p['line'],
+    )
+    return {
+        'providers': [
+            {
+                'name': p['name'],
+                'type': p['type'],
+                'modifiers': p['modifiers'],
+                'line': p['line'],
+                'watches': p['watches'],
+                'listens': p['listens'],
+                'reads': p['reads'],
+                'watched_by': p['watched_by'],
+                'watched_by_widgets': p['watched_by_widgets'],
+                'rebuild_fan_out': p['rebuild_fan_out'],
+            }
+            for p in entries
+        ],
+        'max_rebuild_fan_out': max((p['rebuild_fan_out']['total'] for p in entries), default=0),
+    }
+
+
+def write_graph_to_yaml(graph: Dict) -> int:
+    """按 meta.file_path 把结果写入 providers 架构 YAML，返回写入的文件数"""
+    import yaml
+    from architecture_manifest import load_corpus
+
+    # 文档从语料快照读取，写入后回写清单
+    manifest = load_corpus()
+    written = 0
+    for yaml_path, doc in manifest.documents():
+        if yaml_path.parent != PROVIDER_YAML_DIR or yaml_path.suffix != '.yaml' or not isinstance(doc, dict):
+            continue
+        file_path = (doc.get('meta') or {}).get('file_path')
+        if not file_path:
+            continue
+        section = file_section(graph, file_path)
+        if not section['providers'] or doc.get('provider_graph') == section:
+            continue
+        doc['provider_graph'] = section
+        with yaml_path.open('w', encoding='utf-8') as f:
+            yaml.safe_dump(doc, f, allow_unicode=True, sort_keys=False)
+        manifest.record(yaml_path, doc)
+        written += 1
+    manifest.save()
+    return written
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Riverpod provider 重建扇出分析')
+    parser.add_argument('--no-dart', action='store_true', help='不调用 Dart 分析器，仅使用正则分析')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出完整结果')
+    parser.add_argument('--write', action='store_true',
+                        help='将结果写入 providers 架构 YAML')
+    parser.add_argument('--top', type=int, default=15, help='排行榜显示条数（默认 15）')
+    args = parser.parse_args()
+
+    graph = load_graph(use_dart=not args.no_dart)
+    if args.write:
+        written = write_graph_to_yaml(graph)
+        print(f'[provider-graph] 已写入 {written} 个 Provider YAML', file=sys.stderr)
+    if args.json:
+        print(json.dumps(graph, ensure_ascii=False, indent=2))
+        return 0
+
+    providers = graph['providers']
+    edges = sum(len(p['watches']) for p in providers.values())
+    print(f'[provider-graph] {len(providers)} 个 provider，{edges} 条 watch 依赖')
+    print(f"  {'provider':40} {'providers':>9} {'widgets':>8} {'total':>6}")
+    for item in rank_providers(providers, args.top):
+        print(f"  {item['name']:40} {item['providers']:9} {item['widgets']:8} {item['total']:6}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
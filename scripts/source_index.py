@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+lib/ 源文件索引（进程内缓存）
+
+- 一次 os.scandir 递归遍历 lib/，得到全部 Dart 源文件（排除生成文件与隐藏目录）
+- 每个文件只读取一次，内容缓存供 enum 过滤、DartAnalyzer、provider 依赖图、性能检查等共享
+
+用法（调试）：
+    python scripts/source_index.py [--dir lib/presentation/widgets] [--pattern '*_page.dart']
+"""
+import os
+import sys
+import threading
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 项目根目录（GRANOFLOW_ROOT 可覆盖，用于基准测试的合成语料）
+ROOT = Path(os.environ.get('GRANOFLOW_ROOT') or Path(__file__).resolve().parents[1]).resolve()
+LIB_DIR = ROOT / 'lib'
+
+# 排除规则：生成文件后缀、目录名（隐藏目录总是排除）
+EXCLUDE_SUFFIXES: Tuple[str, ...] = ('.g.dart', '.freezed.dart')
+EXCLUDE_DIRS: Tuple[str, ...] = ('build',)
+
+_WALK_CACHE: Dict[Path, List[Path]] = {}
+_CONTENT_CACHE: Dict[Path, str] = {}
+_lock = threading.Lock()
+
+
+def is_excluded(name: str) -> bool:
+    return name.endswith(EXCLUDE_SUFFIXES)
+
+
+def _walk(directory: Path, found: List[Path]):
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith('.'):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name not in EXCLUDE_DIRS:
+                _walk(Path(entry.path), found)
+        elif entry.name.endswith('.dart') and not is_excluded(entry.name):
+            found.append(Path(entry.path))
+
+
+def dart_files(root: Path = LIB_DIR) -> List[Path]:
+    """root 下全部 Dart 源文件（递归，已排序；同一进程内只遍历一次）"""
+    root = root.resolve()
+    with _lock:
+        cached = _WALK_CACHE.get(root)
+    if cached is not None:
+        return cached
+    found: List[Path] = []
+    _walk(root, found)
+    found.sort()
+    with _lock:
+        _WALK_CACHE[root] = found
+    return found
+
+
+def files_under(directories: Iterable[Path], pattern: str = '*.dart') -> List[Path]:
+    """
+    位于 directories（递归）下且文件名匹配 pattern 的源文件
+
+    目录在 lib/ 内时复用 lib/ 的一次遍历结果，否则单独遍历该目录
+    """
+    lib = LIB_DIR.resolve()
+    result: List[Path] = []
+    for directory in directories:
+        directory = directory.resolve()
+        base = lib if directory == lib or lib in directory.parents else directory
+        prefix = str(directory) + os.sep
+        result.extend(
+            f for f in dart_files(base)
+            if (base == directory or str(f).startswith(prefix)) and fnmatch(f.name, pattern)
+        )
+    return sorted(set(result))
+
+
+def read_source(path: Path) -> str:
+    """读取源文件内容（缓存，每个文件只读一次）"""
+    key = path.resolve()
+    with _lock:
+        content = _CONTENT_CACHE.get(key)
+    if content is None:
+        content = key.read_text(encoding='utf-8')
+        with _lock:
+            content = _CONTENT_CACHE.setdefault(key, content)
+    return content
+
+
+def invalidate(path: Optional[Path] = None, rescan: bool = False):
+    """清除缓存（path 为空时清除全部，包括遍历结果；rescan=True 时同时丢弃遍历结果，用于文件新增/删除）"""
+    with _lock:
+        if path is None:
+            _WALK_CACHE.clear()
+            _CONTENT_CACHE.clear()
+        else:
+            _CONTENT_CACHE.pop(path.resolve(), None)
+            if rescan:
+                _WALK_CACHE.clear()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='列出 lib/ 源文件索引')
+    parser.add_argument('--dir', action='append', default=[], help='只列出该目录下的文件（可多次指定）')
+    parser.add_argument('--pattern', default='*.dart', help='文件名匹配模式')
+    args = parser.parse_args()
+
+    if args.dir:
+        files = files_under([ROOT / d for d in args.dir], args.pattern)
+    else:
+        files = [f for f in dart_files() if fnmatch(f.name, args.pattern)]
+    for f in files:
+        print(f.relative_to(ROOT))
+    print(f'[source-index] {len(files)} 个文件', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
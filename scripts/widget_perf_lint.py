@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Flutter 性能检查：找出 presentation 层常见的重建开销
+
+检查规则（与 tools/dart_analyzer.dart 的 performance_lints 保持一致）：
+- prefer_const_constructor: 参数均为常量的构造调用未声明 const
+- list_view_without_builder: ListView/GridView(children:) 传入动态生成的列表
+- watch_without_select: ref.watch 整个 provider，而实际只用到一两个字段
+- large_build_method: build 方法过大（超过 LARGE_BUILD_METHOD_LINES 行）
+
+策略：
+1. 优先使用 Dart 分析器的 AST 结果（dart_data['performance_lints']）
+2. 降级到正则表达式分析（白名单构造函数 + 括号匹配）
+
+用法：
+    python scripts/widget_perf_lint.py [--no-dart] [--json] [--write] [files...]
+
+不指定文件时扫描 lib/presentation 下全部 Dart 文件，并输出仓库级汇总。
+--write 将结果写入对应 widgets/pages 架构 YAML 的 *_definition.performance_lints。
+"""
+import os
+import sys
+import re
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from source_index import files_under, read_source
+
+# 项目根目录（GRANOFLOW_ROOT 可覆盖，用于基准测试的合成语料）
+ROOT = Path(os.environ.get('GRANOFLOW_ROOT') or Path(__file__).resolve().parents[1]).resolve()
+PRESENTATION_DIR = ROOT / 'lib' / 'presentation'
+ARCH_DIR = ROOT / 'documents' / 'architecture'
+
+LARGE_BUILD_METHOD_LINES = 80
+
+RULES = [
+    'prefer_const_constructor',
+    'list_view_without_builder',
+    'watch_without_select',
+    'large_build_method',
+]
+
+# 正则降级时认定为 const 构造的 Flutter 类型（带命名构造的写全名）
+CONST_CONSTRUCTORS = {
+    'SizedBox', 'SizedBox.shrink', 'SizedBox.square', 'SizedBox.expand',
+    'SizedBox.fromSize', 'SizedBox.height', 'SizedBox.width',
+    'Padding', 'Center', 'Align', 'Expanded', 'Flexible', 'Spacer',
+    'Divider', 'VerticalDivider', 'Icon', 'Text', 'Column', 'Row', 'Wrap',
+    'EdgeInsets.all', 'EdgeInsets.symmetric', 'EdgeInsets.only',
+    'EdgeInsets.fromLTRB', 'EdgeInsetsDirectional.only',
+    'EdgeInsetsDirectional.fromSTEB', 'BorderRadius.all', 'Radius.circular',
+    'Duration', 'Offset', 'Size', 'Color', 'TextStyle', 'BoxConstraints',
+    'CircularProgressIndicator', 'LinearProgressIndicator',
+    'Placeholder', 'AspectRatio', 'Opacity',
+}
+
+# AsyncValue 自身的 API：对其访问不构成 select 优化机会
+ASYNC_VALUE_MEMBERS = {
+    'value', 'valueOrNull', 'isLoading', 'isRefreshing', 'isReloading',
+    'hasValue', 'hasError', 'error', 'stackTrace', 'asData', 'asError',
+    'when', 'maybeWhen', 'whenOrNull', 'whenData', 'map', 'maybeMap',
+    'requireValue', 'notifier',
+}
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<string>r?'(?:\\.|[^'\\])*'|r?"(?:\\.|[^"\\])*")
+      | (?P<number>0x[0-9a-fA-F]+|\d+(?:\.\d+)?)
+      | (?P<ident>[A-Za-z_]\w*(?:\s*\.\s*[A-Za-z_]\w*)*)
+      | (?P<punct>[-+*/%~,:()\[\]])
+      | (?P<other>\S)
+    )""",
+    re.VERBOSE,
+)
+
+
+def _skip_string(content: str, i: int) -> int:
+    """i 指向引号，返回字符串之后的位置"""
+    quote = content[i]
+    triple = content[i:i + 3] == quote * 3
+    if triple:
+        end = content.find(quote * 3, i + 3)
+        return len(content) if end < 0 else end + 3
+    j = i + 1
+    while j < len(content):
+        if content[j] == '\\':
+            j += 2
+            continue
+        if content[j] == quote or content[j] == '\n':
+            return j + 1
+        j += 1
+    return j
+
+
+def _matching_close(content: str, open_pos: int) -> int:
+    """返回与 open_pos 处括号配对的右括号位置（跳过字符串与注释）"""
+    pairs = {'(': ')', '[': ']', '{': '}'}
+    stack = []
+    i = open_pos
+    while i < len(content):
+        ch = content[i]
+        if ch in ('"', "'"):
+            i = _skip_string(content, i)
+            continue
+        if content.startswith('//', i):
+            nl = content.find('\n', i)
+            i = len(content) if nl < 0 else nl
+            continue
+        if ch in pairs:
+            stack.append(pairs[ch])
+        elif stack and ch == stack[-1]:
+            stack.pop()
+            if not stack:
+                return i
+        i += 1
+    return len(content) - 1
+
+
+def _top_level_text(text: str) -> str:
+    """去掉嵌套括号内的内容，只保留最外层（用于判断列表元素本身）"""
+    result = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch in '([{':
+            close = _matching_close(text, i)
+            result.append(ch + text[close:close + 1])
+            i = close + 1
+            continue
+        if ch in ('"', "'"):
+            i = _skip_string(text, i)
+            continue
+        result.append(ch)
+        i += 1
+    return ''.join(result)
+
+
+def _line_of(content: str, pos: int) -> int:
+    return content.count('\n', 0, pos) + 1
+
+
+def _is_const_expression(text: str) -> bool:
+    """正则降级：判断参数表达式是否全部由常量构成"""
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            break
+        pos = match.end()
+        if match.group('string'):
+            literal = match.group('string')
+            if '$' in literal and not literal.startswith('r'):
+                return False
+        elif match.group('ident'):
+            ident = re.sub(r'\s+', '', match.group('ident'))
+            rest = text[pos:].lstrip()
+            if ident in ('true', 'false', 'null'):
+                continue
+            if ident == 'const':
+                # 显式 const 子表达式无需再检查
+                nxt = _TOKEN.match(text, pos)
+                if nxt and nxt.group('ident'):
+                    pos = nxt.end()
+                    after = text[pos:].lstrip()
+                    if after.startswith('('):
+                        open_pos = text.index('(', pos)
+                        pos = _matching_close(text, open_pos) + 1
+                elif rest.startswith('['):
+                    open_pos = text.index('[', pos)
+                    pos = _matching_close(text, open_pos) + 1
+                continue
+            if rest.startswith(':') and '.' not in ident:
+                continue  # 命名参数标签
+            if rest.startswith('('):
+                if ident not in CONST_CONSTRUCTORS:
+                    return False
+                open_pos = text.index('(', pos)
+                close = _matching_close(text, open_pos)
+                if not _is_const_expression(text[open_pos + 1:close]):
+                    return False
+                pos = close + 1
+                continue
+            if rest.startswith('['):
+                return False  # 下标访问（如 Colors.grey[200]）
+            parts = ident.split('.')
+            if len(parts) == 2 and parts[0][:1].isupper():
+                continue  # Icons.add / TextAlign.center 等静态常量
+            if len(parts) == 1 and re.match(r'k[A-Z]', ident):
+                continue  # kDefaultPadding 等顶层常量约定
+            return False
+        elif match.group('punct'):
+            continue
+        elif match.group('number'):
+            continue
+        else:
+            return False
+    return True
+
+
+def _const_context_spans(content: str) -> List[Tuple[int, int]]:
+    """返回所有 const 上下文（const X(...) / const [...]）的区间"""
+    spans = []
+    for match in re.finditer(r'\bconst\s+(?:[A-Z][\w.]*\s*(?:<[^>]*>)?\s*\(|(?:<[^>]*>)?\s*\[)', content):
+        open_pos = match.end() - 1
+        spans.append((open_pos, _matching_close(content, open_pos)))
+    return spans
+
+
+def _enclosing_class(content: str, pos: int) -> Optional[str]:
+    name = None
+    for match in re.finditer(r'\bclass\s+(\w+)', content[:pos]):
+        name = match.group(1)
+    return name
+
+
+def _lint(rule: str, content: str, pos: int, message: str) -> Dict:
+    return {
+        'rule': rule,
+        'line': _line_of(content, pos),
+        'class': _enclosing_class(content, pos),
+        'message': message,
+    }
+
+
+def _check_const_constructors(content: str) -> List[Dict]:
+    findings = []
+    const_spans = _const_context_spans(content)
+    pattern = re.compile(r'(?<![\w.])([A-Z]\w*(?:\.\w+)?)\s*\(')
+    for match in pattern.finditer(content):
+        name = match.group(1)
+        if name not in CONST_CONSTRUCTORS:
+            continue
+        before = content[max(0, match.start() - 12):match.start()]
+        if re.search(r'\b(const|new)\s*$', before):
+            continue
+        open_pos = match.end() - 1
+        if any(start < open_pos <= end for start, end in const_spans):
+            continue
+        close = _matching_close(content, open_pos)
+        if _is_const_expression(content[open_pos + 1:close]):
+            findings.append(_lint(
+                'prefer_const_constructor', content, match.start(),
+                f'{name.split(".")[0]}(...) 的参数均为常量，添加 const 可在重建时复用实例',
+            ))
+    return findings
+
+
+def _check_list_views(content: str) -> List[Dict]:
+    findings = []
+    for match in re.finditer(r'(?<![\w.])(ListView|GridView)\s*\(', content):
+        open_pos = match.end() - 1
+        close = _matching_close(content, open_pos)
+        args = content[open_pos + 1:close]
+        children = re.search(r'\bchildren\s*:\s*', args)
+        if not children:
+            continue
+        value_start = children.end()
+        if args[value_start:value_start + 1] == '[' or args[value_start:].startswith('const'):
+            list_open = args.find('[', value_start)
+            list_close = _matching_close(args, list_open)
+            body = _top_level_text(args[list_open + 1:list_close])
+            if not re.search(r'\bfor\s*\(|\.\.\.', body):
+                continue
+        widget = match.group(1)
+        findings.append(_lint(
+            'list_view_without_builder', content, match.start(),
+            f'{widget}(children:) 使用动态生成的列表，会一次性构建全部子项，建议改用 {widget}.builder',
+        ))
+    return findings
+
+
+def _member_accesses(body: str, var: str) -> Optional[set]:
+    """变量只通过属性访问时返回成员名集合，存在其他用法时返回 None"""
+    members = set()
+    for use in re.finditer(r'(?<![\w.])' + re.escape(var) + r'\b', body):
+        rest = body[use.end():]
+        member = re.match(r'\s*\??\.\s*(\w+)', rest)
+        if not member:
+            return None
+        after = rest[member.end():].lstrip()
+        if after.startswith('('):
+            return None
+        members.add(member.group(1))
+    return members
+
+
+def _check_watch_without_select(content: str) -> List[Dict]:
+    findings = []
+    for match in re.finditer(r'\bref\s*\.\s*watch\s*\(', content):
+        open_pos = match.end() - 1
+        close = _matching_close(content, open_pos)
+        argument = content[open_pos + 1:close].strip().rstrip(',')
+        if re.search(r'\.select\s*\(', argument):
+            continue
+        members = None
+        direct = re.match(r'\s*\.\s*(\w+)', content[close + 1:])
+        if direct and not content[close + 1 + direct.end():].lstrip().startswith('('):
+            members = {direct.group(1)}
+        else:
+            decl = re.search(r'(?:final|var)\s+(\w+)\s*=\s*$', content[:match.start()])
+            if decl and content[close + 1:].lstrip().startswith(';'):
+                body_end = _function_body_end(content, close)
+                members = _member_accesses(content[close + 1:body_end], decl.group(1))
+        if not members or len(members) > 2 or members & ASYNC_VALUE_MEMBERS:
+            continue
+        findings.append(_lint(
+            'watch_without_select', content, match.start(),
+            f'ref.watch({argument}) 只用到 {", ".join(sorted(members))}，'
+            '建议改用 select 只监听这些字段，避免无关变化触发重建',
+        ))
+    return findings
+
+
+def _function_body_end(content: str, pos: int) -> int:
+    """返回 pos 所在代码块（最近一层未闭合的 '{'）的结束位置"""
+    depth = 0
+    i = pos
+    while i < len(content):
+        ch = content[i]
+        if ch in ('"', "'"):
+            i = _skip_string(content, i)
+            continue
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            if depth == 0:
+                return i
+            depth -= 1
+        i += 1
+    return len(content)
+
+
+def _check_build_methods(content: str) -> List[Dict]:
+    findings = []
+    for match in re.finditer(r'\bWidget\s+build\s*\([^)]*\)\s*\{', content):
+        open_pos = match.end() - 1
+        close = _matching_close(content, open_pos)
+        lines = _line_of(content, close) - _line_of(content, open_pos) + 1
+        if lines > LARGE_BUILD_METHOD_LINES:
+            findings.append(_lint(
+                'large_build_method', content, match.start(),
+                f'build 方法共 {lines} 行（阈值 {LARGE_BUILD_METHOD_LINES}），'
+                '建议拆分为独立的 const 子组件以缩小重建范围',
+            ))
+    return findings
+
+
+def lint_source(content: str) -> List[Dict]:
+    """正则降级：对单个 Dart 文件运行全部性能检查"""
+    findings = (
+        _check_const_constructors(content)
+        + _check_list_views(content)
+        + _check_watch_without_select(content)
+        + _check_build_methods(content)
+    )
+    findings.sort(key=lambda f: (f['line'], f['rule']))
+    return findings
+
+
+def collect_lints(content: str, dart_data: Optional[Dict] = None) -> List[Dict]:
+    """优先使用 Dart 分析器结果，否则降级为正则检查"""
+    if dart_data and 'performance_lints' in dart_data:
+        return sorted(dart_data['performance_lints'], key=lambda f: (f['line'], f['rule']))
+    return lint_source(content)
+
+
+def summarize(lints_by_file: Dict[str, List[Dict]], top: int = 10) -> Dict:
+    """仓库级汇总：按规则计数，并列出问题最多的文件"""
+    by_rule = {rule: 0 for rule in RULES}
+    for lints in lints_by_file.values():
+        for lint in lints:
+            by_rule[lint['rule']] = by_rule.get(lint['rule'], 0) + 1
+    worst = sorted(
+        ((path, len(lints)) for path, lints in lints_by_file.items() if lints),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:top]
+    return {
+        'files_checked': len(lints_by_file),
+        'files_with_findings': sum(1 for lints in lints_by_file.values() if lints),
+        'total': sum(by_rule.values()),
+        'by_rule': by_rule,
+        'top_files': [{'file': path, 'count': count} for path, count in worst],
+    }
+
+
+def print_summary(summary: Dict):
+    print(f"[perf-lint] 检查 {summary['files_checked']} 个文件，"
+          f"{summary['files_with_findings']} 个文件共 {summary['total']} 处问题")
+    for rule, count in summary['by_rule'].items():
+        print(f"  {rule:28} {count:4}")
+    if summary['top_files']:
+        print('  问题最多的文件:')
+        for item in summary['top_files']:
+            print(f"    {item['count']:4}  {item['file']}")
+
+
+def write_lints_to_yaml(lints_by_file: Dict[str, List[Dict]]) -> int:
+    """按 meta.file_path 把结果写入 widgets/pages 架构 YAML，返回写入的文件数"""
+    import yaml
+
+    written = 0
+    for category, definition_key in (('widgets', 'widget_definition'), ('pages', 'page_definition')):
+        for yaml_path in sorted((ARCH_DIR / category).glob('*.yaml')):
+            with yaml_path.open('r', encoding='utf-8') as f:
+                doc = yaml.safe_load(f) or {}
+            file_path = (doc.get('meta') or {}).get('file_path')
+            if file_path not in lints_by_file:
+                continue
+            definition = doc.get(definition_key) or {}
+            if definition.get('performance_lints') == lints_by_file[file_path]:
+                continue
+            definition['performance_lints'] = lints_by_file[file_path]
+            doc[definition_key] = definition
+            with yaml_path.open('w', encoding='utf-8') as f:
+                yaml.safe_dump(doc, f, allow_unicode=True, sort_keys=False)
+            written += 1
+    return written
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='presentation 层 Flutter 性能检查')
+    parser.add_argument('files', nargs='*', help='要检查的 Dart 文件（默认 lib/presentation 全部）')
+    parser.add_argument('--no-dart', action='store_true', help='不调用 Dart 分析器，仅使用正则分析')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出完整结果')
+    parser.add_argument('--write', action='store_true',
+                        help='将结果写入 widgets/pages 架构 YAML')
+    args = parser.parse_args()
+
+    if args.files:
+        files = [Path(f).resolve() for f in args.files]
+    else:
+        files = files_under([PRESENTATION_DIR])
+
+    lints_by_file: Dict[str, List[Dict]] = {}
+    for dart_file in files:
+        dart_data = None
+        if not args.no_dart:
+            from yaml_generator import call_dart_analyzer
+            dart_data = call_dart_analyzer(dart_file)
+        try:
+            rel = str(dart_file.relative_to(ROOT))
+        except ValueError:
+            rel = str(dart_file)
+        lints_by_file[rel] = collect_lints(read_source(dart_file), dart_data)
+
+    summary = summarize(lints_by_file)
+    if args.write:
+        written = write_lints_to_yaml(lints_by_file)
+        print(f'[perf-lint] 已写入 {written} 个架构 YAML', file=sys.stderr)
+    if args.json:
+        print(json.dumps({'summary': summary, 'files': lints_by_file}, ensure_ascii=False, indent=2))
+        return 0
+
+    for path, lints in lints_by_file.items():
+        if not lints:
+            continue
+        print(path)
+        for lint in lints:
+            print(f"  L{lint['line']:<5} {lint['rule']:28} {lint['message']}")
+    print()
+    print_summary(summary)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,24 +11,36 @@
 - services/
 
 用法：
-    python scripts/yaml_create_all.py [--dry-run] [--no-backup]
+    python scripts/yaml_create_all.py [--dry-run] [--no-backup] [--keep-snapshots N]
+
+生成先写入 documents/.architecture-staging（预置当前文档的副本），全部成功后整体换入；
+旧目录移入 documents/.architecture-snapshots 作为快照，只保留最近 N 个。
+换入后把本次写入的文档记入汇总清单与语料快照（architecture_manifest.py），未变化的文档不重新解析。
 
 实现：
     复用 yaml_generator.py 的生成逻辑，本脚本只负责批量调度
 """
+import os
 import sys
 import shutil
-import yaml
 import subprocess
+from fnmatch import fnmatch
 from pathlib import Path
 from datetime import datetime
-from typing import List, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
-ROOT = Path(__file__).resolve().parents[1]
+# 项目根目录（GRANOFLOW_ROOT 可覆盖，用于基准测试的合成语料）
+ROOT = Path(os.environ.get('GRANOFLOW_ROOT') or Path(__file__).resolve().parents[1]).resolve()
 
 # 导入 yaml_generator 的功能（复用代码，避免重复实现）
-sys.path.insert(0, str(ROOT / 'scripts'))
-from yaml_generator import generate_yaml
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+from yaml_generator import generate_yaml, write_yaml_if_changed
+from widget_perf_lint import summarize, print_summary
+from source_index import files_under, read_source
+from adaptive_concurrency import configure_limiter, analyzer_limiter, parse_size
+from pipeline_profiler import enable_profiling, print_stage_summary, span
+from architecture_manifest import Manifest
 
 # 导入并发库
 import concurrent.futures
@@ -85,34 +97,99 @@ TYPE_MAPPINGS = {
 }
 
 
-def backup_architecture_dir() -> Tuple[Path, Path]:
-    """备份整个 architecture 目录（重命名）
+ARCH_DIR = ROOT / 'documents/architecture'
+# 生成先写入暂存目录，成功后整体换入；旧目录作为快照保留（与新目录互不共享文件）
+STAGING_DIR = ROOT / 'documents/.architecture-staging'
+SNAPSHOT_DIR = ROOT / 'documents/.architecture-snapshots'
+DEFAULT_KEEP_SNAPSHOTS = 3
+PROFILE_TRACE = ROOT / 'build' / 'yaml_create_all_trace.json'
+
+
+def prepare_staging(arch_dir: Path = ARCH_DIR, staging_dir: Path = STAGING_DIR) -> int:
+    """把当前 architecture 目录复制到暂存目录
+    
+    未变化的文档直接沿用（copy2 保留 mtime，也保留 created_date 等字段的来源）；
+    routers.yaml 等非生成文件也随之保留。
+    不使用硬链接：换入后旧目录成为快照，共享 inode 时任何原地写入
+    （bulk_update --sync、编辑器保存等）都会同时改写快照。
     
     Returns:
-        (backup_path, routers_yaml_path): 备份路径和 routers.yaml 路径
+        复制的文件数
     """
-    arch_dir = ROOT / 'documents/architecture'
-    
+    if staging_dir.exists():
+        # 上次运行中断留下的暂存目录
+        shutil.rmtree(staging_dir)
+    staging_dir.mkdir(parents=True)
     if not arch_dir.exists():
-        print("  ⚠️  architecture 目录不存在，将创建新目录")
-        return None, None
-    
-    # 保存 routers.yaml（特殊情况，需要保留）
-    routers_yaml = arch_dir / 'routers.yaml'
-    routers_backup = None
-    if routers_yaml.exists():
-        routers_backup = ROOT / 'documents/temp/routers.yaml.temp'
-        routers_backup.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(routers_yaml, routers_backup)
-    
-    timestamp = datetime.now().strftime('%y%m%d-%H%M%S')
-    backup_name = f'architecture-{timestamp}'
-    backup_path = ROOT / 'documents' / backup_name
+        return 0
+    
+    count = 0
+    for src in arch_dir.rglob('*'):
+        dest = staging_dir / src.relative_to(arch_dir)
+        if src.is_dir():
+            dest.mkdir(parents=True, exist_ok=True)
+            continue
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(src, dest)
+        count += 1
+    return count
+
+
+def remove_orphans(yaml_dir: Path, produced: Set[str]) -> List[str]:
+    """删除暂存目录中源文件已不存在的文档（只处理生成的类别目录）"""
+    removed = []
+    if not yaml_dir.exists():
+        return removed
+    for path in sorted(yaml_dir.glob('*.yaml')):
+        if path.name not in produced:
+            path.unlink()
+            removed.append(path.name)
+    return removed
+
+
+def swap_in(staging_dir: Path = STAGING_DIR, arch_dir: Path = ARCH_DIR,
+            snapshot_dir: Optional[Path] = SNAPSHOT_DIR) -> Optional[Path]:
+    """把暂存目录换入为 architecture 目录
     
-    # 直接重命名整个目录
-    arch_dir.rename(backup_path)
+    两次同文件系统内的 rename：旧目录移入快照目录，暂存目录改名为 architecture；
+    第二步失败时把旧目录移回。snapshot_dir 为 None 时不保留快照。
     
-    return backup_path, routers_backup
+    Returns:
+        本次快照路径（无旧目录或不保留快照时为 None）
+    """
+    previous = None
+    if arch_dir.exists():
+        timestamp = datetime.now().strftime('%y%m%d-%H%M%S')
+        holding = (snapshot_dir or arch_dir.parent) / f'architecture-{timestamp}'
+        holding.parent.mkdir(parents=True, exist_ok=True)
+        suffix = 1
+        while holding.exists():
+            suffix += 1
+            holding = holding.with_name(f'architecture-{timestamp}-{suffix}')
+        arch_dir.rename(holding)
+        previous = holding
+    try:
+        staging_dir.rename(arch_dir)
+    except OSError:
+        if previous is not None:
+            previous.rename(arch_dir)
+        raise
+    
+    if previous is not None and snapshot_dir is None:
+        shutil.rmtree(previous)
+        return None
+    return previous
+
+
+def prune_snapshots(keep: int, snapshot_dir: Path = SNAPSHOT_DIR) -> List[Path]:
+    """只保留最近 keep 个快照，返回删除的快照"""
+    if not snapshot_dir.exists():
+        return []
+    snapshots = sorted(p for p in snapshot_dir.iterdir() if p.is_dir() and p.name.startswith('architecture-'))
+    removed = snapshots[:max(len(snapshots) - keep, 0)]
+    for path in removed:
+        shutil.rmtree(path)
+    return removed
 
 
 def is_enum_file(dart_file: Path) -> bool:
@@ -125,7 +202,7 @@ def is_enum_file(dart_file: Path) -> bool:
         bool: 如果文件主要定义是 enum，返回 True
     """
     try:
-        content = dart_file.read_text(encoding='utf-8')
+        content = read_source(dart_file)
         
         # 移除注释和字符串，避免误判
         lines = content.split('\n')
@@ -164,70 +241,85 @@ def is_enum_file(dart_file: Path) -> bool:
 
 
 def find_dart_files(config: dict) -> List[Path]:
-    """查找 Dart 文件（排除 enum 文件）"""
-    dart_files = []
+    """查找 Dart 文件（递归，排除生成文件与 enum 文件）
     
-    if 'dart_dir' in config:
-        # 单个目录
-        dart_dir = config['dart_dir']
-        if dart_dir.exists():
-            pattern = config.get('pattern', '*.dart')
-            # 排除生成的文件和 enum 文件
-            for f in dart_dir.glob(pattern):
-                if not f.name.endswith('.g.dart') and not f.name.endswith('.freezed.dart'):
-                    # ✅ 新增：跳过 enum 文件
-                    if not is_enum_file(f):
-                        dart_files.append(f)
-                    else:
-                        thread_safe_print(f"  ⏭️  跳过 enum 文件: {f.name}")
-    
-    elif 'dart_dirs' in config:
-        # 多个目录
-        for dart_dir in config['dart_dirs']:
-            if dart_dir.exists():
-                pattern = config.get('pattern', '*.dart')
-                for f in dart_dir.glob(pattern):
-                    if not f.name.endswith('.g.dart') and not f.name.endswith('.freezed.dart'):
-                        # ✅ 新增：跳过 enum 文件
-                        if not is_enum_file(f):
-                            dart_files.append(f)
-                        else:
-                            thread_safe_print(f"  ⏭️  跳过 enum 文件: {f.name}")
+    基于 source_index 对 lib/ 的一次遍历，文件内容读取一次后由 enum 过滤与分析器共享。
+    """
+    dirs = [config['dart_dir']] if 'dart_dir' in config else config.get('dart_dirs', [])
+    pattern = config.get('pattern', '*.dart')
+    
+    dart_files = []
+    seen: Dict[str, Path] = {}
+    for f in files_under([d for d in dirs if d.exists()], pattern):
+        if is_enum_file(f):
+            thread_safe_print(f"  ⏭️  跳过 enum 文件: {f.name}")
+            continue
+        # 文档按文件名平铺在类别目录下，子目录中的同名文件会互相覆盖
+        if f.stem in seen:
+            thread_safe_print(f"  ⚠️  文件名重复，跳过: {f.relative_to(ROOT)}（已有 {seen[f.stem].relative_to(ROOT)}）")
+            continue
+        seen[f.stem] = f
+        dart_files.append(f)
     
     return dart_files
 
 
-def generate_yaml_file(dart_file: Path, output_yaml: Path, doc_type: str) -> Tuple[bool, str]:
-    """生成单个 YAML 文件（复用 yaml_generator.py 的逻辑）"""
+def category_for(dart_file: Path) -> Optional[Tuple[str, dict]]:
+    """源文件所属的类别 (category, config)，不属于任何类别时返回 None"""
+    dart_file = dart_file.resolve()
+    for category, config in TYPE_MAPPINGS.items():
+        dirs = [config['dart_dir']] if 'dart_dir' in config else config.get('dart_dirs', [])
+        if not fnmatch(dart_file.name, config.get('pattern', '*.dart')):
+            continue
+        if any(d.resolve() in dart_file.parents for d in dirs):
+            return category, config
+    return None
+
+
+def generate_yaml_file(dart_file: Path, output_yaml: Path, doc_type: str,
+                       previous_yaml: Optional[Path] = None) -> Tuple[bool, str, Optional[dict], Optional[str]]:
+    """生成单个 YAML 文件（复用 yaml_generator.py 的逻辑）
+
+    Args:
+        previous_yaml: 上一版文档（用于沿用 created_date / last_updated），默认即 output_yaml
+
+    Returns:
+        (success, message, doc, status): doc 为生成的文档，status 为 created/updated/unchanged（失败时均为 None）
+    """
     try:
         template_dir = ROOT / 'documents' / 'templates'
         
         # 直接调用 yaml_generator 的函数（复用代码）
         doc = generate_yaml(dart_file, doc_type, template_dir, output_yaml)
         
-        # 确保输出目录存在
-        output_yaml.parent.mkdir(parents=True, exist_ok=True)
-        
-        # 写入 YAML
-        with output_yaml.open('w', encoding='utf-8') as f:
-            yaml.safe_dump(doc, f, allow_unicode=True, sort_keys=False)
+        # 写入 YAML（内容未变化时保持日期并跳过写入）
+        status = write_yaml_if_changed(output_yaml, doc, previous_yaml)
         
-        return True, f"生成成功: {doc['meta']['name']}"
+        return True, f"生成成功: {doc['meta']['name']}", doc, status
     except Exception as e:
-        return False, str(e)
+        return False, str(e), None, None
 
 
-def process_category(category: str, config: dict, dry_run: bool = False) -> dict:
-    """处理单个类别"""
+def process_category(category: str, config: dict, dry_run: bool = False,
+                     output_root: Path = ARCH_DIR) -> dict:
+    """处理单个类别
+
+    Args:
+        output_root: 输出根目录（暂存目录），类别子目录名与 architecture 下一致
+    """
     stats = {
         'category': category,
         'found': 0,
         'generated': 0,
+        'unchanged': 0,
+        'removed': 0,
         'failed': 0,
         'errors': [],
+        'perf_lints': {},
+        'written': [],
     }
     
-    yaml_dir = config['yaml_dir']
+    yaml_dir = output_root / config['yaml_dir'].name
     doc_type = config['type']
     
     # 查找 Dart 文件
@@ -236,6 +328,8 @@ def process_category(category: str, config: dict, dry_run: bool = False) -> dict
     
     if not dart_files:
         print(f"  ⚠️  未找到 {category} 的 Dart 文件")
+        if not dry_run:
+            stats['removed'] = len(remove_orphans(yaml_dir, set()))
         return stats
     
     print(f"  找到 {len(dart_files)} 个 {category} 文件")
@@ -245,7 +339,7 @@ def process_category(category: str, config: dict, dry_run: bool = False) -> dict
             print(f"    - {dart_file.name}")
         return stats
     
-    # 创建目录（architecture 目录已经被重命名，这里是全新的）
+    # 暂存目录中已有上一版文档的副本，内容未变化的文档不会重写
     yaml_dir.mkdir(parents=True, exist_ok=True)
     
     # 定义单文件处理函数（供并发调用）
@@ -253,24 +347,42 @@ def process_category(category: str, config: dict, dry_run: bool = False) -> dict
         """处理单个文件（供并发调用）"""
         yaml_name = dart_file.stem + '.yaml'
         output_yaml = yaml_dir / yaml_name
-        success, message = generate_yaml_file(dart_file, output_yaml, doc_type)
-        return (dart_file.name, yaml_name, success, message)
+        with span('file', file=str(dart_file.relative_to(ROOT)), category=category) as span_args:
+            success, message, doc, status = generate_yaml_file(dart_file, output_yaml, doc_type)
+            span_args['status'] = status or 'failed'
+        return (dart_file, yaml_name, success, message, doc, status)
     
-    # 使用线程池并发处理（6 个工作线程）
-    with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
+    # 使用线程池并发处理；实际同时运行的 Dart 分析器数量由自适应限流器控制
+    with concurrent.futures.ThreadPoolExecutor(max_workers=analyzer_limiter().max_workers) as executor:
         futures = [executor.submit(process_single_file, df) for df in dart_files]
         
         for future in concurrent.futures.as_completed(futures):
-            dart_name, yaml_name, success, message = future.result()
+            dart_file, yaml_name, success, message, doc, status = future.result()
+            dart_name = dart_file.name
             
             if success:
                 stats['generated'] += 1
-                thread_safe_print(f"    ✅ {yaml_name}")
+                if status == 'unchanged':
+                    stats['unchanged'] += 1
+                else:
+                    # (相对 architecture 目录的路径, 文档)，换入后记入清单
+                    stats['written'].append((f'{yaml_dir.name}/{yaml_name}', doc))
+                definition = doc.get(f'{doc_type}_definition') or {}
+                if 'performance_lints' in definition:
+                    rel = str(dart_file.relative_to(ROOT))
+                    stats['perf_lints'][rel] = definition['performance_lints']
+                thread_safe_print(f"    {'➖' if status == 'unchanged' else '✅'} {yaml_name}")
             else:
                 stats['failed'] += 1
                 stats['errors'].append((dart_name, message))
                 thread_safe_print(f"    ❌ {yaml_name}: {message[:100]}")
     
+    # 源文件已删除的文档
+    removed = remove_orphans(yaml_dir, {dart_file.stem + '.yaml' for dart_file in dart_files})
+    for name in removed:
+        thread_safe_print(f"    🗑️  {name}（源文件已不存在）")
+    stats['removed'] = len(removed)
+    
     return stats
 
 
@@ -288,10 +400,40 @@ def main():
     parser.add_argument(
         '--no-backup',
         action='store_true',
-        help='不创建备份'
+        help='不保留旧目录快照'
+    )
+    parser.add_argument(
+        '--keep-snapshots',
+        type=int,
+        default=DEFAULT_KEEP_SNAPSHOTS,
+        help=f'保留最近几个快照（默认 {DEFAULT_KEEP_SNAPSHOTS}）'
+    )
+    
+    parser.add_argument(
+        '--max-analyzers',
+        type=int,
+        default=None,
+        help='同时运行的 Dart 分析器上限（默认 CPU 核数，实际并发按内存与负载自适应）'
+    )
+    parser.add_argument(
+        '--max-analyzer-memory',
+        type=parse_size,
+        default=None,
+        help='所有 Dart 分析器合计内存硬上限，如 4G（也可用环境变量 ANALYZER_MEMORY_LIMIT）'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const=str(PROFILE_TRACE),
+        default=None,
+        metavar='TRACE_JSON',
+        help=f'记录每个文件/阶段的耗时，写入 Chrome trace JSON（默认 {PROFILE_TRACE.relative_to(ROOT)}）并输出 p50/p95 汇总'
     )
     
     args = parser.parse_args()
+    limiter = configure_limiter(args.max_analyzers, args.max_analyzer_memory)
+    profiler = enable_profiling() if args.profile else None
     
     # 记录开始时间
     import time
@@ -314,45 +456,59 @@ def main():
     # 处理所有类别
     categories = list(TYPE_MAPPINGS.keys())
     
-    # 备份：重命名整个 architecture 目录
-    routers_backup = None
-    if not args.dry_run and not args.no_backup:
-        print("📦 备份 architecture 目录...")
-        backup_path, routers_backup = backup_architecture_dir()
-        if backup_path:
-            print(f"  ✅ 已重命名为: {backup_path.name}")
-            if routers_backup:
-                print(f"  ✅ routers.yaml 已保存（稍后恢复）\n")
-            else:
-                print()
-        else:
-            print()
+    # 暂存：复制当前目录，生成结果写入暂存目录
+    output_root = ARCH_DIR
+    if not args.dry_run:
+        print("📦 准备暂存目录...")
+        copied = prepare_staging()
+        output_root = STAGING_DIR
+        print(f"  ✅ 已复制 {copied} 个现有文件到 {STAGING_DIR.relative_to(ROOT)}\n")
     
     # 处理每个类别
     print("🔨 生成 YAML 文档...\n")
     all_stats = []
     
-    for category in categories:
-        print(f"处理 {category.upper()}:")
-        config = TYPE_MAPPINGS[category]
-        stats = process_category(category, config, args.dry_run)
-        all_stats.append(stats)
-        print()
+    try:
+        for category in categories:
+            print(f"处理 {category.upper()}:")
+            config = TYPE_MAPPINGS[category]
+            stats = process_category(category, config, args.dry_run, output_root)
+            all_stats.append(stats)
+            print()
+    except BaseException:
+        if not args.dry_run:
+            shutil.rmtree(STAGING_DIR, ignore_errors=True)
+        raise
     
-    # 恢复 routers.yaml（特殊保留）
-    if not args.dry_run and routers_backup and routers_backup.exists():
-        arch_dir = ROOT / 'documents/architecture'
-        routers_dest = arch_dir / 'routers.yaml'
-        shutil.copy2(routers_backup, routers_dest)
-        routers_backup.unlink()  # 删除临时文件
-        print("📋 已恢复 routers.yaml（作为路由地图保留）\n")
+    # 换入：全部成功才替换 architecture 目录，否则丢弃暂存结果
+    swapped = False
+    if not args.dry_run:
+        if any(stats['failed'] for stats in all_stats):
+            shutil.rmtree(STAGING_DIR, ignore_errors=True)
+            print("⚠️  存在生成失败的文档，已丢弃暂存结果，architecture 目录保持不变\n")
+        else:
+            snapshot = swap_in(snapshot_dir=None if args.no_backup else SNAPSHOT_DIR)
+            swapped = True
+            print("🔁 已换入新的 architecture 目录")
+            manifest = Manifest().load()
+            for stats in all_stats:
+                for rel, doc in stats['written']:
+                    manifest.record(ARCH_DIR / rel, doc)
+            manifest.refresh()
+            manifest.save()
+            print(f"  📇 已更新汇总清单：{len(manifest.entries)} 个文档")
+            if snapshot:
+                print(f"  ✅ 旧目录快照: {snapshot.relative_to(ROOT)}")
+                for removed in prune_snapshots(args.keep_snapshots):
+                    print(f"  🗑️  清理过期快照: {removed.name}")
+            print()
     
     # 运行 Linter
-    if not args.dry_run:
+    if swapped:
         print("🔍 运行架构 Linter...")
         try:
             result = subprocess.run(
-                ['python3', str(ROOT / 'scripts/architecture_linter.py')],
+                [sys.executable, str(SCRIPTS_DIR / 'architecture_linter.py')],
                 capture_output=True,
                 text=True,
                 timeout=60
@@ -372,13 +528,37 @@ def main():
     total_found = sum(s['found'] for s in all_stats)
     total_generated = sum(s['generated'] for s in all_stats)
     total_failed = sum(s['failed'] for s in all_stats)
+    total_unchanged = sum(s['unchanged'] for s in all_stats)
+    total_removed = sum(s['removed'] for s in all_stats)
     
     for stats in all_stats:
         cat = stats['category']
-        print(f"{cat:15} | 找到: {stats['found']:3} | 生成: {stats['generated']:3} | 失败: {stats['failed']:3}")
+        print(f"{cat:15} | 找到: {stats['found']:3} | 生成: {stats['generated']:3} | "
+              f"未变化: {stats['unchanged']:3} | 失败: {stats['failed']:3}")
     
     print("-" * 60)
-    print(f"{'总计':15} | 找到: {total_found:3} | 生成: {total_generated:3} | 失败: {total_failed:3}")
+    print(f"{'总计':15} | 找到: {total_found:3} | 生成: {total_generated:3} | "
+          f"未变化: {total_unchanged:3} | 失败: {total_failed:3}")
+    if total_removed:
+        print(f"已删除源文件不存在的文档: {total_removed} 个")
+    
+    if limiter.stats['runs']:
+        usage = limiter.summary()
+        print(f"\n分析器并发: 峰值 {usage['peak_in_flight']} / 上限 {usage['max_workers']}，"
+              f"单进程约 {usage['process_rss_mb']} MB，排队等待 {usage['wait_seconds']:.1f}s")
+    
+    if profiler is not None:
+        trace_path = profiler.write_chrome_trace(Path(args.profile))
+        print(f"\n⏱️  分阶段耗时（Chrome trace: {trace_path}）:")
+        print_stage_summary(profiler.stage_summary())
+    
+    # 性能检查汇总（widgets + pages）
+    perf_lints: Dict[str, List[dict]] = {}
+    for stats in all_stats:
+        perf_lints.update(stats['perf_lints'])
+    if perf_lints:
+        print()
+        print_summary(summarize(perf_lints))
     
     if total_failed > 0:
         print("\n❌ 失败详情:")
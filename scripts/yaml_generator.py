@@ -14,37 +14,188 @@ Dart 文件分析器：自动生成 architecture YAML 文档
 2. 降级到正则表达式分析（如果 Dart 分析器不可用）
 3. 支持合并模式，保留人工维护的字段
 """
+import copy
+import os
+import queue
 import sys
 import re
+import threading
+import time
 import yaml
 import json
 import subprocess
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Set, Optional
+from typing import Dict, Iterable, List, Set, Optional
 
-ROOT = Path(__file__).resolve().parents[1]
+from adaptive_concurrency import analyzer_limiter
+from architecture_manifest import Manifest
+from pipeline_profiler import profiler, span
+from source_index import read_source
 
+# 项目根目录（GRANOFLOW_ROOT 可覆盖，用于基准测试的合成语料）
+ROOT = Path(os.environ.get('GRANOFLOW_ROOT') or Path(__file__).resolve().parents[1]).resolve()
 
-def call_dart_analyzer(dart_file: Path) -> Optional[Dict]:
-    """调用 Dart 分析器获取精确信息"""
-    tools_dir = ROOT / 'tools'
-    analyzer = tools_dir / 'dart_analyzer.dart'
+
+TOOLS_DIR = Path(__file__).resolve().parents[1] / 'tools'
+DART_ANALYZER = TOOLS_DIR / 'dart_analyzer.dart'
+
+
+def dart_analyzer_available() -> bool:
+    """设置 GRANOFLOW_NO_DART=1 或分析器脚本不存在时走正则降级"""
+    return not os.environ.get('GRANOFLOW_NO_DART') and DART_ANALYZER.exists()
+
+
+class DartAnalyzerProcess:
+    """常驻的 dart_analyzer.dart --stdin 进程
+    
+    VM 启动与分析上下文创建只发生一次：逐行写入文件路径，逐行读取 JSON 结果。
+    请求串行执行；进程退出、超时或分析失败时返回 None（调用方降级为正则），下次请求时重新启动。
+    """
+    
+    def __init__(self, root: Path = ROOT / 'lib', timeout: float = 120):
+        self.root = root
+        self.timeout = timeout
+        self._process: Optional[subprocess.Popen] = None
+        self._lines: Optional[queue.Queue] = None
+        self._lock = threading.Lock()
+    
+    def covers(self, dart_file: Path) -> bool:
+        return self.root in dart_file.absolute().parents
+    
+    @staticmethod
+    def _read(process: subprocess.Popen, lines: queue.Queue):
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)
+    
+    def _ensure_started(self):
+        if self._process is not None and self._process.poll() is None:
+            return
+        self._process = subprocess.Popen(
+            ['dart', 'run', str(DART_ANALYZER), '--stdin', str(self.root)],
+            cwd=str(TOOLS_DIR), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True, bufsize=1,
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read, args=(self._process, self._lines), daemon=True).start()
+    
+    def analyze(self, dart_file: Path) -> Optional[Dict]:
+        request = str(dart_file.absolute())
+        with self._lock:
+            try:
+                self._ensure_started()
+                with span('dart_analyzer', file=dart_file.name):
+                    self._process.stdin.write(request + '\n')
+                    self._process.stdin.flush()
+                    while True:
+                        line = self._lines.get(timeout=self.timeout)
+                        if line is None:
+                            raise EOFError('分析进程已退出')
+                        data = json.loads(line)
+                        # 超时后迟到的上一个结果直接丢弃
+                        if data.get('file') == request:
+                            break
+            except (OSError, EOFError, ValueError, queue.Empty) as e:
+                print(f"[yaml_generator] 常驻 Dart 分析器失败，下次请求时重启: {str(e) or '超时'}", file=sys.stderr)
+                self._stop()
+                return None
+        if 'error' in data:
+            print(f"[yaml_generator] Dart 分析器警告: {data['error']}", file=sys.stderr)
+            return None
+        return data
+    
+    def changed(self, paths: Iterable[Path]):
+        """通知文件已变化（依赖它们的文件下次分析时重新解析）"""
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                return
+            try:
+                for path in paths:
+                    self._process.stdin.write(f'changed:{path.absolute()}\n')
+                self._process.stdin.flush()
+            except OSError:
+                self._stop()
+    
+    def _stop(self):
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+    
+    def close(self):
+        with self._lock:
+            self._stop()
+
+
+# 已启用的常驻分析器（监听模式）；为 None 时每个文件一次 dart run
+_PERSISTENT_ANALYZER: Optional[DartAnalyzerProcess] = None
+
+
+def use_persistent_analyzer(analyzer: Optional[DartAnalyzerProcess]):
+    """让 call_dart_analyzer 经由常驻进程分析 root 下的文件"""
+    global _PERSISTENT_ANALYZER
+    _PERSISTENT_ANALYZER = analyzer
+
+
+def analyze_batch(dart_files: List[Path]) -> Dict[Path, Optional[Dict]]:
+    """一次分析多个文件（整个 lib/ 扫描等）
     
-    if not analyzer.exists():
+    优先使用已启用的常驻分析器，否则临时启动一个 --stdin 进程依次分析，
+    只有一次 VM 启动，依赖解析结果在文件之间共享。不可用时全部返回 None。
+    """
+    if not dart_files or not dart_analyzer_available():
+        return {f: None for f in dart_files}
+    analyzer = _PERSISTENT_ANALYZER
+    if analyzer is not None:
+        return {f: analyzer.analyze(f) if analyzer.covers(f) else call_dart_analyzer(f) for f in dart_files}
+    
+    analyzer = DartAnalyzerProcess()
+    limiter = analyzer_limiter()
+    with span('analyzer_wait'):
+        token = limiter.acquire()
+    try:
+        return {f: analyzer.analyze(f) if analyzer.covers(f) else None for f in dart_files}
+    finally:
+        analyzer.close()
+        limiter.release(token)
+
+
+def call_dart_analyzer(dart_file: Path) -> Optional[Dict]:
+    """调用 Dart 分析器获取精确信息（设置 GRANOFLOW_NO_DART=1 时直接走正则降级）"""
+    if not dart_analyzer_available():
         # 降级到正则表达式分析
         return None
+    if _PERSISTENT_ANALYZER is not None and _PERSISTENT_ANALYZER.covers(dart_file):
+        return _PERSISTENT_ANALYZER.analyze(dart_file)
     
     try:
-        result = subprocess.run(
-            ['dart', 'run', str(analyzer), str(dart_file.absolute())],
-            cwd=str(tools_dir),
-            capture_output=True,
-            text=True,
-            timeout=60  # 增加到 60 秒，适应并发环境
-        )
+        # 同时运行的分析器数量由自适应限流器按内存/负载控制
+        limiter = analyzer_limiter()
+        with span('analyzer_wait'):
+            token = limiter.acquire()
+        try:
+            with span('dart_analyzer', file=dart_file.name) as span_args:
+                started = time.perf_counter()
+                result = subprocess.run(
+                    ['dart', 'run', str(DART_ANALYZER), str(dart_file.absolute())],
+                    cwd=str(TOOLS_DIR),
+                    capture_output=True,
+                    text=True,
+                    timeout=60
+                )
+                span_args['returncode'] = result.returncode
+        finally:
+            limiter.release(token)
         if result.returncode == 0:
-            return json.loads(result.stdout)
+            data = json.loads(result.stdout)
+            _record_analyzer_phases(started, time.perf_counter() - started, data.get('analysis_ms'))
+            return data
         else:
             print(f"[yaml_generator] Dart 分析器警告: {result.stderr}", file=sys.stderr)
             return None
@@ -59,6 +210,16 @@ def call_dart_analyzer(dart_file: Path) -> Optional[Dict]:
         return None
 
 
+def _record_analyzer_phases(started: float, elapsed: float, analysis_ms: Optional[int]):
+    """剖析模式下把一次分析器调用拆分为 VM 启动与 AST 分析两段（analysis_ms 由 dart_analyzer.dart 输出）"""
+    active = profiler()
+    if active is None or analysis_ms is None:
+        return
+    analysis = min(analysis_ms / 1000.0, elapsed)
+    active.add('dart_vm_startup', started, elapsed - analysis)
+    active.add('dart_analysis', started + elapsed - analysis, analysis)
+
+
 def _extract_doc_text(doc_comment: Optional[str]) -> str:
     """清理文档注释"""
     if not doc_comment:
@@ -113,7 +274,8 @@ def merge_yaml_data(existing: Dict, new_data: Dict, auto_fields: List[str]) -> D
 class DartAnalyzer:
     def __init__(self, dart_file: Path):
         self.dart_file = dart_file
-        self.content = dart_file.read_text(encoding='utf-8')
+        with span('read_source'):
+            self.content = read_source(dart_file)
         self.lines = self.content.split('\n')
         
     def extract_class_name(self) -> Optional[str]:
@@ -279,6 +441,25 @@ class DartAnalyzer:
             return str(self.dart_file)
 
 
+# 已解析的模板（按路径与 mtime 缓存，模板修改后自动重新加载）
+_TEMPLATE_CACHE: Dict[Path, tuple] = {}
+_template_lock = threading.Lock()
+
+
+def load_template(template_path: Path) -> Dict:
+    """加载文档模板（返回副本，调用方可直接修改）"""
+    with span('template_load', template=template_path.name):
+        mtime = template_path.stat().st_mtime_ns
+        with _template_lock:
+            cached = _TEMPLATE_CACHE.get(template_path)
+        if cached is None or cached[0] != mtime:
+            with template_path.open('r', encoding='utf-8') as f:
+                cached = (mtime, yaml.safe_load(f))
+            with _template_lock:
+                _TEMPLATE_CACHE[template_path] = cached
+        return copy.deepcopy(cached[1])
+
+
 def generate_widget_yaml(dart_file: Path, analyzer: DartAnalyzer, template_path: Path, dart_data: Optional[Dict] = None) -> Dict:
     """生成 Widget YAML
     
@@ -289,8 +470,7 @@ def generate_widget_yaml(dart_file: Path, analyzer: DartAnalyzer, template_path:
         dart_data: Dart AST 分析器数据（优先使用）
     """
     # 加载模板
-    with template_path.open('r', encoding='utf-8') as f:
-        doc = yaml.safe_load(f)
+    doc = load_template(template_path)
     
     # 优先使用 Dart 分析器数据
     if dart_data:
@@ -320,6 +500,9 @@ def generate_widget_yaml(dart_file: Path, analyzer: DartAnalyzer, template_path:
     # 清理 reusable 占位符
     if 'reusable' in doc['widget_definition'] and '|' in str(doc['widget_definition']['reusable']):
         doc['widget_definition']['reusable'] = True
+    # 性能检查：记录常见的重建开销
+    from widget_perf_lint import collect_lints
+    doc['widget_definition']['performance_lints'] = collect_lints(analyzer.content, dart_data)
     
     # 填充 source_of_truth
     doc['source_of_truth'] = analyzer.get_relative_path()
@@ -379,8 +562,7 @@ def generate_page_yaml(analyzer: DartAnalyzer, template_path: Path, dart_data: O
         template_path: 模板路径
         dart_data: Dart 分析器提供的精确数据（优先使用）
     """
-    with template_path.open('r', encoding='utf-8') as f:
-        doc = yaml.safe_load(f)
+    doc = load_template(template_path)
     
     # 优先使用 Dart 分析器数据
     class_name = dart_data.get('class_name') if dart_data else analyzer.extract_class_name()
@@ -394,6 +576,12 @@ def generate_page_yaml(analyzer: DartAnalyzer, template_path: Path, dart_data: O
     
     doc['source_of_truth'] = analyzer.get_relative_path()
     
+    # 性能检查：记录常见的重建开销
+    from widget_perf_lint import collect_lints
+    if 'page_definition' not in doc:
+        doc['page_definition'] = {}
+    doc['page_definition']['performance_lints'] = collect_lints(analyzer.content, dart_data)
+    
     # 优先使用 Dart 分析器的精确数据
     if dart_data:
         raw_calls = dart_data.get('calls', [])
@@ -409,6 +597,43 @@ def generate_page_yaml(analyzer: DartAnalyzer, template_path: Path, dart_data: O
     return doc
 
 
+def generate_generic_yaml(analyzer: DartAnalyzer, doc_type: str, template_path: Path, dart_data: Optional[Dict] = None) -> Dict:
+    """生成 model/provider/repository/service 等通用类型的 YAML"""
+    new_doc = load_template(template_path)
+    
+    class_name = dart_data.get('class_name') if dart_data else analyzer.extract_class_name()
+    new_doc['meta']['name'] = class_name or 'Unknown'
+    new_doc['meta']['file_path'] = analyzer.get_relative_path()
+    new_doc['meta']['created_date'] = datetime.now().strftime('%y%m%d')
+    new_doc['meta']['last_updated'] = datetime.now().strftime('%y%m%d')
+    new_doc['source_of_truth'] = analyzer.get_relative_path()
+    
+    if dart_data:
+        # 规范化 calls 路径
+        raw_calls = dart_data.get('calls', [])
+        new_doc['calls'] = [analyzer._normalize_import_path(c) for c in raw_calls]
+        new_doc['i18n_keys'] = dart_data.get('i18n_keys', [])
+        new_doc['design_tokens'] = dart_data.get('design_tokens', [])
+    else:
+        new_doc['calls'] = analyzer.extract_calls()
+    
+    # Repository：交叉比对 Isar 查询与索引，记录潜在慢查询
+    if doc_type == 'repository':
+        from isar_query_analyzer import build_query_report
+        with span('isar_query_analysis'):
+            new_doc['isar_query_analysis'] = build_query_report(analyzer.content, dart_data)
+    
+    # Provider：依赖图与重建扇出（需扫描整个 lib/，进程内缓存）
+    if doc_type == 'provider':
+        from provider_graph import load_graph, file_section
+        with span('provider_graph'):
+            new_doc['provider_graph'] = file_section(
+                load_graph(use_dart=dart_data is not None), analyzer.get_relative_path()
+            )
+    
+    return new_doc
+
+
 def generate_yaml(dart_file: Path, doc_type: str, template_dir: Path, output_yaml: Optional[Path] = None) -> Dict:
     """生成 YAML 文档
     
@@ -429,36 +654,73 @@ def generate_yaml(dart_file: Path, doc_type: str, template_dir: Path, output_yam
         raise FileNotFoundError(f'模板不存在: {template_path}')
     
     # 3. 生成新数据
-    if doc_type == 'widget':
-        new_doc = generate_widget_yaml(dart_file, analyzer, template_path, dart_data)
-    elif doc_type == 'page':
-        new_doc = generate_page_yaml(analyzer, template_path, dart_data)
-    else:
-        # 其他类型使用通用处理
-        with template_path.open('r', encoding='utf-8') as f:
-            new_doc = yaml.safe_load(f)
-        
-        class_name = dart_data.get('class_name') if dart_data else analyzer.extract_class_name()
-        new_doc['meta']['name'] = class_name or 'Unknown'
-        new_doc['meta']['file_path'] = analyzer.get_relative_path()
-        new_doc['meta']['created_date'] = datetime.now().strftime('%y%m%d')
-        new_doc['meta']['last_updated'] = datetime.now().strftime('%y%m%d')
-        new_doc['source_of_truth'] = analyzer.get_relative_path()
-        
-        if dart_data:
-            # 规范化 calls 路径
-            raw_calls = dart_data.get('calls', [])
-            new_doc['calls'] = [analyzer._normalize_import_path(c) for c in raw_calls]
-            new_doc['i18n_keys'] = dart_data.get('i18n_keys', [])
-            new_doc['design_tokens'] = dart_data.get('design_tokens', [])
+    with span('build_doc', type=doc_type, path='analyzer' if dart_data else 'fallback'):
+        if doc_type == 'widget':
+            new_doc = generate_widget_yaml(dart_file, analyzer, template_path, dart_data)
+        elif doc_type == 'page':
+            new_doc = generate_page_yaml(analyzer, template_path, dart_data)
         else:
-            new_doc['calls'] = analyzer.extract_calls()
+            # 其他类型使用通用处理
+            new_doc = generate_generic_yaml(analyzer, doc_type, template_path, dart_data)
     
     # 4. 直接返回新生成的数据，不合并旧数据
     # 原因：重新生成时应该完全替换，确保数据质量
     return new_doc
 
 
+def _without_dates(doc: Dict) -> Dict:
+    meta = {k: v for k, v in (doc.get('meta') or {}).items() if k not in ('created_date', 'last_updated')}
+    return dict(doc, meta=meta)
+
+
+def write_yaml_if_changed(output_yaml: Path, doc: Dict, previous_yaml: Optional[Path] = None) -> str:
+    """写入 YAML，保持日期稳定，内容未变化时不写文件
+    
+    - created_date 沿用已有文档的值
+    - 除日期外内容与已有文档相同时，last_updated 也沿用已有值
+    - 序列化结果与目标文件完全相同时跳过写入（不改变 mtime，不触发下游 hook）
+    
+    Args:
+        output_yaml: 输出文件路径
+        doc: 新生成的文档（meta 日期会被就地调整）
+        previous_yaml: 已有文档的位置（默认即 output_yaml）
+    
+    Returns:
+        'created' / 'updated' / 'unchanged'
+    """
+    source = previous_yaml or output_yaml
+    old_text = None
+    old_doc = None
+    if source.exists():
+        try:
+            old_text = source.read_text(encoding='utf-8')
+            old_doc = yaml.safe_load(old_text)
+        except (OSError, yaml.YAMLError):
+            old_doc = None
+    
+    if isinstance(old_doc, dict) and isinstance(old_doc.get('meta'), dict) and isinstance(doc.get('meta'), dict):
+        old_meta = old_doc['meta']
+        if old_meta.get('created_date'):
+            doc['meta']['created_date'] = old_meta['created_date']
+        if old_meta.get('last_updated') and _without_dates(old_doc) == _without_dates(doc):
+            doc['meta']['last_updated'] = old_meta['last_updated']
+    
+    with span('yaml_dump'):
+        text = yaml.safe_dump(doc, allow_unicode=True, sort_keys=False)
+    if text == old_text and output_yaml.exists():
+        return 'unchanged'
+    
+    # 先写临时文件再替换：中途失败或并发读取时不会看到写了一半的文件
+    with span('write'):
+        output_yaml.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = output_yaml.with_name(f'.{output_yaml.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp_path.write_text(text, encoding='utf-8')
+        os.replace(tmp_path, output_yaml)
+    if old_text is None:
+        return 'created'
+    return 'unchanged' if text == old_text else 'updated'
+
+
 def main():
     if len(sys.argv) < 4:
         print('Usage: yaml_generator.py <dart_file> <output_yaml> <type>')
@@ -478,14 +740,17 @@ def main():
         # 传递 output_yaml 以支持合并模式
         doc = generate_yaml(dart_file, doc_type, template_dir, output_yaml)
         
-        # 确保输出目录存在
-        output_yaml.parent.mkdir(parents=True, exist_ok=True)
-        
-        # 写入 YAML
-        with output_yaml.open('w', encoding='utf-8') as f:
-            yaml.safe_dump(doc, f, allow_unicode=True, sort_keys=False)
+        # 写入 YAML（内容未变化时跳过）
+        status = write_yaml_if_changed(output_yaml, doc)
         
-        print(f'[yaml_generator] 已生成: {output_yaml}')
+        if status == 'unchanged':
+            print(f'[yaml_generator] 内容未变化，跳过写入: {output_yaml}')
+        else:
+            print(f'[yaml_generator] 已生成: {output_yaml}')
+            # 只更新清单（语料快照较大，其中该文档按哈希判定过期，读取时重新解析）
+            manifest = Manifest(snapshot=False).load()
+            manifest.record(output_yaml, doc)
+            manifest.save()
         print(f'[yaml_generator] 类名: {doc["meta"]["name"]}')
         print(f'[yaml_generator] i18n 键: {len(doc.get("i18n_keys", []))} 个')
         print(f'[yaml_generator] 设计令牌: {len(doc.get("design_tokens", []))} 个')
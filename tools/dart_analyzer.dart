@@ -1,17 +1,25 @@
 import 'dart:convert';
 import 'dart:io';
+import 'package:analyzer/dart/analysis/analysis_context.dart';
 import 'package:analyzer/dart/analysis/analysis_context_collection.dart';
 import 'package:analyzer/dart/analysis/results.dart';
 import 'package:analyzer/dart/ast/ast.dart';
 import 'package:analyzer/dart/ast/visitor.dart';
+import 'package:analyzer/dart/element/element.dart';
 import 'package:path/path.dart' as path;
 
 void main(List<String> args) async {
   if (args.isEmpty) {
     stderr.writeln('Usage: dart run dart_analyzer.dart <file_path>');
+    stderr.writeln('       dart run dart_analyzer.dart --stdin <root_dir>');
     exit(1);
   }
 
+  if (args[0] == '--stdin') {
+    await serveStdin(args.length > 1 ? args[1] : Directory.current.path);
+    return;
+  }
+
   final filePath = args[0];
   final file = File(filePath);
 
@@ -23,7 +31,10 @@ void main(List<String> args) async {
   try {
     // 规范化为绝对路径
     final absolutePath = path.normalize(file.absolute.path);
+    // 分析耗时（不含 VM 启动），供 yaml_create_all --profile 拆分阶段
+    final stopwatch = Stopwatch()..start();
     final analysis = await analyzeDartFile(absolutePath);
+    analysis['analysis_ms'] = stopwatch.elapsedMilliseconds;
     print(jsonEncode(analysis));
   } catch (e, stackTrace) {
     stderr.writeln('Analysis error: $e');
@@ -32,12 +43,58 @@ void main(List<String> args) async {
   }
 }
 
+/// 常驻模式：`dart run dart_analyzer.dart --stdin <root_dir>`
+///
+/// 每行读入一个文件路径，输出一行 JSON（附 file 字段；失败时为 {"file": ..., "error": ...}）。
+/// `changed:<path>` 行只通知该文件已变化，不输出。
+/// root_dir 下的文件共用一个分析上下文：VM 启动与依赖解析只发生一次，之后每个文件只需增量分析。
+Future<void> serveStdin(String root) async {
+  final collection = AnalysisContextCollection(
+    includedPaths: [path.normalize(Directory(root).absolute.path)],
+  );
+  final lines = stdin.transform(utf8.decoder).transform(const LineSplitter());
+  await for (final line in lines) {
+    final request = line.trim();
+    if (request.isEmpty) {
+      continue;
+    }
+    if (request.startsWith('changed:')) {
+      final changedPath = path.normalize(File(request.substring('changed:'.length)).absolute.path);
+      try {
+        collection.contextFor(changedPath).changeFile(changedPath);
+      } catch (_) {
+        // 不在 root_dir 下的文件与分析结果无关
+      }
+      continue;
+    }
+
+    final absolutePath = path.normalize(File(request).absolute.path);
+    final stopwatch = Stopwatch()..start();
+    Map<String, dynamic> response;
+    try {
+      final context = collection.contextFor(absolutePath);
+      // 同一文件可能被多次请求（监听模式），先丢弃上一次读入的内容
+      context.changeFile(absolutePath);
+      await context.applyPendingFileChanges();
+      response = await analyzeInContext(context, absolutePath);
+      response['analysis_ms'] = stopwatch.elapsedMilliseconds;
+    } catch (e) {
+      response = {'error': '$e'};
+    }
+    response['file'] = request;
+    stdout.writeln(jsonEncode(response));
+    await stdout.flush();
+  }
+}
+
 Future<Map<String, dynamic>> analyzeDartFile(String filePath) async {
   final collection = AnalysisContextCollection(
     includedPaths: [path.dirname(filePath)],
   );
+  return analyzeInContext(collection.contextFor(filePath), filePath);
+}
 
-  final context = collection.contextFor(filePath);
+Future<Map<String, dynamic>> analyzeInContext(AnalysisContext context, String filePath) async {
   final session = context.currentSession;
   final result = await session.getResolvedUnit(filePath);
 
@@ -62,6 +119,29 @@ class DartFileVisitor extends RecursiveAstVisitor<void> {
   Set<String> calls = {};
   Set<String> i18nKeys = {};
   Set<String> designTokens = {};
+  List<Map<String, dynamic>> isarCollections = [];
+  List<Map<String, dynamic>> isarQueries = [];
+  final Set<String> _isarBuilderVariables = {};
+  List<Map<String, dynamic>> performanceLints = [];
+  List<Map<String, dynamic>> providerDeclarations = [];
+  List<Map<String, dynamic>> providerUsages = [];
+
+  /// build 方法超过该行数即视为过大
+  static const _largeBuildMethodLines = 80;
+
+  /// AsyncValue 自身的 API：对其访问不构成 select 优化机会
+  static const _asyncValueMembers = {
+    'value', 'valueOrNull', 'isLoading', 'isRefreshing', 'isReloading',
+    'hasValue', 'hasError', 'error', 'stackTrace', 'asData', 'asError',
+    'when', 'maybeWhen', 'whenOrNull', 'whenData', 'map', 'maybeMap',
+    'requireValue', 'notifier',
+  };
+
+  static const _isarTerminalMethods = {
+    'findAll', 'findFirst', 'findAllSync', 'findFirstSync', 'count',
+    'countSync', 'deleteAll', 'deleteFirst', 'deleteAllSync', 'watch',
+    'watchLazy', 'exportJson', 'isEmpty', 'isNotEmpty',
+  };
 
   DartFileVisitor(this.filePath);
 
@@ -84,6 +164,11 @@ class DartFileVisitor extends RecursiveAstVisitor<void> {
       }
     }
 
+    // Isar 集合：记录字段与 @Index() 声明，供查询-索引交叉分析使用
+    if (node.metadata.any((m) => m.name.name == 'collection')) {
+      isarCollections.add(_collectIsarCollection(node));
+    }
+
     super.visitClassDeclaration(node);
   }
 
@@ -141,6 +226,21 @@ class DartFileVisitor extends RecursiveAstVisitor<void> {
       }
     }
 
+    if (node.name.lexeme == 'build') {
+      final lineInfo = (node.root as CompilationUnit).lineInfo;
+      final startLine = lineInfo.getLocation(node.body.offset).lineNumber;
+      final endLine = lineInfo.getLocation(node.body.end).lineNumber;
+      final lines = endLine - startLine + 1;
+      if (lines > _largeBuildMethodLines) {
+        _addPerformanceLint(
+          node,
+          'large_build_method',
+          'build 方法共 $lines 行（阈值 $_largeBuildMethodLines），'
+              '建议拆分为独立的 const 子组件以缩小重建范围',
+        );
+      }
+    }
+
     methods.add({
       'name': node.name.lexeme,
       'return_type': node.returnType?.toSource() ?? 'void',
@@ -194,9 +294,121 @@ class DartFileVisitor extends RecursiveAstVisitor<void> {
       }
     }
 
+    // provider 使用：组件/页面中的 ref.watch/listen/read（provider 声明内部的调用单独记录）
+    if (node.target is SimpleIdentifier &&
+        (node.target as SimpleIdentifier).name == 'ref' &&
+        _RefCallCollector.kinds.contains(methodName) &&
+        node.argumentList.arguments.isNotEmpty &&
+        node.thisOrAncestorOfType<TopLevelVariableDeclaration>() == null) {
+      final provider = _RefCallCollector.providerName(
+        node.argumentList.arguments.first,
+      );
+      if (provider != null) {
+        final lineInfo = (node.root as CompilationUnit).lineInfo;
+        providerUsages.add({
+          'provider': provider,
+          'kind': methodName,
+          'class': node.thisOrAncestorOfType<ClassDeclaration>()?.name.lexeme,
+          'line': lineInfo.getLocation(node.offset).lineNumber,
+        });
+      }
+    }
+
+    // 性能检查：ref.watch 整个 provider，而实际只用到少数字段
+    if (node.target is SimpleIdentifier &&
+        (node.target as SimpleIdentifier).name == 'ref' &&
+        methodName == 'watch' &&
+        node.argumentList.arguments.length == 1) {
+      _checkWatchWithoutSelect(node);
+    }
+
+    // 检测 Isar 查询链：_isar.xxxEntitys.filter()/where()...findAll()
+    // 只处理最外层调用，避免同一条链被重复记录
+    if (!_isChainSegment(node)) {
+      final query = _extractIsarQuery(node);
+      if (query != null) {
+        isarQueries.add(query);
+      }
+    }
+
     super.visitMethodInvocation(node);
   }
 
+  /// StateNotifierProvider<FooNotifier, FooState> 等：第一个类型参数即 Notifier 类
+  String? _notifierClass(String source, String providerType) {
+    if (!providerType.contains('Notifier')) return null;
+    final match = RegExp(r'^(?:[A-Z]\w*)?Provider(?:\.\w+)*\s*<\s*(\w+)')
+        .firstMatch(source);
+    return match?.group(1);
+  }
+
+  @override
+  void visitTopLevelVariableDeclaration(TopLevelVariableDeclaration node) {
+    // Riverpod provider 声明：final xxxProvider = StreamProvider.family<...>((ref) {...})
+    for (final variable in node.variables.variables) {
+      final initializer = variable.initializer;
+      if (initializer == null) continue;
+      final match = RegExp(r'^((?:[A-Z]\w*)?Provider)((?:\.\w+)*)')
+          .firstMatch(initializer.toSource());
+      if (match == null) continue;
+
+      final collector = _RefCallCollector();
+      initializer.accept(collector);
+      final lineInfo = (node.root as CompilationUnit).lineInfo;
+      providerDeclarations.add({
+        'name': variable.name.lexeme,
+        'type': match.group(1),
+        'modifiers': match
+            .group(2)!
+            .split('.')
+            .where((m) => m.isNotEmpty)
+            .toList(),
+        'notifier': _notifierClass(initializer.toSource(), match.group(1)!),
+        'line': lineInfo.getLocation(variable.offset).lineNumber,
+        'watches': collector.calls['watch']!.toList(),
+        'listens': collector.calls['listen']!.toList(),
+        'reads': collector.calls['read']!.toList(),
+      });
+    }
+    super.visitTopLevelVariableDeclaration(node);
+  }
+
+  @override
+  void visitInstanceCreationExpression(InstanceCreationExpression node) {
+    final typeName = node.constructorName.type.name2.lexeme;
+
+    // 性能检查：可以是 const 却没有声明 const 的构造调用
+    if (!node.isConst &&
+        node.keyword == null &&
+        node.constructorName.staticElement?.isConst == true &&
+        node.argumentList.arguments.every(_isConstantExpression)) {
+      _addPerformanceLint(
+        node,
+        'prefer_const_constructor',
+        '$typeName(...) 的参数均为常量，添加 const 可在重建时复用实例',
+      );
+    }
+
+    // 性能检查：ListView/GridView(children:) 传入动态列表，应改用 .builder 懒加载
+    if ((typeName == 'ListView' || typeName == 'GridView') &&
+        node.constructorName.name == null) {
+      for (final argument in node.argumentList.arguments) {
+        if (argument is NamedExpression &&
+            argument.name.label.name == 'children' &&
+            _isDynamicList(argument.expression)) {
+          _addPerformanceLint(
+            node,
+            'list_view_without_builder',
+            '$typeName(children:) 使用动态生成的列表，会一次性构建全部子项，'
+                '建议改用 $typeName.builder',
+          );
+        }
+      }
+    }
+
+    super.visitInstanceCreationExpression(node);
+  }
+
   @override
   void visitPrefixedIdentifier(PrefixedIdentifier node) {
     // 检测设计令牌：OceanBreezeColorSchemes.someColor
@@ -218,6 +430,187 @@ class DartFileVisitor extends RecursiveAstVisitor<void> {
     super.visitPropertyAccess(node);
   }
 
+  Map<String, dynamic> _collectIsarCollection(ClassDeclaration node) {
+    final fields = <String>[];
+    final indexes = <String>[];
+    for (final member in node.members) {
+      if (member is! FieldDeclaration || member.isStatic) continue;
+      final indexed = member.metadata.any((m) => m.name.name == 'Index');
+      for (final variable in member.fields.variables) {
+        final name = variable.name.lexeme;
+        fields.add(name);
+        // Id 字段始终是主键索引
+        if (indexed || member.fields.type?.toSource() == 'Id') {
+          indexes.add(name);
+        }
+      }
+    }
+    return {
+      'class_name': node.name.lexeme,
+      'fields': fields,
+      'indexes': indexes,
+    };
+  }
+
+  /// 当前调用是否只是更长调用链中的一环（例如 `.filter()` 之后还有 `.findAll()`）
+  bool _isChainSegment(MethodInvocation node) {
+    final parent = node.parent;
+    if (parent is MethodInvocation && parent.target == node) return true;
+    if (parent is PropertyAccess && parent.target == node) return true;
+    return false;
+  }
+
+  Map<String, dynamic>? _extractIsarQuery(MethodInvocation node) {
+    final chain = <String>[];
+    Expression? current = node;
+    while (current is MethodInvocation) {
+      chain.insert(0, current.methodName.name);
+      current = current.target;
+    }
+
+    String? accessor;
+    String? variable;
+    if (current is PrefixedIdentifier) {
+      accessor = current.identifier.name;
+    } else if (current is PropertyAccess) {
+      accessor = current.propertyName.name;
+    } else if (current is SimpleIdentifier) {
+      variable = current.name;
+    } else {
+      return null;
+    }
+
+    // 集合访问必须显式调用 filter()/where()；变量续接链（builder.sortBy...）交给 Python 侧关联
+    if (accessor != null &&
+        !chain.contains('filter') &&
+        !chain.contains('where')) {
+      return null;
+    }
+    // 变量续接链只跟踪由未终结的 Isar 查询赋值的变量（QueryBuilder）
+    if (variable != null && !_isarBuilderVariables.contains(variable)) {
+      return null;
+    }
+
+    final assignedTo = _assignedVariable(node);
+    if (assignedTo != null && !chain.any(_isarTerminalMethods.contains)) {
+      _isarBuilderVariables.add(assignedTo);
+    }
+
+    final lineInfo = (node.root as CompilationUnit).lineInfo;
+    return {
+      'accessor': accessor,
+      'variable': variable,
+      'assigned_to': assignedTo,
+      'line': lineInfo.getLocation(node.offset).lineNumber,
+      'chain': chain,
+    };
+  }
+
+  String? _assignedVariable(AstNode node) {
+    AstNode? current = node.parent;
+    while (current is AwaitExpression || current is ParenthesizedExpression) {
+      current = current!.parent;
+    }
+    if (current is AssignmentExpression &&
+        current.leftHandSide is SimpleIdentifier) {
+      return (current.leftHandSide as SimpleIdentifier).name;
+    }
+    if (current is VariableDeclaration) {
+      return current.name.lexeme;
+    }
+    return null;
+  }
+
+  void _addPerformanceLint(AstNode node, String rule, String message) {
+    final lineInfo = (node.root as CompilationUnit).lineInfo;
+    performanceLints.add({
+      'rule': rule,
+      'line': lineInfo.getLocation(node.offset).lineNumber,
+      'class': node.thisOrAncestorOfType<ClassDeclaration>()?.name.lexeme,
+      'message': message,
+    });
+  }
+
+  bool _isConstantExpression(Expression e) {
+    if (e is NamedExpression) return _isConstantExpression(e.expression);
+    if (e is ParenthesizedExpression) return _isConstantExpression(e.expression);
+    if (e is IntegerLiteral ||
+        e is DoubleLiteral ||
+        e is BooleanLiteral ||
+        e is NullLiteral ||
+        e is SimpleStringLiteral) {
+      return true;
+    }
+    if (e is AdjacentStrings) return e.strings.every(_isConstantExpression);
+    if (e is PrefixExpression) return _isConstantExpression(e.operand);
+    if (e is BinaryExpression) {
+      return _isConstantExpression(e.leftOperand) &&
+          _isConstantExpression(e.rightOperand);
+    }
+    if (e is InstanceCreationExpression) {
+      return e.isConst ||
+          (e.constructorName.staticElement?.isConst == true &&
+              e.argumentList.arguments.every(_isConstantExpression));
+    }
+    if (e is ListLiteral) {
+      return e.isConst ||
+          e.elements.every((el) => el is Expression && _isConstantExpression(el));
+    }
+    if (e is Identifier) return _isConstElement(e.staticElement);
+    if (e is PropertyAccess) return _isConstElement(e.propertyName.staticElement);
+    return false;
+  }
+
+  bool _isConstElement(Element? element) {
+    if (element is PropertyAccessorElement) return element.variable.isConst;
+    if (element is VariableElement) return element.isConst;
+    return false;
+  }
+
+  bool _isDynamicList(Expression children) {
+    if (children is! ListLiteral) return true;
+    return children.elements.any((e) => e is ForElement || e is SpreadElement);
+  }
+
+  void _checkWatchWithoutSelect(MethodInvocation node) {
+    final argument = node.argumentList.arguments.first;
+    if (argument is MethodInvocation && argument.methodName.name == 'select') {
+      return;
+    }
+
+    final parent = node.parent;
+    Set<String>? members;
+    if (parent is PropertyAccess && parent.target == node) {
+      members = {parent.propertyName.name};
+    } else if (parent is VariableDeclaration) {
+      members = _memberAccessesOf(parent);
+    }
+    if (members == null ||
+        members.isEmpty ||
+        members.length > 2 ||
+        members.any(_asyncValueMembers.contains)) {
+      return;
+    }
+
+    _addPerformanceLint(
+      node,
+      'watch_without_select',
+      'ref.watch(${argument.toSource()}) 只用到 ${members.join(', ')}，'
+          '建议改用 select 只监听这些字段，避免无关变化触发重建',
+    );
+  }
+
+  /// 返回局部变量在所在函数体内被访问的成员名；存在其他用法时返回 null
+  Set<String>? _memberAccessesOf(VariableDeclaration declaration) {
+    final element = declaration.declaredElement;
+    final body = declaration.thisOrAncestorOfType<FunctionBody>();
+    if (element == null || body == null) return null;
+
+    final collector = _IdentifierUsageCollector(element);
+    body.accept(collector);
+    return collector.escaped ? null : collector.members;
+  }
+
   bool _hasOverrideAnnotation(MethodDeclaration node) {
     return node.metadata.any((m) => m.name.name == 'override');
   }
@@ -242,7 +635,66 @@ class DartFileVisitor extends RecursiveAstVisitor<void> {
       'calls': calls.toList(),
       'i18n_keys': i18nKeys.toList(),
       'design_tokens': designTokens.toList(),
+      'isar_collections': isarCollections,
+      'isar_queries': isarQueries,
+      'performance_lints': performanceLints,
+      'provider_declarations': providerDeclarations,
+      'provider_usages': providerUsages,
     };
   }
 }
 
+/// 收集某个局部变量的使用方式：只通过属性访问时记录成员名，否则标记为 escaped
+class _IdentifierUsageCollector extends RecursiveAstVisitor<void> {
+  final Element element;
+  final Set<String> members = {};
+  bool escaped = false;
+
+  _IdentifierUsageCollector(this.element);
+
+  @override
+  void visitSimpleIdentifier(SimpleIdentifier node) {
+    if (node.staticElement == element && !node.inDeclarationContext()) {
+      final parent = node.parent;
+      if (parent is PrefixedIdentifier && parent.prefix == node) {
+        members.add(parent.identifier.name);
+      } else if (parent is PropertyAccess && parent.target == node) {
+        members.add(parent.propertyName.name);
+      } else {
+        escaped = true;
+      }
+    }
+    super.visitSimpleIdentifier(node);
+  }
+}
+
+
+/// 收集 provider 初始化函数中的 ref.watch/listen/read 目标
+class _RefCallCollector extends RecursiveAstVisitor<void> {
+  static const kinds = {'watch', 'listen', 'read'};
+
+  final Map<String, Set<String>> calls = {
+    for (final kind in kinds) kind: <String>{},
+  };
+
+  /// xxxProvider / xxxProvider(arg) / xxxProvider.notifier / xxxProvider.select(...)
+  static String? providerName(Expression argument) {
+    final match = RegExp(r'^(\w+Provider)\b').firstMatch(argument.toSource());
+    return match?.group(1);
+  }
+
+  @override
+  void visitMethodInvocation(MethodInvocation node) {
+    final target = node.target;
+    if (target is SimpleIdentifier &&
+        target.name == 'ref' &&
+        kinds.contains(node.methodName.name) &&
+        node.argumentList.arguments.isNotEmpty) {
+      final provider = providerName(node.argumentList.arguments.first);
+      if (provider != null) {
+        calls[node.methodName.name]!.add(provider);
+      }
+    }
+    super.visitMethodInvocation(node);
+  }
+}